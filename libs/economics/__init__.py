@@ -1,2 +1,2 @@
 from cpi import CPI
-from inflation import Inflation
+from inflation import Inflation, InflationTable
@@ -18,11 +18,19 @@
 
 import datetime
 import collections
+import bisect
+import array
 import data
 from datastructures import MapDict
 
 CPIResult = collections.namedtuple('CPI', 'date value')
 
+# sorted CPI series of a country: dates, their ordinals (array) and the values (array)
+Series = collections.namedtuple('Series', 'dates ordinals values')
+
+# maximum number of results kept by CPI.closest
+CLOSEST_CACHE_SIZE = 4096
+
 class CPI(object):
     """
     Provides a Pythonic interface to Consumer Price Index data packages
@@ -41,6 +49,8 @@ class CPI(object):
 
         # Initialise empty data structures
         self.data = MapDict()
+        self.series = {}
+        self._closest = {}
 
         # Load the data into the data structures
         self.load()
@@ -70,6 +80,32 @@ class CPI(object):
             # key in the mapdict for the country data
             self.data[(code, name)] = country_data
 
+        self.index()
+
+    def index(self):
+        """
+        Build the sorted series of every country, used by the bisect lookups.
+        Has to be called again if `data` is modified.
+        """
+        self.series = {}
+        for code, country_data in self.data.items():
+            dates = sorted(country_data.keys())
+            self.series[code] = Series(
+                dates=dates,
+                ordinals=array.array('l', [d.toordinal() for d in dates]),
+                values=array.array('d', [country_data[d] for d in dates]))
+        self._closest = {}
+
+    def get_series(self, country=None):
+        """
+        Get the sorted series of a country (code or name)
+        """
+        country = (self.country if country is None else country).upper()
+        try:
+            return self.series[self.data.map.get(country, country)]
+        except KeyError:
+            raise KeyError('Country {country} not found in data'.format(country=country))
+
     def get(self, date=datetime.date.today(), country=None):
         """
         Get the CPI value for a specific time. Defaults to today. This uses
@@ -86,22 +122,44 @@ class CPI(object):
         Get the closest CPI value for a specified date. The date defaults to
         today. A limit can be provided to exclude all values for dates further
         away than defined by the limit. This defaults to 366 days.
+        The lookup is a bisection in the sorted series of the country, and
+        the results are cached by (country, date, limit).
         """
 
         # Try to get the country
         country = self.country if country is None else country
 
-        # Get the data for the given country (we store it as uppercase)
-	# import pdb; pdb.set_trace()
-        country_data = self.data["ESP"]
-
-        # Find the closest date
-        closest_date = min(country_data.keys(),
-                           key=lambda x: abs(date-x))
-        
-        # We return the CPI value if it's within the limit or raise an error
-        if abs(date-closest_date) < limit:
-            return CPIResult(date=closest_date,
-                             value=country_data[closest_date])
-        else:
+        key = (country.upper(), date, limit)
+        if key not in self._closest:
+            if len(self._closest) >= CLOSEST_CACHE_SIZE:
+                self._closest = {}
+            self._closest[key] = self._closest_in_series(date, country, limit)
+        result = self._closest[key]
+        if result is None:
             raise KeyError('A date close enough was not found in data')
+        return result
+
+    def _closest_in_series(self, date, country, limit):
+        series = self.get_series(country)
+        if not series.dates:
+            return None
+        # the closest date is on one side or the other of the insertion point
+        # (the earliest one for a tie)
+        i = bisect.bisect_left(series.ordinals, date.toordinal())
+        candidates = [j for j in (i - 1, i) if 0 <= j < len(series.dates)]
+        closest = min(candidates, key=lambda j: abs(date - series.dates[j]))
+        # We return the CPI value if it's within the limit
+        if abs(date - series.dates[closest]) < limit:
+            return CPIResult(date=series.dates[closest],
+                             value=series.values[closest])
+        return None
+
+    def previous(self, date=datetime.date.today(), country=None):
+        """
+        Get the most recent CPI value at or before the specified date
+        """
+        series = self.get_series(country)
+        i = bisect.bisect_right(series.ordinals, date.toordinal())
+        if i == 0:
+            raise KeyError('No date before {date} in data'.format(date=date))
+        return CPIResult(date=series.dates[i - 1], value=series.values[i - 1])
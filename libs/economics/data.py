@@ -17,11 +17,16 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 from datapackage import DataPackage
+import snapshot
 
 def get(location):
     """
     Helper function to retreive data from a data package located at the
-    provided location.
+    provided location. A local file (a snapshot or a csv of the data package)
+    is read without network.
     """
+    path = snapshot.is_local(location)
+    if path:
+        return snapshot.read(path)
     datapkg = DataPackage(location)
     return datapkg.data
@@ -18,6 +18,7 @@
 
 import datetime
 import collections
+import numpy
 import economics
 
 InflationResult = collections.namedtuple('Inflation', 'factor value')
@@ -80,3 +81,57 @@ class Inflation(object):
         inflation = self.get(target, reference, country)
         # Return the inflated/deflated amount
         return amount * inflation.factor
+
+
+class InflationTable(object):
+    """
+    Precomputed inflation factors of a country, from every year of its CPI data
+    to a reference CPI (i.e the closest to today), to inflate amounts by batch.
+
+    A year without CPI value uses the value of the closest previous year, up to
+    `retry` years before (so the table covers `retry - 1` years after the data).
+    """
+
+    def __init__(self, cpi, country, reference, retry=5):
+        """
+        Build the table from a CPI instance for the given country and the
+        reference CPIResult (the CPI to which the amounts are inflated)
+        """
+        self.reference = reference
+        series = cpi.get_series(country)
+        years = numpy.array([date.year for date in series.dates], dtype=int)
+        if not len(years):
+            raise KeyError('No CPI data for {country}'.format(country=country))
+        self.first_year = int(years[0])
+        # every year of the table, and the index of its CPI value in the series:
+        # the last value of the series at or before the 1st of january of the year
+        table_years = numpy.arange(self.first_year, int(years[-1]) + retry)
+        ordinals = numpy.array([datetime.date(year, 1, 1).toordinal() for year in table_years])
+        indexes = numpy.searchsorted(numpy.asarray(series.ordinals), ordinals, side='right') - 1
+        valid = (indexes >= 0) & (table_years - years[indexes.clip(0)] < retry)
+        values = numpy.asarray(series.values)[indexes.clip(0)]
+        self.factors = numpy.where(valid, reference.value / values, numpy.nan)
+
+    def inflate_many(self, amounts, years):
+        """
+        Inflate the amounts valued in the given years, return the arrays
+        (inflated amounts, reference years). The amounts of the years which
+        can't be inflated are NaN and their reference year is 0.
+        """
+        amounts = numpy.asarray(amounts, dtype=float)
+        indexes = numpy.asarray(years, dtype=int) - self.first_year
+        in_table = (indexes >= 0) & (indexes < len(self.factors))
+        factors = numpy.where(in_table, self.factors[indexes.clip(0, len(self.factors) - 1)], numpy.nan)
+        inflated = amounts * factors
+        reference_years = numpy.where(numpy.isnan(factors), 0, self.reference.date.year)
+        return inflated, reference_years
+
+    def inflate(self, amount, year):
+        """
+        Inflate one amount, return (inflated amount, reference year).
+        Raise a KeyError if the year can't be inflated.
+        """
+        inflated, reference_years = self.inflate_many([amount], [year])
+        if not reference_years[0]:
+            raise KeyError('No CPI value for {year}'.format(year=year))
+        return float(inflated[0]), int(reference_years[0])
@@ -0,0 +1,179 @@
+#!/usr/bin/env python
+# Encoding: utf-8
+# -----------------------------------------------------------------------------
+# Project : OKF - Spending Stories
+# -----------------------------------------------------------------------------
+# Author : Edouard Richard                                  <edou4rd@gmail.com>
+# -----------------------------------------------------------------------------
+# License : GNU General Public License
+# -----------------------------------------------------------------------------
+# Creation : 18-Oct-2026
+# Last mod : 18-Oct-2026
+# -----------------------------------------------------------------------------
+# This file is part of Spending Stories.
+# 
+#     Spending Stories is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+# 
+#     Spending Stories is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+# 
+#     You should have received a copy of the GNU General Public License
+#     along with Spending Stories.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+On-disk snapshot of the CPI data, so that the CPI is loaded without network.
+
+A snapshot is a JSON file with the rows of the CPI data and what is needed to refresh it
+with a conditional request:
+
+    {
+        "format"       : 1,
+        "version"      : sha1 of the rows,
+        "source"       : url of the csv,
+        "etag"         : ETag of the csv,
+        "last_modified": Last-Modified of the csv,
+        "fetched_at"   : timestamp of the last check,
+        "rows"         : [[country code, country name, year, cpi], ...]
+    }
+
+    snapshot.refresh('data/cpi.json')     # out-of-band, i.e. `manage.py update_cpi`
+    CPI(datapackage='data/cpi.json')      # no network
+"""
+
+import csv
+import datetime
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+FORMAT          = 1
+DATAPACKAGE     = 'http://data.okfn.org/data/cpi/'
+SOURCE          = DATAPACKAGE + 'data/cpi.csv'
+DEFAULT_TIMEOUT = 30 # seconds
+
+class SnapshotError(IOError):
+    pass
+
+def is_local(location):
+    """ return the path of the location if it's a local file, None otherwise """
+    if location.startswith('file://'):
+        location = location[len('file://'):]
+    if os.path.isfile(location):
+        return location
+    return None
+
+def to_row(code, name, year, cpi):
+    """ return a row as given by the datapackage """
+    if isinstance(year, (datetime.date, datetime.datetime)):
+        year = year.year
+    return {
+        'Country Code': code,
+        'Country Name': name,
+        'Year'        : datetime.date(int(year), 1, 1),
+        'CPI'         : float(cpi),
+    }
+
+def read_csv(fileobj):
+    """ iterate over the rows of a csv file of the datapackage (Country Name,Country Code,Year,CPI) """
+    for line in csv.DictReader(fileobj):
+        if line.get('CPI') not in (None, ''):
+            yield to_row(line['Country Code'], line['Country Name'].decode('utf-8'), line['Year'], line['CPI'])
+
+def read(path):
+    """ iterate over the rows of a local file, a snapshot (.json) or a csv of the datapackage """
+    if path.endswith('.json'):
+        for row in load(path)['rows']:
+            yield to_row(*row)
+    else:
+        with open(path, 'rb') as f:
+            for row in read_csv(f):
+                yield row
+
+def load(path):
+    """ return the content of a snapshot """
+    try:
+        with open(path) as f:
+            snapshot = json.load(f)
+    except (IOError, ValueError) as e:
+        raise SnapshotError("can't read the CPI snapshot %s: %s" % (path, e))
+    if snapshot.get('format') != FORMAT:
+        raise SnapshotError("unknown format of the CPI snapshot %s: %s" % (path, snapshot.get('format')))
+    return snapshot
+
+def dump(path, rows, source=None, etag=None, last_modified=None):
+    """
+    Write a snapshot of the given rows (as given by the datapackage).
+    The file is replaced atomically, the readers never see a partial snapshot.
+    Return the version of the snapshot.
+    """
+    rows     = sorted([row['Country Code'], row['Country Name'], row['Year'].year, row['CPI']] for row in rows)
+    version  = hashlib.sha1(json.dumps(rows)).hexdigest()
+    snapshot = {
+        'format'       : FORMAT,
+        'version'      : version,
+        'source'       : source,
+        'etag'         : etag,
+        'last_modified': last_modified,
+        'fetched_at'   : time.time(),
+        'rows'         : rows,
+    }
+    directory = os.path.dirname(os.path.abspath(path))
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.cpi-')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(snapshot, f)
+        os.rename(tmp_path, path)
+    except:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return version
+
+def touch(path):
+    """ record that the snapshot has been checked and is up to date """
+    snapshot = load(path)
+    rows     = [to_row(*row) for row in snapshot['rows']]
+    dump(path, rows, snapshot['source'], snapshot['etag'], snapshot['last_modified'])
+
+def refresh(path, source=SOURCE, timeout=DEFAULT_TIMEOUT):
+    """
+    Update the snapshot from the csv of the datapackage with a conditional request
+    (If-None-Match / If-Modified-Since), so that nothing is downloaded if the data didn't change.
+    Return True if the snapshot has been updated, False if it was already up to date.
+    """
+    import requests
+    headers = {}
+    try:
+        snapshot = load(path)
+    except SnapshotError:
+        snapshot = None
+    if snapshot and snapshot.get('source') == source:
+        if snapshot.get('etag'):
+            headers['If-None-Match'] = snapshot['etag']
+        if snapshot.get('last_modified'):
+            headers['If-Modified-Since'] = snapshot['last_modified']
+    try:
+        response = requests.get(source, headers=headers, timeout=timeout)
+    except requests.RequestException as e:
+        raise SnapshotError("can't fetch the CPI data from %s: %s" % (source, e))
+    if response.status_code == 304:
+        touch(path)
+        return False
+    if response.status_code != 200:
+        raise SnapshotError("can't fetch the CPI data from %s: HTTP %s" % (source, response.status_code))
+    rows = list(read_csv(response.content.splitlines()))
+    if not rows:
+        raise SnapshotError("no CPI data in %s" % source)
+    version = dump(path, rows, source, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+    return snapshot is None or snapshot['version'] != version
+
+# EOF
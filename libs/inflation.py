@@ -8,7 +8,7 @@
 # License : GNU General Public License
 # -----------------------------------------------------------------------------
 # Creation : 06-Aug-2013
-# Last mod : 06-Aug-2013
+# Last mod : 18-Oct-2026
 # -----------------------------------------------------------------------------
 # This file is part of Spending Stories.
 # 
@@ -25,8 +25,95 @@
 #     You should have received a copy of the GNU General Public License
 #     along with Spending Stories.  If not, see <http://www.gnu.org/licenses/>.
 
-from economics import Inflation, CPI
+from economics import CPI, InflationTable, snapshot
+import contextlib
+import threading
 import datetime
+import time
+import os
+try:
+	import fcntl
+except ImportError:
+	# no lock between the processes
+	fcntl = None
+
+# -----------------------------------------------------------------------------
+#
+#    CPI
+#
+# -----------------------------------------------------------------------------
+# on-disk snapshot of the CPI data, refreshed out-of-band (see `economics.snapshot`)
+CPI_SNAPSHOT = os.path.join(os.path.dirname(os.path.realpath(__file__)), os.path.pardir, 'data', 'cpi.json')
+# local file (snapshot or csv) or url of the CPI data used instead of the snapshot (i.e: offline mode)
+CPI_SOURCE   = None
+
+def configure(source=None, snapshot_path=None):
+	global CPI_SOURCE, CPI_SNAPSHOT, CACHED_SOURCE
+	CPI_SOURCE    = source
+	CPI_SNAPSHOT  = snapshot_path or CPI_SNAPSHOT
+	CACHED_SOURCE = None
+	# a new source is loaded at once
+	REFRESH_STATS['last_attempt'] = None
+
+@contextlib.contextmanager
+def file_lock(path, blocking=False):
+	""" lock between the processes, yield whether the lock is acquired """
+	if fcntl is None:
+		yield True
+		return
+	directory = os.path.dirname(os.path.abspath(path))
+	if not os.path.isdir(directory):
+		os.makedirs(directory)
+	with open(path, 'a') as f:
+		try:
+			fcntl.flock(f, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+			acquired = True
+		except IOError:
+			acquired = False
+		try:
+			yield acquired
+		finally:
+			if acquired:
+				fcntl.flock(f, fcntl.LOCK_UN)
+
+def snapshot_age():
+	""" seconds since the snapshot has been fetched or checked, None if there is no snapshot """
+	if CPI_SOURCE or not os.path.exists(CPI_SNAPSHOT):
+		return None
+	return time.time() - os.path.getmtime(CPI_SNAPSHOT)
+
+def refresh_snapshot(blocking=False):
+	"""
+	Fetch the snapshot if it's missing or older than CACHED_SOURCE_TIMEOUT.
+	Only one process fetches it, the others use the snapshot on disk.
+	Return True if the snapshot has been fetched or checked.
+	"""
+	with file_lock(CPI_SNAPSHOT + '.lock', blocking=blocking) as acquired:
+		age = snapshot_age()
+		if acquired and (age is None or age > CACHED_SOURCE_TIMEOUT * 24 * 3600):
+			snapshot.refresh(CPI_SNAPSHOT)
+			return True
+		return False
+
+def load_cpi():
+	"""
+	Load the CPI from the source if given, from the snapshot otherwise.
+	The snapshot is fetched the first time, if it can't the data package is used directly.
+	"""
+	if CPI_SOURCE:
+		return CPI(datapackage=CPI_SOURCE)
+	if not os.path.exists(CPI_SNAPSHOT):
+		try:
+			refresh_snapshot(blocking=True)
+		except snapshot.SnapshotError:
+			return CPI()
+	return CPI(datapackage=CPI_SNAPSHOT)
+
+def source_signature():
+	""" the location of the CPI data, and its modification time if it's a local file """
+	location = CPI_SOURCE or CPI_SNAPSHOT
+	path     = snapshot.is_local(location)
+	return (location, os.path.getmtime(path) if path else None)
 
 # -----------------------------------------------------------------------------
 #
@@ -37,16 +124,107 @@ INFLATION_REFERENCE_RETRY = 5
 CACHED_SOURCE_TIMEOUT = 1 # days
 CACHED_SOURCE = None
 CACHED_YEARS = None
+CACHED_TABLES = {}
+# delay before a refresh which failed or didn't refresh anything is tried again
+REFRESH_RETRY_DELAY = 60 # seconds
+# only one refresh at once in a process
+REFRESH_LOCK = threading.Lock()
+REFRESH_THREAD = None
+REFRESH_STATS = {
+	'refreshes'    : 0,
+	'failures'     : 0,
+	'skipped'      : 0,
+	'last_error'   : None,
+	'last_failure' : None,
+	'last_attempt' : None,
+	'last_outcome' : None,
+	'last_duration': None,
+}
+
+def is_stale(cached):
+	cpi, loaded_at, signature = cached
+	if signature != source_signature():
+		# changed on disk
+		return True
+	if signature[1] is None:
+		# a remote data package
+		return (datetime.datetime.now() - loaded_at).days >= CACHED_SOURCE_TIMEOUT
+	age = snapshot_age()
+	return age is not None and age > CACHED_SOURCE_TIMEOUT * 24 * 3600
+
+def reload_cpi():
+	global CACHED_SOURCE, CACHED_TABLES
+	signature     = source_signature()
+	cpi           = load_cpi()
+	CACHED_SOURCE = (cpi, datetime.datetime.now(), signature)
+	CACHED_TABLES = {}
+	return cpi
+
+def refresh():
+	""" refresh the snapshot if needed and load the CPI again, REFRESH_LOCK has to be acquired """
+	start = time.time()
+	REFRESH_STATS['last_attempt'] = start
+	try:
+		if CPI_SOURCE or refresh_snapshot() or source_signature() != CACHED_SOURCE[2]:
+			reload_cpi()
+			REFRESH_STATS['refreshes']   += 1
+			REFRESH_STATS['last_outcome'] = 'refreshed'
+		else:
+			# another process is fetching the snapshot, the CPI is loaded once it's written
+			REFRESH_STATS['skipped']     += 1
+			REFRESH_STATS['last_outcome'] = 'skipped'
+	except Exception as e:
+		# the previous CPI is still used
+		REFRESH_STATS['failures']    += 1
+		REFRESH_STATS['last_error']   = repr(e)
+		REFRESH_STATS['last_failure'] = time.time()
+		REFRESH_STATS['last_outcome'] = 'failed'
+	finally:
+		REFRESH_STATS['last_duration'] = time.time() - start
+		REFRESH_LOCK.release()
+
+def start_refresh():
+	""" refresh the CPI in background, unless a refresh is running or has just failed or been skipped """
+	last_attempt = REFRESH_STATS['last_attempt']
+	if REFRESH_STATS['last_outcome'] != 'refreshed' and last_attempt and time.time() - last_attempt < REFRESH_RETRY_DELAY:
+		return None
+	global REFRESH_THREAD
+	if not REFRESH_LOCK.acquire(False):
+		return None
+	REFRESH_THREAD = threading.Thread(target=refresh, name="cpi-refresh")
+	REFRESH_THREAD.daemon = True
+	REFRESH_THREAD.start()
+	return REFRESH_THREAD
+
+def get_cpi():
+	"""
+	Return the CPI. Once loaded, a stale CPI is still returned while it's refreshed in
+	background (stale-while-revalidate): a caller never waits for a refresh.
+	"""
+	cached = CACHED_SOURCE
+	if cached is None:
+		# first load, synchronous
+		with REFRESH_LOCK:
+			if CACHED_SOURCE is None:
+				return reload_cpi()
+			cached = CACHED_SOURCE
+	if is_stale(cached):
+		start_refresh()
+	return cached[0]
+
+def cache_stats():
+	""" state of the CPI cache and of its refreshes """
+	stats = dict(REFRESH_STATS)
+	stats.update({
+		'source'       : CPI_SOURCE or CPI_SNAPSHOT,
+		'loaded_at'    : CACHED_SOURCE[1].isoformat() if CACHED_SOURCE else None,
+		'snapshot_age' : snapshot_age(),
+		'refreshing'   : REFRESH_LOCK.locked(),
+	})
+	return stats
 
 def get_data():
-	global CACHED_SOURCE
-	# if cache exists and is less than 1 day
-	if CACHED_SOURCE and (datetime.datetime.now() - CACHED_SOURCE[1]).days < CACHED_SOURCE_TIMEOUT :
-		cpi = CACHED_SOURCE[0]
-	else:
-		cpi           = CPI()
-		CACHED_SOURCE = (cpi, datetime.datetime.now())
-	return cpi.data
+	return get_cpi().data
 
 def available_years():
 	years = {}
@@ -64,31 +242,37 @@ def get_inflation(amount, year, country):
 	: param country : ISO code, str
 	: returns       : tuple((inflated_amount, most_recent_year_reference))
 	"""
-	global CACHED_SOURCE
-	# if cache exists and is less than 1 day
-	if CACHED_SOURCE and (datetime.datetime.now() - CACHED_SOURCE[1]).days < CACHED_SOURCE_TIMEOUT :
-		cpi = CACHED_SOURCE[0]
-	else:
-		cpi           = CPI()
-		CACHED_SOURCE = (cpi, datetime.datetime.now())
-
-	inflation     = Inflation(source=cpi)
-
-	def closest_ajustment_reference_date():
-	    cpi_closest = cpi.closest(
-	        country = country,
-	        date    = datetime.date.today(),
-	        limit   = datetime.timedelta(366*5))
-	    return cpi_closest.date
-	_year = year
-	for i in range(INFLATION_REFERENCE_RETRY):
-		reference_date = closest_ajustment_reference_date()
-		try:
-			return (inflation.inflate(amount, reference_date, datetime.date(_year, 1, 1), country),
-				reference_date.year )
-		except KeyError:
-			_year = _year - 1
-	raise Exception("no date found for inflation. Asked for %s and tested up to %s (%s)" % (year, _year + 1, country))
+	try:
+		return get_table(country).inflate(amount, year)
+	except KeyError:
+		raise Exception("no date found for inflation. Asked for %s and tested up to %s (%s)" % (year, year - INFLATION_REFERENCE_RETRY + 1, country))
+
+def inflate_many(amounts, years, country):
+	"""
+	Batch version of `get_inflation`: inflate the amounts valued in the given years.
+	The amounts which can't be inflated are NaN, and their reference year is 0.
+
+	: param amounts : sequence of numbers
+	: param years   : sequence of int
+	: param country : ISO code, str
+	: returns       : tuple((inflated_amounts, most_recent_year_references)) of numpy arrays
+	"""
+	return get_table(country).inflate_many(amounts, years)
+
+def get_table(country):
+	"""
+	Return the InflationTable of the country to its most recent CPI,
+	kept until the CPI is loaded again.
+	"""
+	cpi       = get_cpi()
+	reference = cpi.closest(
+		country = country,
+		date    = datetime.date.today(),
+		limit   = datetime.timedelta(366*5))
+	key = (country.upper(), reference.date)
+	if key not in CACHED_TABLES:
+		CACHED_TABLES[key] = InflationTable(cpi, country, reference, retry=INFLATION_REFERENCE_RETRY)
+	return CACHED_TABLES[key]
 
 if __name__ == "__main__":
 	print get_inflation(200, 2009, 'fra')
@@ -8,7 +8,7 @@
 # License : GNU General Public License
 # -----------------------------------------------------------------------------
 # Creation : 21-Aug-2013
-# Last mod : 21-Aug-2013
+# Last mod : 18-Oct-2026
 # -----------------------------------------------------------------------------
 # This file is part of Spending Stories.
 # 
@@ -28,5 +28,7 @@
 
 from relevance import Relevance
 from processor import Processor
+from registry  import registry, register_processor, UnknownStoryType
+from index     import RatioBandIndex
 
 # EOF
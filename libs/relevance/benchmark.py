@@ -0,0 +1,173 @@
+#!/usr/bin/env python
+# Encoding: utf-8
+# -----------------------------------------------------------------------------
+# Project : OKF - Spending Stories
+# -----------------------------------------------------------------------------
+# Author : Edouard Richard                                  <edou4rd@gmail.com>
+# -----------------------------------------------------------------------------
+# License : GNU General Public License
+# -----------------------------------------------------------------------------
+# Creation : 18-Oct-2026
+# Last mod : 18-Oct-2026
+# -----------------------------------------------------------------------------
+# This file is part of Spending Stories.
+# 
+#     Spending Stories is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+# 
+#     Spending Stories is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+# 
+#     You should have received a copy of the GNU General Public License
+#     along with Spending Stories.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Micro-benchmark of the relevance processors, without Django.
+
+For every story type, it sweeps a grid of `size` amounts by `size` references
+(log-spaced between 10^`low` and 10^`high`) and measures:
+
+    compute            `Relevance().compute`, the lookup of the processor included
+    processor.compute  the `compute` of the processor (the `is_multiple_of` cascade of
+                       `discrete`, the modulo chain of `over_one_year`)
+    nice_equivalence   `Processor.__nice_equivalence`, shared by the processors
+    compute_many       the vectorized `compute_many`, by reference
+
+Usage, from the `libs` directory:
+
+    python -m relevance.benchmark --size 100 --types discrete,over_one_year
+    python -m relevance.benchmark --profile /tmp/relevance --slow 5000 --slowest 10
+
+With --profile, the benchmarks slower than --slow ns/call are run under cProfile,
+their stats are written in the given directory (to read with `pstats`) and summed up.
+With --slowest, the slowest (amount, compared_to) cases of every benchmark are listed.
+"""
+
+from relevance import Relevance
+from registry  import registry
+import StringIO
+import argparse
+import cProfile
+import pstats
+import numpy
+import time
+import os
+
+def grid(size, low=2, high=12):
+    """ return the (amounts, compared_to) arrays of the `size` x `size` pairs of the grid """
+    values = numpy.logspace(low, high, size)
+    amounts, compared_to = numpy.meshgrid(values, values)
+    return amounts.ravel(), compared_to.ravel()
+
+def benchmarks(story_type):
+    """
+    return the (name, function, vectorized) to measure for a story type. The functions take
+    the amounts and the references as numpy arrays if `vectorized`, or else as lists of floats
+    """
+    processor        = registry.get(story_type)
+    nice_equivalence = processor._Processor__nice_equivalence
+    def compute(amounts, compared_to):
+        for amount, reference in zip(amounts, compared_to):
+            Relevance().compute(amount, reference, story_type)
+    def processor_compute(amounts, compared_to):
+        for amount, reference in zip(amounts, compared_to):
+            processor.compute(amount, reference)
+    def nice_equivalences(amounts, compared_to):
+        for amount, reference in zip(amounts, compared_to):
+            nice_equivalence(amount, reference)
+    def compute_many(amounts, compared_to):
+        # one call by amount, as when the api ranks the stories for a query
+        for amount in numpy.unique(amounts):
+            processor.compute_many(amount, compared_to[amounts == amount])
+    return (
+        ('compute'          , compute          , False),
+        ('processor.compute', processor_compute, False),
+        ('nice_equivalence' , nice_equivalences, False),
+        ('compute_many'     , compute_many     , True),
+    )
+
+def arguments(amounts, compared_to, vectorized):
+    """ the arguments of a benchmark function, floats as the api gives them (numpy scalars are slower) """
+    if vectorized:
+        return numpy.asarray(amounts, dtype=float), numpy.asarray(compared_to, dtype=float)
+    return map(float, amounts), map(float, compared_to)
+
+def measure(function, args, repeat=3):
+    """ return the best duration (seconds) of `repeat` runs of `function` """
+    durations = []
+    for i in range(repeat):
+        start = time.time()
+        function(*args)
+        durations.append(time.time() - start)
+    return min(durations)
+
+def slowest(function, vectorized, amounts, compared_to, count, calls=20, repeat=3):
+    """ return the `count` slowest (ns/call, amount, compared_to) pairs """
+    results = []
+    for amount, reference in zip(amounts, compared_to):
+        args = arguments([amount] * calls, [reference] * calls, vectorized)
+        results.append((measure(function, args, repeat) / calls * 1e9, amount, reference))
+    return sorted(results, reverse=True)[:count]
+
+def profile(function, args, path, top=10):
+    """ run `function` under cProfile, write the stats in `path` and return their summary """
+    profiler = cProfile.Profile()
+    profiler.runcall(function, *args)
+    profiler.dump_stats(path)
+    output = StringIO.StringIO()
+    pstats.Stats(path, stream=output).sort_stats('cumulative').print_stats(top)
+    return output.getvalue()
+
+def run(size=50, story_types=None, repeat=3, low=2, high=12):
+    """ return a list of results dict (story_type, name, function, vectorized, calls, ns_per_call, calls_per_sec) """
+    amounts, compared_to = grid(size, low, high)
+    results = []
+    for story_type in story_types or registry.story_types():
+        for name, function, vectorized in benchmarks(story_type):
+            duration = measure(function, arguments(amounts, compared_to, vectorized), repeat)
+            calls    = len(amounts)
+            results.append(dict(
+                story_type    = story_type,
+                name          = name,
+                function      = function,
+                vectorized    = vectorized,
+                calls         = calls,
+                ns_per_call   = duration / calls * 1e9,
+                calls_per_sec = calls / duration if duration else float('inf'),
+            ))
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Micro-benchmark of the relevance processors")
+    parser.add_argument("--size"   , type=int, default=50, help="amounts and references of the grid (size x size calls)")
+    parser.add_argument("--low"    , type=float, default=2, help="smallest value of the grid, as a power of 10")
+    parser.add_argument("--high"   , type=float, default=12, help="biggest value of the grid, as a power of 10")
+    parser.add_argument("--types"  , default=None, help="story types, separated by commas (all by default)")
+    parser.add_argument("--repeat" , type=int, default=3, help="runs by benchmark, the best one is kept")
+    parser.add_argument("--profile", default=None, help="directory of the cProfile stats of the slow benchmarks")
+    parser.add_argument("--slow"   , type=float, default=0, help="profile the benchmarks slower than this (ns/call)")
+    parser.add_argument("--top"    , type=int, default=10, help="functions of the profile summaries")
+    parser.add_argument("--slowest", type=int, default=0, help="list the N slowest pairs of every benchmark")
+    options = parser.parse_args(argv)
+    story_types = options.types.split(",") if options.types else None
+    amounts, compared_to = grid(options.size, options.low, options.high)
+    print "%-16s %-18s %10s %12s %14s" % ("story type", "benchmark", "calls", "ns/call", "calls/sec")
+    for result in run(options.size, story_types, options.repeat, options.low, options.high):
+        print "%-16s %-18s %10d %12.0f %14.0f" % (result['story_type'], result['name'], result['calls'],
+            result['ns_per_call'], result['calls_per_sec'])
+        for ns, amount, reference in slowest(result['function'], result['vectorized'], amounts, compared_to, options.slowest):
+            print "    %10.0f ns  amount=%-14g compared_to=%g" % (ns, amount, reference)
+        if options.profile and result['ns_per_call'] >= options.slow:
+            if not os.path.isdir(options.profile):
+                os.makedirs(options.profile)
+            path = os.path.join(options.profile, "%s.%s.pstats" % (result['story_type'], result['name']))
+            print profile(result['function'], arguments(amounts, compared_to, result['vectorized']), path, options.top)
+
+if __name__ == "__main__":
+    main()
+
+# EOF
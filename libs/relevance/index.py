@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+# Encoding: utf-8
+# -----------------------------------------------------------------------------
+# Project : OKF - Spending Stories
+# -----------------------------------------------------------------------------
+# Author : Edouard Richard                                  <edou4rd@gmail.com>
+# -----------------------------------------------------------------------------
+# License : GNU General Public License
+# -----------------------------------------------------------------------------
+# Creation : 18-Oct-2026
+# Last mod : 18-Oct-2026
+# -----------------------------------------------------------------------------
+# This file is part of Spending Stories.
+# 
+#     Spending Stories is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+# 
+#     Spending Stories is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+# 
+#     You should have received a copy of the GNU General Public License
+#     along with Spending Stories.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Index of references (ie: stories) sorted by the logarithm of their value and
+partitioned by story type.
+
+For a given amount, `candidates` returns with binary searches the references
+whose ratio `amount/value` falls into one of the bands where the processor of
+their type can find a relevance (see `Processor.bands`). The other references
+have a score of 0, so only the candidates need to be computed:
+
+    index      = RatioBandIndex((story.pk, story.current_value_usd, story.type) for story in stories)
+    candidates = index.candidates(amount=10000)
+
+The cost of a search grows with the number of candidates, not with the size of the index.
+"""
+
+from registry import registry
+import bisect
+import math
+
+# relative margin added around the bands to absorb the rounding errors of the processors
+EPSILON = 1e-9
+
+class RatioBandIndex(object):
+
+    def __init__(self, references=()):
+        """ `references` is an iterable of (key, value, story_type) tuples """
+        partitions    = {}
+        # references without a positive value can't be placed on the log scale, they are always candidates
+        self.unsorted = []
+        for key, value, story_type in references:
+            if value > 0:
+                partitions.setdefault(story_type, []).append((math.log(value), key))
+            else:
+                self.unsorted.append(key)
+        self.partitions = {}
+        for story_type, references in partitions.items():
+            references.sort()
+            self.partitions[story_type] = ([log for log, key in references], [key for log, key in references])
+        self.log_bands = dict((story_type, self.merge_bands(story_type)) for story_type in self.partitions)
+
+    def __len__(self):
+        return len(self.unsorted) + sum(len(keys) for logs, keys in self.partitions.values())
+
+    def merge_bands(self, story_type):
+        """ return the sorted and merged bands of the processor as logarithms, or None for all the ratios """
+        bands = registry.get(story_type).bands()
+        if bands is None:
+            return None
+        merged = []
+        for low, high in sorted(bands):
+            if merged and low <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], high)
+            else:
+                merged.append([low, high])
+        return [(math.log(low) - EPSILON, math.log(high) + EPSILON) for low, high in merged]
+
+    def candidates(self, amount):
+        """ return the keys of the references which can be relevant for the given amount """
+        amount     = float(amount)
+        candidates = list(self.unsorted)
+        for story_type, (logs, keys) in self.partitions.items():
+            log_bands = self.log_bands[story_type]
+            if log_bands is None or amount <= 0:
+                candidates.extend(keys)
+                continue
+            log_amount = math.log(amount)
+            # amount/value in [low, high] <=> log(value) in [log(amount) - log(high), log(amount) - log(low)]
+            for log_low, log_high in log_bands:
+                start = bisect.bisect_left (logs, log_amount - log_high)
+                end   = bisect.bisect_right(logs, log_amount - log_low, start)
+                candidates.extend(keys[start:end])
+        return candidates
+
+# EOF
@@ -8,7 +8,7 @@
 # License : GNU General Public License
 # -----------------------------------------------------------------------------
 # Creation : 21-Aug-2013
-# Last mod : 11-Oct-2013
+# Last mod : 18-Oct-2026
 # -----------------------------------------------------------------------------
 # This file is part of Spending Stories.
 # 
@@ -26,6 +26,14 @@
 #     along with Spending Stories.  If not, see <http://www.gnu.org/licenses/>.
 
 from relevance import Relevance
+import numpy
+
+# score of a multiple relevance, indexed by the multiple (see `__nice_equivalence`)
+MULTIPLE_SCORES = numpy.array([0, 0, 8, 7, 7, 8, 7, 7, 7, 6])
+
+def round_half_away(values):
+    """ vectorized equivalent of the builtin `round` (halves are rounded away from zero) """
+    return numpy.where(values >= 0, numpy.floor(values + 0.5), numpy.ceil(values - 0.5))
 
 class Processor(object):
     """ Base class to compute a relevance """
@@ -34,6 +42,57 @@ class Processor(object):
         """ Should be implemented and return a Relevance instance """
         return self.__nice_equivalence(amount, compared_to)
 
+    def compute_many(self, amount, compared_to):
+        """
+        Compute the relevances of `amount` related to every value of the `compared_to` array.
+        Returns the (scores, types, values) arrays, see `Relevance.compute_many`.
+        Should be implemented with array operations, the default one calls `compute` for every value.
+        """
+        scores, types, values = Relevance.empty_many(len(compared_to))
+        for i, reference in enumerate(compared_to):
+            relevance = self.compute(amount, float(reference))
+            if relevance:
+                scores[i], types[i], values[i] = relevance.values()
+        return scores, types, values
+
+    def bands(self):
+        """
+        Return the intervals of the `amount/compared_to` ratio where `compute` can find a relevance,
+        as a list of (low, high) tuples, or None if it can be found for any ratio.
+        Used by `relevance.index` to skip the references which can't be relevant.
+        """
+        return None
+
+    def _nice_equivalence_bands(self):
+        """ ratio intervals where `__nice_equivalence` can find a relevance """
+        bands = [(0.9, 1.1), (0.49, 0.51)]
+        # the rounded percentage is in [i*100 - 4, i*100 + 3]
+        bands += [(i - 0.045, i + 0.035) for i in range(2, 10)]
+        return bands
+
+    def _nice_equivalences(self, amount, compared_to):
+        """ vectorized version of `__nice_equivalence`, irrelevant values have a score of 0 """
+        scores, types, values = Relevance.empty_many(len(compared_to))
+        ratio      = amount/compared_to * 100
+        equivalent = (90 <= ratio) & (ratio <= 110)
+        half       = (49 < ratio) & (ratio < 51)
+        scores[equivalent] = 10
+        types [equivalent] = Relevance.RELEVANCE_TYPE_EQUIVALENT
+        values[equivalent] = 1
+        scores[half]       = 9
+        types [half]       = Relevance.RELEVANCE_TYPE_HALF
+        values[half]       = 0.5
+        # x200, x500 ... x900 with 4 percent of tolerance, as in `__nice_equivalence`
+        ratio_rounded = round_half_away(ratio)
+        nice_multiple = numpy.floor((ratio_rounded + 4) / 100)
+        multiple      = (ratio > 110) & (nice_multiple >= 2) & (nice_multiple <= 9) \
+                      & (ratio_rounded <= nice_multiple * 100 + 3)
+        nice_multiple = nice_multiple[multiple].astype(int)
+        scores[multiple] = MULTIPLE_SCORES[nice_multiple]
+        types [multiple] = Relevance.RELEVANCE_TYPE_MULTIPLE
+        values[multiple] = nice_multiple
+        return scores, types, values
+
     def __nice_equivalence(self, amount, compared_to):
         ratio = amount/compared_to * 100
         relevance = None
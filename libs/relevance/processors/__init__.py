@@ -8,7 +8,7 @@
 # License : GNU General Public License
 # -----------------------------------------------------------------------------
 # Creation : 21-Aug-2013
-# Last mod : 21-Aug-2013
+# Last mod : 18-Oct-2026
 # -----------------------------------------------------------------------------
 # This file is part of Spending Stories.
 # 
@@ -27,10 +27,10 @@
 
 
 """
-Listing of available processors
-"""
+Available processors, one module per story type.
 
-import discrete
-import over_one_year
+Every module which defines a `SubProcessor` class is registered under its name
+by `relevance.registry` at the first relevance computation.
+"""
 
 # EOF
@@ -8,7 +8,7 @@
 # License : GNU General Public License
 # -----------------------------------------------------------------------------
 # Creation : 21-Aug-2013
-# Last mod : 11-Oct-2013
+# Last mod : 18-Oct-2026
 # -----------------------------------------------------------------------------
 # This file is part of Spending Stories.
 # 
@@ -27,6 +27,8 @@
 
 
 from relevance import Relevance, Processor
+from relevance.processor import round_half_away
+import numpy
 
 class SubProcessor(Processor):
 
@@ -47,7 +49,31 @@ class SubProcessor(Processor):
             # relevance.value = rounded_ratio / 100
         return relevance
 
+    def bands(self):
+        """ ratio intervals where `compute` can find a relevance """
+        bands = self._nice_equivalence_bands()
+        # percentages, with a tolerance of 0.4 for the multiples of 5 and of 0.01 for the others
+        for percentage in range(1, 100):
+            tolerance = 0.4 if percentage % 5 == 0 else 0.01
+            bands.append(((percentage - tolerance) / 100, (percentage + tolerance) / 100))
+        return bands
+
+    def compute_many(self, amount, compared_to):
+        """ vectorized version of `compute` """
+        scores, types, values = self._nice_equivalences(amount, compared_to)
+        ratio         = (amount/compared_to) * 100
+        rounded_ratio = round_half_away(ratio)
+        candidates    = (scores == 0) & (1 < ratio) & (ratio < 100)
+        for multiple, tolerance, score in ((10, 0.4, 8), (5, 0.4, 7), (1, 0.01, 6)):
+            matches = candidates & self.is_multiple_of(ratio, multiple, tolerance)
+            scores[matches] = score
+            types [matches] = Relevance.RELEVANCE_TYPE_PERCENTAGE
+            values[matches] = rounded_ratio[matches].astype(int)
+            candidates &= ~matches
+        return scores, types, values
+
     def is_multiple_of(self, n, m, tolerance):
+        """ works with a number or an array of numbers as `n` """
         mod_nm   = n % m 
-        return mod_nm == 0 or mod_nm <= tolerance or mod_nm >= (m - tolerance)
+        return (mod_nm == 0) | (mod_nm <= tolerance) | (mod_nm >= (m - tolerance))
 # EOF
@@ -8,7 +8,7 @@
 # License : GNU General Public License
 # -----------------------------------------------------------------------------
 # Creation : 21-Aug-2013
-# Last mod : 11-Oct-2013
+# Last mod : 18-Oct-2026
 # -----------------------------------------------------------------------------
 # This file is part of Spending Stories.
 # 
@@ -26,6 +26,7 @@
 #     along with Spending Stories.  If not, see <http://www.gnu.org/licenses/>.
 
 from relevance import Processor, Relevance
+import numpy
 
 class SubProcessor(Processor):
 
@@ -49,4 +50,34 @@ class SubProcessor(Processor):
                 relevance = Relevance(8, Relevance.RELEVANCE_TYPE_MONTH, int(amount / one_month))
         return relevance
 
+    def bands(self):
+        """ ratio intervals where `compute` can find a relevance """
+        bands = self._nice_equivalence_bands()
+        # a whole number of days, weeks or months, with the tolerances of `compute`
+        for unit, count, tolerance in ((365.25, 7, .1), (52., 4, 52 / 365.25 * 0.25), (12., 11, 12 / 52. * 0.25)):
+            bands += [(n / unit, (n + tolerance) / unit) for n in range(1, count + 1)]
+        return bands
+
+    def compute_many(self, amount, compared_to):
+        """ vectorized version of `compute` """
+        scores, types, values = self._nice_equivalences(amount, compared_to)
+        candidates  = (scores == 0) & (amount < compared_to)
+        one_day     = compared_to / 365.25
+        one_week    = compared_to / 52
+        one_month   = compared_to / 12
+        below_week  = amount < one_week
+        below_month = ~below_week & (amount < one_month)
+        above_month = ~below_week & ~below_month
+        days   = candidates & below_week  & (amount >  one_day)  & (numpy.mod(amount, one_day)   <= one_day * .1)
+        weeks  = candidates & below_month & (amount >= one_week) & (numpy.mod(amount, one_week)  <= one_day * 0.25)
+        months = candidates & above_month                        & (numpy.mod(amount, one_month) <  one_week * 0.25)
+        for matches, score, relevance_type, unit in (
+                (days  , 6, Relevance.RELEVANCE_TYPE_DAY  , one_day  ),
+                (weeks , 7, Relevance.RELEVANCE_TYPE_WEEK , one_week ),
+                (months, 8, Relevance.RELEVANCE_TYPE_MONTH, one_month)):
+            scores[matches] = score
+            types [matches] = relevance_type
+            values[matches] = (amount / unit[matches]).astype(int)
+        return scores, types, values
+
 # EOF
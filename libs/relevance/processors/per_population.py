@@ -8,7 +8,7 @@
 # License : GNU General Public License
 # -----------------------------------------------------------------------------
 # Creation : 21-Aug-2013
-# Last mod : 21-Aug-2013
+# Last mod : 18-Oct-2026
 # -----------------------------------------------------------------------------
 # This file is part of Spending Stories.
 # 
@@ -35,4 +35,8 @@ class SubProcessor(Processor):
             return Relevance(10, Relevance.RELEVANCE_TYPE_EQUIVALENT)
         return Relevance(0)
 
+    def bands(self):
+        """ ratio intervals where `compute` can find a relevance """
+        return [(0.9, 1.1)]
+
 # EOF
@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+# Encoding: utf-8
+# -----------------------------------------------------------------------------
+# Project : OKF - Spending Stories
+# -----------------------------------------------------------------------------
+# Author : Edouard Richard                                  <edou4rd@gmail.com>
+# -----------------------------------------------------------------------------
+# License : GNU General Public License
+# -----------------------------------------------------------------------------
+# Creation : 18-Oct-2026
+# Last mod : 18-Oct-2026
+# -----------------------------------------------------------------------------
+# This file is part of Spending Stories.
+# 
+#     Spending Stories is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+# 
+#     Spending Stories is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+# 
+#     You should have received a copy of the GNU General Public License
+#     along with Spending Stories.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Registry of the relevance processors, with one instance per story type.
+
+The processors are discovered once, at the first lookup: every module of the
+`processors` package which defines a `SubProcessor` class is registered under
+the name of the module (ie: `discrete`, `over_one_year`).
+
+Other processors can be registered with the `register_processor` hook, as a
+decorator or as a function. A processor registered under the name of a
+module of the `processors` package replaces it.
+
+    from relevance import Processor, register_processor
+
+    @register_processor("per_capita")
+    class PerCapitaProcessor(Processor):
+        def compute(self, amount, compared_to, *args, **kwargs):
+            ...
+
+    register_processor("per_capita", PerCapitaProcessor)
+
+Processors must be stateless, the same instance computes every relevance of
+its story type.
+"""
+
+import importlib
+import pkgutil
+import threading
+
+class UnknownStoryType(KeyError):
+    """ Raised when no processor is registered for a story type """
+
+class ProcessorRegistry(object):
+
+    def __init__(self):
+        self.processors = {}
+        self.discovered = False
+        self.lock       = threading.Lock()
+
+    def register(self, story_type, processor_class=None):
+        """ register a processor class for the given story type, can be used as a decorator """
+        if processor_class is None:
+            return lambda processor_class: self.register(story_type, processor_class)
+        self.processors[story_type] = processor_class()
+        return processor_class
+
+    def discover(self):
+        """ register the processors of the `processors` package which aren't registered yet """
+        import processors
+        with self.lock:
+            if self.discovered:
+                return
+            for _, name, is_package in pkgutil.iter_modules(processors.__path__):
+                module = importlib.import_module("%s.%s" % (processors.__name__, name))
+                if hasattr(module, "SubProcessor"):
+                    self.processors.setdefault(name, module.SubProcessor())
+            self.discovered = True
+
+    def get(self, story_type):
+        """ return the processor instance of the given story type """
+        if not self.discovered:
+            self.discover()
+        try:
+            return self.processors[story_type]
+        except KeyError:
+            raise UnknownStoryType("no relevance processor for the story type %r (available: %s)"
+                % (story_type, ", ".join(self.story_types())))
+
+    def story_types(self):
+        """ return the sorted list of the supported story types """
+        if not self.discovered:
+            self.discover()
+        return sorted(self.processors.keys())
+
+registry           = ProcessorRegistry()
+register_processor = registry.register
+
+# EOF
@@ -8,7 +8,7 @@
 # License : GNU General Public License
 # -----------------------------------------------------------------------------
 # Creation : 16-Aug-2013
-# Last mod : 11-oct-2013
+# Last mod : 18-Oct-2026
 # -----------------------------------------------------------------------------
 # This file is part of Spending Stories.
 # 
@@ -35,7 +35,10 @@ For more informations, see https://github.com/jplusplus/okf-spending-stories/wik
 
 """
 
-__version__ = '0.6'
+__version__ = '0.7'
+
+from registry import registry
+import numpy
 
 class Relevance:
     """
@@ -49,7 +52,8 @@ class Relevance:
 
     `amount` is the number that you want compute the relevance, related to `compated_to`.
     `story_type` is the nature of the `compared_to` value. It can take `discrete` (default value), `over_one_year` or other
-    names of files in the `processors` package. This `story_type` will change the way that the relevance will be computed.
+    names of files in the `processors` package, or of processors added with `register_processor` (see `registry`).
+    This `story_type` will change the way that the relevance will be computed. An unknown `story_type` raises `UnknownStoryType`.
 
     * or *
 
@@ -71,6 +75,17 @@ class Relevance:
             story_type  = "discrete")
         score, type, value = relevance.values()
 
+    * or, to compute the relevances of an amount against many references at once *
+
+        scores, types, values = Relevance.compute_many(
+            amount      = 10000,
+            compared_to = [50000, 20000, 10000],
+            story_types = ["discrete", "over_one_year", "discrete"])
+
+    `compared_to` is a sequence of values and `story_types` is either a sequence of the same length
+    or a type shared by every value. It returns three numpy arrays, the nth items give the same
+    (score, type, value) as `compute` does for the nth value.
+
     """
 
     # CONSTANTES
@@ -89,8 +104,7 @@ class Relevance:
 
     def compute(self, amount, compared_to, story_type="discrete", **extra_fields):
         """ choose the right processor related to the nature of the reference (discrete or over_one_year etc...) """
-        import processors
-        processor = eval("processors.%s.SubProcessor()" % story_type)
+        processor = registry.get(story_type)
         relevance = processor.compute(float(amount), float(compared_to), **extra_fields)
         if relevance:
             self.__set_values(*relevance.values())
@@ -98,6 +112,32 @@ class Relevance:
             self.__set_values(0)
         return self.values()
 
+    @classmethod
+    def compute_many(cls, amount, compared_to, story_types="discrete"):
+        """ batch version of `compute`, each processor computes the values of its story type at once """
+        amount      = float(amount)
+        compared_to = numpy.asarray(compared_to, dtype=float)
+        if (compared_to == 0).any():
+            raise ZeroDivisionError("float division by zero")
+        if isinstance(story_types, basestring):
+            story_types = [story_types] * len(compared_to)
+        story_types           = numpy.asarray(story_types, dtype=object)
+        scores, types, values = cls.empty_many(len(compared_to))
+        # validate all the types before computing anything
+        processors = dict((story_type, registry.get(story_type)) for story_type in set(story_types))
+        for story_type, processor in processors.items():
+            selection = story_types == story_type
+            scores[selection], types[selection], values[selection] = \
+                processor.compute_many(amount, compared_to[selection])
+        return scores, types, values
+
+    @staticmethod
+    def empty_many(size):
+        """ return (scores, types, values) arrays of `size` items without relevance """
+        return (numpy.zeros(size, dtype=int),
+                numpy.empty(size, dtype=object),
+                numpy.empty(size, dtype=object))
+
     def values(self):
         """ return the score and the value as a tuple """
         return (self.score, self.type, self.value)
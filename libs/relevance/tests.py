@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+# Encoding: utf-8
+# -----------------------------------------------------------------------------
+# Project : OKF - Spending Stories
+# -----------------------------------------------------------------------------
+# Author : Edouard Richard                                  <edou4rd@gmail.com>
+# -----------------------------------------------------------------------------
+# License : GNU General Public License
+# -----------------------------------------------------------------------------
+# Creation : 18-Oct-2026
+# Last mod : 18-Oct-2026
+# -----------------------------------------------------------------------------
+# This file is part of Spending Stories.
+# 
+#     Spending Stories is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+# 
+#     Spending Stories is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+# 
+#     You should have received a copy of the GNU General Public License
+#     along with Spending Stories.  If not, see <http://www.gnu.org/licenses/>.
+
+from relevance import Relevance
+from processor import Processor
+from registry  import registry, register_processor, UnknownStoryType
+from index     import RatioBandIndex
+import benchmark
+import unittest
+import tempfile
+import shutil
+import random
+import os
+
+class RelevanceTestCase(unittest.TestCase):
+    """
+    Test the relevance library without the database
+    """
+
+    def test_compute_many_matches_compute(self):
+        for story_type in ("discrete", "over_one_year"):
+            for x in range(20):
+                amount      = random.randint(1,200) * int("1" + "0" * random.randint(1,9))
+                # mix random references with references close to the nice ratios
+                factors     = (1, 0.5, 2, 3, 5, 9, 0.1, 0.05, 0.37, 12, 52, 365.25)
+                compared_to = [random.uniform(1, 1e10) for _ in range(50)]
+                compared_to += [amount * random.choice(factors) * random.uniform(0.97, 1.03) for _ in range(50)]
+                scores, types, values = Relevance.compute_many(amount, compared_to, story_type)
+                for i, reference in enumerate(compared_to):
+                    expected = Relevance().compute(amount, reference, story_type)
+                    self.assertEquals((scores.tolist()[i], types[i], values[i]), expected, (amount, reference))
+
+    def test_compute_many_mixed_types(self):
+        scores, types, values = Relevance.compute_many(100, [100, 200, 50], ["discrete", "over_one_year", "discrete"])
+        self.assertEquals(scores.tolist(), [10, 9, 8])
+        self.assertEquals(types.tolist(), [Relevance.RELEVANCE_TYPE_EQUIVALENT, Relevance.RELEVANCE_TYPE_HALF, Relevance.RELEVANCE_TYPE_MULTIPLE])
+        self.assertEquals(values.tolist(), [1, 0.5, 2])
+
+    def test_index_candidates(self):
+        references = [(i, 10 ** random.uniform(2, 11), random.choice(registry.story_types())) for i in range(2000)]
+        index      = RatioBandIndex(references)
+        self.assertEquals(len(index), len(references))
+        for x in range(20):
+            amount     = random.randint(1,200) * int("1" + "0" * random.randint(1,9))
+            candidates = index.candidates(amount)
+            scores, types, values = Relevance.compute_many(amount, [r[1] for r in references], [r[2] for r in references])
+            relevants  = set(references[i][0] for i, score in enumerate(scores) if score > 0)
+            self.assertTrue(relevants <= set(candidates))
+            # the candidates are a small part of the references
+            self.assertLess(len(candidates), len(references) / 4)
+
+    def test_benchmark(self):
+        amounts, compared_to = benchmark.grid(5)
+        self.assertEquals((len(amounts), len(compared_to)), (25, 25))
+        results = benchmark.run(size=5, story_types=["discrete", "over_one_year"], repeat=1)
+        self.assertEquals([(r["story_type"], r["name"]) for r in results[:4]],
+            [("discrete", name) for name in ("compute", "processor.compute", "nice_equivalence", "compute_many")])
+        for result in results:
+            self.assertEquals(result["calls"], 25)
+            self.assertGreater(result["ns_per_call"], 0)
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, "compute.pstats")
+            self.assertIn("compute", benchmark.profile(results[0]["function"], benchmark.arguments(amounts, compared_to, False), path))
+            self.assertTrue(os.path.exists(path))
+        finally:
+            shutil.rmtree(directory)
+
+    def test_registry(self):
+        for story_type in ("discrete", "over_one_year", "per_population"):
+            self.assertIn(story_type, registry.story_types())
+            # one instance per story type
+            self.assertIs(registry.get(story_type), registry.get(story_type))
+        self.assertRaises(UnknownStoryType, Relevance().compute, 10, 20, "unknown")
+        self.assertRaises(UnknownStoryType, Relevance.compute_many, 10, [20, 30], ["discrete", "unknown"])
+
+    def test_register_processor(self):
+        @register_processor("test_always_equivalent")
+        class AlwaysEquivalent(Processor):
+            def compute(self, amount, compared_to, *args, **kwargs):
+                return Relevance(10, Relevance.RELEVANCE_TYPE_EQUIVALENT, 1)
+        try:
+            self.assertEquals(Relevance().compute(10, 500, "test_always_equivalent"), (10, Relevance.RELEVANCE_TYPE_EQUIVALENT, 1))
+            scores, types, values = Relevance.compute_many(10, [500, 20], "test_always_equivalent")
+            self.assertEquals(scores.tolist(), [10, 10])
+        finally:
+            del registry.processors["test_always_equivalent"]
+
+if __name__ == "__main__":
+    unittest.main()
+
+# EOF
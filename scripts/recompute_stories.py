@@ -8,7 +8,7 @@
 # License : GNU General Public License
 # -----------------------------------------------------------------------------
 # Creation : 23-Oct-2013
-# Last mod : 23-Oct-2013
+# Last mod : 18-Oct-2026
 # -----------------------------------------------------------------------------
 # This file is part of Spending Stories.
 # 
@@ -26,19 +26,17 @@
 #     along with Spending Stories.  If not, see <http://www.gnu.org/licenses/>.
 
 """
-Recompute all the stories
+Recompute all the stories, see `manage.py recompute_stories`
 """
 
 import os
 from django.conf import settings
-from webapp.core.models import Story
+from django.core import management
 
 os.environ['PYTHONPATH'] = ROOT_PATH = settings.ROOT_PATH
 
 if __name__ == "__main__":
-    for story in Story.objects.all():
-        story.set_current_value()
-        story.save()
+    management.call_command('recompute_stories')
     exit()
 
 # EOF
@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+# Encoding: utf-8
+# -----------------------------------------------------------------------------
+# Project : OKF - Spending Stories
+# -----------------------------------------------------------------------------
+# Author : Edouard Richard                                  <edou4rd@gmail.com>
+# -----------------------------------------------------------------------------
+# License : GNU General Public License
+# -----------------------------------------------------------------------------
+# Creation : 18-Oct-2026
+# Last mod : 18-Oct-2026
+# -----------------------------------------------------------------------------
+# This file is part of Spending Stories.
+# 
+#     Spending Stories is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+# 
+#     Spending Stories is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+# 
+#     You should have received a copy of the GNU General Public License
+#     along with Spending Stories.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Conditional GET for the api, driven by the data versions (see `webapp.core.versions`).
+The validators only depend on the request and on the versions, which are in the cache:
+a client which already has the data gets a 304 before any query or serialization.
+"""
+
+from django.utils.http       import http_date, parse_etags, parse_http_date_safe, quote_etag
+from rest_framework          import exceptions
+from rest_framework.response import Response
+from webapp.core             import versions
+import hashlib
+
+class NotModified(exceptions.APIException):
+    status_code = 304
+    detail      = None
+
+class ConditionalMixin(object):
+    """
+    Gives the GET responses of a view a strong ETag and a Last-Modified derived from the
+    versions of `version_models`, and answers `If-None-Match`/`If-Modified-Since` with a 304.
+    """
+
+    # models which the responses depend on
+    version_models = ()
+
+    def get_versions(self):
+        return versions.get(*self.version_models)
+
+    def get_last_modified(self):
+        if not self.version_models:
+            return None
+        return versions.modified(*self.version_models)
+
+    def get_etag(self, request):
+        """ the same data for the same request (url and media type) gives the same etag """
+        signature = "|".join(map(unicode, (self.__class__.__name__, request.get_full_path(),
+            request.accepted_media_type, self.get_versions())))
+        return quote_etag(hashlib.md5(signature.encode('utf-8')).hexdigest())
+
+    def is_not_modified(self, request, etag, last_modified):
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if if_none_match:
+            etags = parse_etags(if_none_match)
+            return '*' in etags or etag.strip('"') in etags
+        if_modified_since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+        return bool(last_modified and if_modified_since and int(last_modified) <= if_modified_since)
+
+    def initial(self, request, *args, **kwargs):
+        super(ConditionalMixin, self).initial(request, *args, **kwargs)
+        self.etag = self.last_modified = None
+        if request.method in ('GET', 'HEAD'):
+            self.etag          = self.get_etag(request)
+            self.last_modified = self.get_last_modified()
+            if self.is_not_modified(request, self.etag, self.last_modified):
+                raise NotModified()
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModified):
+            return Response(status=exc.status_code)
+        return super(ConditionalMixin, self).handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super(ConditionalMixin, self).finalize_response(request, response, *args, **kwargs)
+        if getattr(self, 'etag', None) and response.status_code in (200, 304):
+            response['ETag'] = self.etag
+            if self.last_modified:
+                response['Last-Modified'] = http_date(self.last_modified)
+        return response
+
+# EOF
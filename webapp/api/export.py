@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+# Encoding: utf-8
+# -----------------------------------------------------------------------------
+# Project : OKF - Spending Stories
+# -----------------------------------------------------------------------------
+# Author : Edouard Richard                                  <edou4rd@gmail.com>
+# -----------------------------------------------------------------------------
+# License : GNU General Public License
+# -----------------------------------------------------------------------------
+# Creation : 18-Oct-2026
+# Last mod : 18-Oct-2026
+# -----------------------------------------------------------------------------
+# This file is part of Spending Stories.
+# 
+#     Spending Stories is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+# 
+#     Spending Stories is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+# 
+#     You should have received a copy of the GNU General Public License
+#     along with Spending Stories.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Export of the stories in CSV and NDJSON (one JSON object by line), streamed
+by chunks of primary keys in constant memory. A chunk takes one query for the
+stories and one for their themes. The columns are the ones `import_stories` reads.
+"""
+
+from rest_framework.utils.encoders import JSONEncoder
+from webapp.core.models            import Story
+import streaming
+import StringIO
+import json
+import csv
+
+COLUMNS = ('id', 'title', 'value', 'currency', 'country', 'year', 'type', 'lang', 'sticky', 'source',
+    'description', 'extras', 'current_value', 'current_value_usd', 'inflation_last_year', 'created_at', 'themes')
+
+def chunks(queryset, size=streaming.CHUNK_SIZE):
+    """ yield the stories of the queryset by lists of dicts of `COLUMNS`, `currency` is its code and `themes` the slugs """
+    for chunk in streaming.chunks(queryset, size):
+        themes = {}
+        for story_id, theme_id in Story.themes.through.objects.filter(story__in=chunk.values('pk')).values_list('story_id', 'theme_id'):
+            themes.setdefault(story_id, []).append(theme_id)
+        rows = list(chunk.values(*COLUMNS[:-1]).iterator())
+        for row in rows:
+            row['themes'] = themes.get(row['id'], [])
+        yield rows
+
+def encode(value):
+    if value is None:
+        return ''
+    if isinstance(value, list):
+        return ",".join(value).encode('utf-8')
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    if isinstance(value, float):
+        # unicode() keeps 12 significant digits, repr() all the digits of the float
+        return repr(value)
+    return unicode(value).encode('utf-8')
+
+def render_csv(chunks):
+    """ yield a CSV file by pieces, with a header """
+    buffer = StringIO.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(COLUMNS)
+    for rows in chunks:
+        for row in rows:
+            writer.writerow([encode(row[column]) for column in COLUMNS])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+def render_ndjson(chunks):
+    """ yield a NDJSON file by pieces """
+    for rows in chunks:
+        if rows:
+            yield "".join(json.dumps(row, cls=JSONEncoder) + "\n" for row in rows)
+
+def render(format, queryset):
+    return (render_csv if format == 'csv' else render_ndjson)(chunks(queryset))
+
+# EOF
@@ -8,7 +8,7 @@
 # License : GNU General Public License
 # -----------------------------------------------------------------------------
 # Creation : 14-Aug-2013
-# Last mod : 14-Aug-2013
+# Last mod : 18-Oct-2026
 # -----------------------------------------------------------------------------
 # This file is part of Spending Stories.
 # 
@@ -25,7 +25,46 @@
 #     You should have received a copy of the GNU General Public License
 #     along with Spending Stories.  If not, see <http://www.gnu.org/licenses/>.
 
-# 
-#  - This empty file is needed to run tests
-# 
+
+from django.db.models.signals import post_save, pre_delete, post_delete, m2m_changed
+from webapp.core.models       import Story, Theme, changed_on_save
+import payloads
+
+# -----------------------------------------------------------------------------
+#
+#    PAYLOADS (keep the pre-rendered stories up to date)
+#
+# -----------------------------------------------------------------------------
+def refresh_story(sender, instance, raw=False, **kwargs):
+    if not raw and changed_on_save(instance):
+        payloads.refresh(Story.objects.filter(pk=instance.pk))
+
+def refresh_story_themes(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse and action == 'pre_clear':
+        # `theme.story_set.clear()` doesn't give the stories
+        instance._cleared_story_pks = list(instance.story_set.values_list('pk', flat=True))
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        # a story without payload yet (i.e loaded by a fixture) will be rendered at its first read
+        payloads.refresh(Story.objects.filter(pk=instance.pk).exclude(payload=''))
+    else:
+        payloads.refresh(Story.objects.filter(pk__in=pk_set or getattr(instance, '_cleared_story_pks', ())))
+
+def refresh_theme_stories(sender, instance, raw=False, **kwargs):
+    if not raw and changed_on_save(instance):
+        payloads.refresh(instance.story_set.all())
+
+def remember_theme_stories(sender, instance, **kwargs):
+    instance._story_pks = list(instance.story_set.values_list('pk', flat=True))
+
+def refresh_deleted_theme_stories(sender, instance, **kwargs):
+    payloads.refresh(Story.objects.filter(pk__in=getattr(instance, '_story_pks', ())))
+
+post_save  .connect(refresh_story                , sender=Story)
+m2m_changed.connect(refresh_story_themes         , sender=Story.themes.through)
+post_save  .connect(refresh_theme_stories        , sender=Theme)
+pre_delete .connect(remember_theme_stories       , sender=Theme)
+post_delete.connect(refresh_deleted_theme_stories, sender=Theme)
+
 # EOF
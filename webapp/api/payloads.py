@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+# Encoding: utf-8
+# -----------------------------------------------------------------------------
+# Project : OKF - Spending Stories
+# -----------------------------------------------------------------------------
+# Author : Edouard Richard                                  <edou4rd@gmail.com>
+# -----------------------------------------------------------------------------
+# License : GNU General Public License
+# -----------------------------------------------------------------------------
+# Creation : 18-Oct-2026
+# Last mod : 18-Oct-2026
+# -----------------------------------------------------------------------------
+# This file is part of Spending Stories.
+# 
+#     Spending Stories is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+# 
+#     Spending Stories is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+# 
+#     You should have received a copy of the GNU General Public License
+#     along with Spending Stories.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Pre-rendered JSON of the stories (`Story.payload` and `Story.payload_nested`).
+The listings concatenate these fragments instead of serializing the stories.
+The payloads are regenerated when a story or its themes change (see `webapp.api.models`),
+and can be regenerated with `manage.py refresh_payloads`.
+The fields which depend on the rates of the currencies (`LIVE_FIELDS`) aren't in the
+payloads, they are added when the payloads are read: new rates don't render the stories again.
+"""
+
+from rest_framework.utils.encoders import JSONEncoder
+from webapp.core.models            import Story
+from webapp.currency.models        import Currency
+from webapp.core                   import bulk, versions
+import serializers
+import streaming
+import json
+
+# payload field of the stories for each serializer
+SERIALIZERS = (
+    ('payload'       , serializers.StorySerializer),
+    ('payload_nested', serializers.StoryNestedSerializer),
+)
+
+# fields of the payloads given by the current rates, see `rows`
+LIVE_FIELDS = {
+    'payload'        : ('current_value_usd',),
+    'payload_nested' : ('current_value_usd', 'currency'),
+}
+
+def render(row):
+    """ return the JSON fragment of a serialized story """
+    return json.dumps(row, cls=JSONEncoder)
+
+def refresh(queryset):
+    """
+    Regenerate the payloads of the stories of the queryset, return the number of stories.
+    The transaction is the one of the caller (i.e: the save of the stories).
+    """
+    count = 0
+    for chunk in streaming.chunks(queryset):
+        payloads = {}
+        for field, serializer_class in SERIALIZERS:
+            for row in serializers.StoryValuesSerializer(serializer_class).serialize(chunk):
+                for name in LIVE_FIELDS[field]:
+                    del row[name]
+                payloads.setdefault(row['id'], {})[field] = render(row)
+        bulk.bulk_update(Story, payloads, [field for field, serializer_class in SERIALIZERS])
+        count += len(payloads)
+    return count
+
+class CurrencyFragments(object):
+    """
+    JSON fragments of the serialized currencies, rendered again when the version of the currencies changes
+    """
+
+    def __init__(self):
+        self.fragments = {}
+        self.version   = None
+
+    def current(self):
+        version = versions.get(Currency)
+        if self.version != version:
+            serializer     = serializers.CurrencySerializer()
+            self.fragments = dict((currency.pk, render(serializer.to_native(currency))) for currency in Currency.objects.all())
+            self.version   = version
+        return self.fragments
+
+    def clear(self):
+        self.fragments = {}
+        self.version   = None
+
+currency_fragments = CurrencyFragments()
+
+def rows(queryset, field):
+    """
+    Return the (pk, payload) of the stories of the queryset, in the order of the queryset
+    (by primary key if it isn't ordered, as the streamed listings), with their `LIVE_FIELDS`.
+    The missing payloads (stories saved before the payloads existed) are generated on the fly.
+    """
+    if not queryset.ordered:
+        # the order of the rows would depend on the index chosen by the database
+        queryset = queryset.order_by('pk')
+    columns = ('pk', field, 'current_value_usd', 'currency')
+    rows    = list(queryset.values_list(*columns))
+    missing = [row[0] for row in rows if not row[1]]
+    if missing:
+        for i in range(0, len(missing), streaming.CHUNK_SIZE):
+            refresh(Story.objects.filter(pk__in=missing[i:i + streaming.CHUNK_SIZE]))
+        rows = list(queryset.values_list(*columns))
+    currencies = currency_fragments.current() if 'currency' in LIVE_FIELDS[field] else None
+    return [(pk, complete(payload, value_usd, currency, currencies)) for pk, payload, value_usd, currency in rows]
+
+def complete(payload, value_usd, currency, currencies=None):
+    """ add the `LIVE_FIELDS` to a payload, the currency is nested if the `currencies` fragments are given """
+    fields = ', "current_value_usd": %s' % render(value_usd)
+    if currencies is not None:
+        fields += ', "currency": %s' % currencies.get(currency, 'null')
+    return payload[:-1] + fields + "}"
+
+def fragments(queryset, field):
+    """ return the payloads of the stories of the queryset, in the order of `rows` """
+    return [payload for pk, payload in rows(queryset, field)]
+
+def with_fields(fragment, **fields):
+    """ add the given fields to a JSON fragment of a story """
+    return fragment[:-1] + "".join(', %s: %s' % (render(key), render(value)) for key, value in sorted(fields.items())) + "}"
+
+class Fragments(object):
+    """
+    A list of JSON fragments rendered as a JSON array by `renderers.FragmentsJSONRenderer`.
+    It behaves like the decoded list when it is read in python (by the tests or the browsable api).
+    """
+
+    def __init__(self, fragments):
+        self.fragments = fragments
+        self._decoded  = None
+
+    def render(self):
+        return "[" + ",".join(self.fragments) + "]"
+
+    def decoded(self):
+        if self._decoded is None:
+            self._decoded = json.loads(self.render())
+        return self._decoded
+
+    def __len__(self):
+        return len(self.fragments)
+
+    def __iter__(self):
+        return iter(self.decoded())
+
+    def __getitem__(self, index):
+        return self.decoded()[index]
+
+    def __eq__(self, other):
+        return self.decoded() == list(other)
+
+    def __ne__(self, other):
+        return not self == other
+
+# EOF
@@ -0,0 +1,162 @@
+#!/usr/bin/env python
+# Encoding: utf-8
+# -----------------------------------------------------------------------------
+# Project : OKF - Spending Stories
+# -----------------------------------------------------------------------------
+# Author : Edouard Richard                                  <edou4rd@gmail.com>
+# -----------------------------------------------------------------------------
+# License : GNU General Public License
+# -----------------------------------------------------------------------------
+# Creation : 18-Oct-2026
+# Last mod : 18-Oct-2026
+# -----------------------------------------------------------------------------
+# This file is part of Spending Stories.
+# 
+#     Spending Stories is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+# 
+#     Spending Stories is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+# 
+#     You should have received a copy of the GNU General Public License
+#     along with Spending Stories.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Relevance ranking of the stories
+"""
+
+from django.conf            import settings
+from webapp.core.models     import Story, Theme
+from webapp.currency.models import Currency
+from webapp.core            import versions
+from relevance              import Relevance, RatioBandIndex
+from caching                import LRUCache
+from webapp                 import timing
+import payloads
+import collections
+import threading
+import heapq
+import math
+
+# ranked results of the last searches, see `StoryViewSet.list`
+results_cache = LRUCache(getattr(settings, 'API_RELEVANCE_CACHE_SIZE', 128))
+
+# maximum size of the `pk__in` lookups
+QUERY_CHUNK   = 500
+
+# divisor of the relevance value which gives the exact ratio amount/value of the relevance
+RATIO_UNITS   = {
+    Relevance.RELEVANCE_TYPE_PERCENTAGE : 100.,
+    Relevance.RELEVANCE_TYPE_DAY        : 365.25,
+    Relevance.RELEVANCE_TYPE_WEEK       : 52.,
+    Relevance.RELEVANCE_TYPE_MONTH      : 12.,
+}
+
+Ranked = collections.namedtuple('Ranked', 'pk score type value')
+
+class StoryIndex(object):
+    """
+    RatioBandIndex of the public stories, rebuilt when the version of the stories changes
+    """
+
+    def __init__(self):
+        self.index   = None
+        self.version = None
+        self.lock    = threading.Lock()
+
+    def current(self):
+        """ return the index, up to date with the stories """
+        version = versions.get(Story)
+        if self.version != version:
+            with self.lock:
+                if self.version != version:
+                    self.index   = RatioBandIndex(Story.objects.public().values_list('pk', 'current_value_usd', 'type'))
+                    self.version = version
+        return self.index
+
+    def clear(self):
+        with self.lock:
+            self.index   = None
+            self.version = None
+
+story_index = StoryIndex()
+
+def normalize_amount(amount):
+    """ quantize the amount to 12 significant digits, so that 1e6 and 1000000.0 are the same search """
+    return float("%.12g" % float(amount))
+
+def results_key(view, request, amount, limit=None, min_score=0):
+    """ return the key of the ranked results in `results_cache` """
+    filters = tuple((field, tuple(sorted(request.QUERY_PARAMS.getlist(field)))) for field in view.filter_fields)
+    return (view.__class__.__name__, amount, limit, min_score, filters, versions.get(Story, Theme, Currency))
+
+def deviation(amount, value_usd, relevance_type, relevance_value):
+    """ distance on a log scale between the ratio amount/value and the exact ratio of the relevance """
+    if amount <= 0 or value_usd <= 0:
+        return float("inf")
+    expected = float(relevance_value or 1) / RATIO_UNITS.get(relevance_type, 1)
+    return abs(math.log(amount / value_usd / expected))
+
+def rank(amount, queryset, limit=None, min_score=0):
+    """
+    Return the stories of the queryset ranked by relevance for the given amount, as `Ranked` tuples.
+    Only the `limit` best stories are selected (with a heap) if it is given. Ties are broken by
+    the sticky flag, then by the closeness of the ratio to the relevance, then by the primary key.
+    Only the candidates of the index are computed, the other stories have a score of 0 and aren't
+    even loaded when `min_score` is positive.
+    """
+    fields     = ('pk', 'current_value_usd', 'type', 'sticky')
+    candidates = story_index.current().candidates(amount)
+    if min_score > 0:
+        rows = []
+        for i in range(0, len(candidates), QUERY_CHUNK):
+            rows.extend(queryset.filter(pk__in=candidates[i:i + QUERY_CHUNK]).values_list(*fields))
+        computed = rows
+    else:
+        rows       = list(queryset.values_list(*fields))
+        candidates = set(candidates)
+        computed   = [row for row in rows if row[0] in candidates]
+    with timing.measure('relevance'):
+        scores, types, values = Relevance.compute_many(
+            amount      = amount,
+            compared_to = [row[1] for row in computed],
+            story_types = [row[2] for row in computed])
+    with timing.measure('sort'):
+        relevances = dict((row[0], relevance) for row, relevance in zip(computed, zip(scores.tolist(), types, values)))
+        entries    = []
+        for pk, value_usd, story_type, sticky in rows:
+            score, _type, value = relevances.get(pk, (0, None, None))
+            if score >= min_score:
+                closeness = -deviation(amount, value_usd, _type, value)
+                entries.append((score, sticky, closeness, -pk, Ranked(pk, score, _type, value)))
+        if limit:
+            entries = heapq.nlargest(limit, entries)
+        else:
+            entries.sort(reverse=True)
+    return [entry[-1] for entry in entries]
+
+def fragments(queryset, ranked, field):
+    """
+    Return the payloads (`field`) of the stories of the ranking, in the ranking order
+    and with their relevance fields.
+    """
+    if len(ranked) > QUERY_CHUNK:
+        stories = dict(payloads.rows(queryset, field))
+    else:
+        stories = dict(payloads.rows(queryset.filter(pk__in=[relevance.pk for relevance in ranked]), field))
+    data    = []
+    for relevance in ranked:
+        story = stories.get(relevance.pk)
+        # the story may have been deleted since the ranking
+        if story is not None:
+            data.append(payloads.with_fields(story,
+                relevance_score = relevance.score,
+                relevance_type  = relevance.type,
+                relevance_value = relevance.value))
+    return data
+
+# EOF
@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+# Encoding: utf-8
+# -----------------------------------------------------------------------------
+# Project : OKF - Spending Stories
+# -----------------------------------------------------------------------------
+# Author : Edouard Richard                                  <edou4rd@gmail.com>
+# -----------------------------------------------------------------------------
+# License : GNU General Public License
+# -----------------------------------------------------------------------------
+# Creation : 18-Oct-2026
+# Last mod : 18-Oct-2026
+# -----------------------------------------------------------------------------
+# This file is part of Spending Stories.
+# 
+#     Spending Stories is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+# 
+#     Spending Stories is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+# 
+#     You should have received a copy of the GNU General Public License
+#     along with Spending Stories.  If not, see <http://www.gnu.org/licenses/>.
+
+from rest_framework.renderers import JSONRenderer, BaseRenderer
+from payloads                 import Fragments
+import json
+
+class FragmentsJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer which renders the `payloads.Fragments` by concatenation,
+    without decoding them. They are decoded only to be indented.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, Fragments):
+            indent = (renderer_context or {}).get('indent')
+            if indent is None and 'indent=' not in (accepted_media_type or ''):
+                return data.render().encode(self.charset)
+            data = data.decoded()
+        return super(FragmentsJSONRenderer, self).render(data, accepted_media_type, renderer_context)
+
+class ExportRenderer(BaseRenderer):
+    """
+    Renderer of the exports (see `export`), which are streamed by the view:
+    only the responses without stories (i.e errors) are rendered here, in JSON.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return ''
+        return json.dumps(data)
+
+class CSVRenderer(ExportRenderer):
+    media_type = 'text/csv'
+    format     = 'csv'
+
+class NDJSONRenderer(ExportRenderer):
+    media_type = 'application/x-ndjson'
+    format     = 'ndjson'
+
+# EOF
@@ -8,7 +8,7 @@
 # License : GNU General Public License
 # -----------------------------------------------------------------------------
 # Creation : 06-Aug-2013
-# Last mod : 15-Aug-2013
+# Last mod : 18-Oct-2026
 # -----------------------------------------------------------------------------
 # This file is part of Spending Stories.
 # 
@@ -26,6 +26,9 @@
 #     along with Spending Stories.  If not, see <http://www.gnu.org/licenses/>.
 
 from rest_framework import serializers 
+from rest_framework.fields import ModelField
+from django.utils.datastructures import SortedDict
+from django.utils.encoding import is_protected_type, smart_text
 from webapp.currency.models import Currency
 from webapp.core.models import Story, Theme, Page
 
@@ -36,7 +39,7 @@ class ThemeSerializer(serializers.ModelSerializer):
 
     def get_image(self, obj):
         """ return the absolute image url """
-        return obj.image.url
+        return obj.image.url if obj.image else None
 
 class CurrencySerializer(serializers.ModelSerializer):
     class Meta:
@@ -44,13 +47,97 @@ class CurrencySerializer(serializers.ModelSerializer):
 
 class StorySerializer(serializers.ModelSerializer):
     class Meta:
-        model = Story
+        model   = Story
+        exclude = Story.PAYLOAD_FIELDS
 
 class StoryNestedSerializer(StorySerializer):
     themes   = ThemeSerializer(many=True, read_only=True)
     currency = CurrencySerializer(read_only=True)
     class Meta:
-        model = Story
+        model   = Story
+        exclude = Story.PAYLOAD_FIELDS
+
+class StoryValuesSerializer(object):
+    """
+    Read-only fast path of a story serializer (StorySerializer or StoryNestedSerializer).
+    It works on `values()` rows instead of model instances and gives the same representation.
+    The themes of the stories are loaded with one query, the nested themes and currencies
+    are loaded and serialized once per serializer, and everything is joined in memory:
+    a list takes a constant number of queries. Used to render the payloads of the stories.
+
+        StoryValuesSerializer(StoryNestedSerializer).serialize(Story.objects.public())
+    """
+
+    def __init__(self, serializer_class, context=None):
+        self.serializer = serializer_class(context=context)
+        for field_name, field in self.serializer.fields.items():
+            field.initialize(parent=self.serializer, field_name=field_name)
+        self.nested_themes     = self.nested('themes')
+        self.nested_currencies = self.nested('currency')
+        # serialized nested objects, by model and primary key
+        self.loaded            = {Theme: {}, Currency: {}}
+        # only the columns of the serialized fields are loaded
+        concrete_fields        = set(field.name for field in Story._meta.local_fields)
+        self.columns           = ['id'] + [name for name in self.serializer.fields if name in concrete_fields and name != 'id']
+
+    def nested(self, field_name):
+        """ return the field if it is a nested serializer, None otherwise """
+        field = self.serializer.fields[field_name]
+        if isinstance(field, serializers.BaseSerializer):
+            return field
+        return None
+
+    def load(self, field, model, pks):
+        """ return the objects serialized by the nested `field`, by primary key, loaded if needed """
+        loaded  = self.loaded[model]
+        missing = set(pks) - set(loaded)
+        if missing:
+            for obj in model.objects.filter(pk__in=missing):
+                loaded[obj.pk] = field.to_native(obj)
+        return loaded
+
+    def serialize(self, queryset):
+        """ return the list of the serialized stories of the queryset """
+        queryset   = queryset.prefetch_related(None)
+        rows       = list(queryset.values(*self.columns))
+        if not rows:
+            return []
+        themes     = self.stories_themes(queryset)
+        currencies = None
+        if self.nested_currencies is not None:
+            currencies = self.load(self.nested_currencies, Currency, set(row['currency'] for row in rows))
+        return [self.to_native(row, themes, currencies) for row in rows]
+
+    def stories_themes(self, queryset):
+        """ return the themes of the stories of the queryset, as {story_id: [theme, ...]} """
+        links  = list(Story.themes.through.objects
+            .filter(story__in=queryset.values('pk'))
+            .values_list('story_id', 'theme_id'))
+        if self.nested_themes is not None:
+            nested = self.load(self.nested_themes, Theme, set(theme_id for story_id, theme_id in links))
+            links  = [(story_id, nested.get(theme_id)) for story_id, theme_id in links]
+        themes = {}
+        for story_id, theme in links:
+            themes.setdefault(story_id, []).append(theme)
+        return themes
+
+    def to_native(self, row, themes, currencies=None):
+        data = SortedDict()
+        for field_name, field in self.serializer.fields.items():
+            if field_name == 'themes':
+                value = themes.get(row['id'], [])
+            elif field_name == 'currency':
+                value = row['currency']
+                if currencies is not None:
+                    value = currencies.get(value)
+            elif isinstance(field, ModelField):
+                value = row[field_name]
+                if not is_protected_type(value):
+                    value = smart_text(value)
+            else:
+                value = field.to_native(row[field.source or field_name])
+            data[self.serializer.get_field_key(field_name)] = value
+        return data
 
 class PageSerializer(serializers.ModelSerializer):
     class Meta:
@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+# Encoding: utf-8
+# -----------------------------------------------------------------------------
+# Project : OKF - Spending Stories
+# -----------------------------------------------------------------------------
+# Author : Edouard Richard                                  <edou4rd@gmail.com>
+# -----------------------------------------------------------------------------
+# License : GNU General Public License
+# -----------------------------------------------------------------------------
+# Creation : 18-Oct-2026
+# Last mod : 18-Oct-2026
+# -----------------------------------------------------------------------------
+# This file is part of Spending Stories.
+# 
+#     Spending Stories is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+# 
+#     Spending Stories is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+# 
+#     You should have received a copy of the GNU General Public License
+#     along with Spending Stories.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Streaming of the JSON lists of the api, in constant memory
+"""
+
+from django.http import StreamingHttpResponse
+
+# number of objects loaded and serialized at once
+CHUNK_SIZE = 500
+
+class StreamingMixin(object):
+    """ allows the views of rest_framework to return streaming responses """
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if isinstance(response, StreamingHttpResponse):
+            for key, value in self.headers.items():
+                response[key] = value
+            return response
+        return super(StreamingMixin, self).finalize_response(request, response, *args, **kwargs)
+
+def pk_ranges(queryset, size=CHUNK_SIZE):
+    """ iterate over the (first, last) primary keys of chunks of `size` objects at most of the queryset """
+    queryset = queryset.order_by('pk')
+    last_pk  = None
+    while True:
+        page = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        pks  = list(page.values_list('pk', flat=True)[:size])
+        if not pks:
+            break
+        yield pks[0], pks[-1]
+        last_pk = pks[-1]
+
+def chunks(queryset, size=CHUNK_SIZE):
+    """ iterate over the queryset by querysets of `size` objects at most, ordered by primary key """
+    queryset = queryset.order_by('pk')
+    for first, last in pk_ranges(queryset, size):
+        yield queryset.filter(pk__gte=first, pk__lte=last)
+
+def ranked_chunks(ranked, size=CHUNK_SIZE):
+    """ iterate over a ranking by lists of `size` items """
+    for i in range(0, len(ranked), size):
+        yield ranked[i:i + size]
+
+def json_array(chunks):
+    """ yield a JSON array by pieces, from an iterator over lists of JSON fragments """
+    yield "["
+    separator = ""
+    for fragments in chunks:
+        if fragments:
+            yield separator + ",".join(fragments)
+            separator = ","
+    yield "]"
+
+def response(chunks):
+    """ return a response streaming the JSON fragments given by lists """
+    return StreamingHttpResponse(json_array(chunks), content_type="application/json")
+
+# EOF
@@ -8,7 +8,7 @@
 # License : GNU General Public License
 # -----------------------------------------------------------------------------
 # Creation : 14-Aug-2013
-# Last mod : 11-Oct-2013
+# Last mod : 18-Oct-2026
 # -----------------------------------------------------------------------------
 # This file is part of Spending Stories.
 # 
@@ -26,17 +26,41 @@
 #     along with Spending Stories.  If not, see <http://www.gnu.org/licenses/>.
 
 from django.conf                     import settings
-from django.test                     import TestCase
+from django.test                     import TestCase, SimpleTestCase
+from django.db                       import connection
+from django.db.backends              import util
 from django.test.client              import Client
-from webapp.core.models              import Story
+from django.test.utils               import override_settings
+from django.core.cache               import get_cache
+from webapp.core.models              import Story, Theme, StoryStats, Page
+from webapp.core.admin               import set_status
+from webapp.core                     import recompute
+from webapp.core                     import importer
+from webapp.core                     import synthetic
+from webapp.core                     import versions
+from django.db.models                import Max, Min
 from webapp.currency.models          import Currency
 from django.contrib.auth.models      import User
 from rest_framework.authtoken.models import Token
 from operator                        import itemgetter
 from pprint                          import pprint as pp
+from webapp.api.caching              import LRUCache
+from webapp.api                      import ranking
+from webapp.api                      import payloads
+from webapp.api                      import views
+from webapp                          import timing
 from relevance                       import Relevance
+import inflation
+import webapp.core.fields
+import tempfile
+import shutil
+import os
 import random
 import warnings
+import json
+import csv
+import pstats
+import StringIO
 
 class APIStoryTestCase(TestCase):
     """
@@ -46,6 +70,8 @@ class APIStoryTestCase(TestCase):
     fixtures = ['api_dataset.json',]
 
     def setUp(self):
+        # the caches of the process don't depend on the previous tests
+        views.clear_caches()
         # Every test needs a client.
         staff_user             = User.objects.filter(is_staff=True)[0]
         staff_token,   created = Token.objects.get_or_create(user=staff_user)
@@ -102,9 +128,50 @@ class APIStoryTestCase(TestCase):
         response = self.client.get('/api/stories-nested/')
         self.assertEquals(response.status_code, 200, response)
         assert len(response.data) > 0
+        # listed by primary key, whatever the index used by the database
+        self.assertEquals([story['id'] for story in response.data], sorted(story['id'] for story in response.data))
         for story in response.data:
             assert story['status'] == 'published', "This story souldn't be there: %s" % story
 
+    def test_api_story_nested_list_queries(self):
+        # the fixtures are loaded without payloads
+        payloads.refresh(Story.objects.all())
+        # themes choices of the filters, the payloads and the currencies (rendered once)
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/stories-nested/')
+        count = len(response.data)
+        story = Story.objects.public()[0]
+        pks   = []
+        for x in range(3):
+            story.pk                = None
+            story.current_value_usd = None
+            story.save()
+            story.themes.add(*Theme.objects.all()[:2])
+            pks.append(story.pk)
+        # the same queries, whatever the number of stories
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/stories-nested/')
+        self.assertEquals(len(response.data), count + 3)
+        stories = dict((data['id'], data) for data in response.data)
+        for pk in pks:
+            self.assertEquals(len(stories[pk]['themes']), 2)
+            self.assertEquals(stories[pk]['currency']['iso_code'], story.currency_id)
+
+    def test_api_story_payloads(self):
+        # the payloads are the serialized stories, up to date with the stories and their themes
+        for url in ('/api/stories/', '/api/stories-nested/'):
+            response = self.client.get(url)
+            story    = filter(lambda x: x['id'] == self.story_fr.pk, response.data)[0]
+            self.assertEquals(story, json.loads(self.client.get('%s%s/' % (url, self.story_fr.pk)).content))
+        theme = Theme.objects.public()[0]
+        self.story_fr.themes.add(theme)
+        theme.title = "A new title"
+        theme.save()
+        response = self.client.get('/api/stories-nested/')
+        story    = filter(lambda x: x['id'] == self.story_fr.pk, response.data)[0]
+        self.assertEquals([t['title'] for t in story['themes']], [theme.title])
+        self.assertEquals(json.loads(response.content), list(response.data))
+
     def test_api_story_nested_retrieve(self):
         story    = Story.objects.public()[0]
         response = self.client.get('/api/stories-nested/%s/' % story.pk)
@@ -181,6 +248,372 @@ class APIStoryTestCase(TestCase):
         self.assertIsNotNone(lang)
         self.assertGreater(len(lang), 0)
 
+    def test_filter_list_queries(self):
+        url       = '/api/filters/?lang=fr_FR'
+        countries = lambda: [c[0] for c in webapp.core.fields.COUNTRIES
+            if Story.objects.public().filter(lang='fr_FR', country=c[0]).exists()]
+        # currencies, themes and countries, then cached
+        with self.assertNumQueries(3):
+            response = self.client.get(url)
+        with self.assertNumQueries(0):
+            self.assertEquals(self.client.get(url).data, response.data)
+        self.assertEquals([c['key'] for c in response.data['country']], countries())
+        # invalidated by a write
+        story = Story.objects.public().exclude(lang='fr_FR')[0]
+        story.country, story.lang = 'C09', 'fr_FR'
+        story.save()
+        response = self.client.get(url)
+        self.assertIn('C09', [c['key'] for c in response.data['country']])
+        self.assertEquals([c['key'] for c in response.data['country']], countries())
+
+    def test_meta(self):
+        def expected():
+            stories = Story.objects.public()
+            meta    = stories.aggregate(Max('current_value_usd'), Min('current_value_usd'))
+            meta['count'] = stories.count()
+            return meta
+        def check():
+            with self.assertNumQueries(1):
+                response = self.client.get('/api/meta/')
+            for key, value in expected().items():
+                self.assertAlmostEqual(response.data[key], value)
+            for lang, stats in response.data['lang'].items():
+                self.assertEquals(stats['count'], Story.objects.public().filter(lang=lang).count())
+            return response
+        # built at the first read
+        self.client.get('/api/meta/')
+        check()
+        # a new maximum
+        story = Story.objects.public()[0]
+        story.pk, story.value, story.current_value_usd = None, expected()['current_value_usd__max'] * 10, None
+        story.save()
+        self.assertEquals(check().data['lang'][story.lang]['current_value_usd__max'], story.current_value_usd)
+        # unpublished by an admin action, then deleted
+        set_status(Story.objects.filter(pk=story.pk), 'refused')
+        check()
+        set_status(Story.objects.filter(pk=story.pk), 'published')
+        check()
+        # the stats count the same stories as `public` (the status updated without the stats)
+        for status, label in Story._meta.get_field('status').choices + (('published', None),):
+            Story.objects.filter(pk=story.pk).update(status=status)
+            story = Story.objects.get(pk=story.pk)
+            self.assertEquals(story.stats_entry() is not None, Story.objects.public().filter(pk=story.pk).exists())
+        check()
+        story.delete()
+        check()
+        data = check().data
+        StoryStats.objects.rebuild()
+        self.assertEquals(check().data, data)
+
+    def test_recompute_stories(self):
+        # the fixture has been computed with another CPI
+        failed = recompute.recompute(Story.objects.all())['failed']
+        self.client.get('/api/meta/')
+        pks = [story.pk for story in Story.objects.public().exclude(pk__in=failed)[:3]]
+        Story.objects.filter(pk__in=pks).update(current_value=1, current_value_usd=1, inflation_last_year=1990)
+        payloads.refresh(Story.objects.filter(pk__in=pks))
+        StoryStats.objects.rebuild()
+        # nothing is written in a dry run
+        summary = recompute.recompute(Story.objects.all(), dry_run=True, chunk_size=7)
+        self.assertEquals(summary['changed'], 3)
+        self.assertEquals(summary['count'], Story.objects.count())
+        self.assertEquals(Story.objects.get(pk=pks[0]).current_value_usd, 1)
+        summary = recompute.recompute(Story.objects.all(), chunk_size=7)
+        self.assertEquals(summary['changed'], 3)
+        for story in Story.objects.filter(pk__in=pks):
+            amount, year = inflation.get_inflation(story.value, story.year, Story.INFLATION_COUNTRY)
+            self.assertAlmostEqual(story.current_value, amount)
+            self.assertAlmostEqual(story.current_value_usd, amount / story.currency.rate)
+            self.assertEquals(story.inflation_last_year, year)
+            self.assertAlmostEqual(json.loads(story.payload)['current_value'], story.current_value)
+        # same as computed one by one
+        data = self.client.get('/api/meta/').data
+        StoryStats.objects.rebuild()
+        self.assertEquals(self.client.get('/api/meta/').data, data)
+        self.assertEquals(recompute.recompute(Story.objects.all())['changed'], 0)
+
+    def test_recompute_interrupted(self):
+        failed = recompute.recompute(Story.objects.all())['failed']
+        pks    = list(Story.objects.public().exclude(pk__in=failed).order_by('pk').values_list('pk', flat=True))
+        Story.objects.filter(pk__in=pks).update(current_value=1, current_value_usd=1, inflation_last_year=1990)
+        StoryStats.objects.rebuild()
+        version = versions.get(Story)
+        def progress(done, total, elapsed):
+            raise ValueError("interrupted")
+        # the first chunk is written, with its stats and a new version, before the failure
+        self.assertRaises(ValueError, recompute.recompute, Story.objects.filter(pk__in=pks), chunk_size=2, progress=progress)
+        self.assertEquals(Story.objects.filter(pk__in=pks, current_value_usd=1).count(), len(pks) - 2)
+        self.assertNotEquals(versions.get(Story), version)
+        stats = StoryStats.objects.as_dict()
+        StoryStats.objects.rebuild()
+        self.assertEquals(StoryStats.objects.as_dict(), stats)
+
+    def test_convert_rates(self):
+        story    = Story.objects.public().filter(currency__in=Currency.objects.all())[0]
+        currency = story.currency
+        others   = dict(Story.objects.exclude(currency=currency).values_list('pk', 'current_value_usd'))
+        summary  = recompute.convert({currency.pk: currency.rate * 2})
+        self.assertEquals(summary['currencies'], 1)
+        self.assertEquals(summary['stories'], Story.objects.filter(currency=currency).count())
+        self.assertEquals(Currency.objects.get(pk=currency.pk).rate, currency.rate * 2)
+        StoryStats.objects.rebuild()
+        stats    = StoryStats.objects.as_dict()
+        summary  = recompute.convert({currency.pk: currency.rate * 4})
+        listed   = dict((row['id'], row) for row in self.client.get('/api/stories-nested/').data)
+        for story in Story.objects.filter(currency=currency):
+            self.assertAlmostEqual(story.current_value_usd, story.current_value / (currency.rate * 4))
+            if story.status == 'published':
+                # the payloads don't change, the values in USD and the rates are added when they are read
+                self.assertNotIn('current_value_usd', json.loads(story.payload))
+                self.assertAlmostEqual(listed[story.pk]['current_value_usd'], story.current_value_usd)
+                self.assertEquals(listed[story.pk]['currency']['rate'], currency.rate * 4)
+        self.assertIn(story.pk, listed)
+        # the stats are updated as if they were built again
+        stats    = StoryStats.objects.as_dict()
+        StoryStats.objects.rebuild()
+        self.assertEquals(StoryStats.objects.as_dict(), stats)
+        self.assertEquals(dict(Story.objects.exclude(currency=currency).values_list('pk', 'current_value_usd')), others)
+        self.assertEquals(recompute.convert({})['stories'], 0)
+
+    def test_loaded_values(self):
+        story = Story.objects.public()[0]
+        self.assertEquals(story.changed_fields(), set())
+        story.title = "changed"
+        self.assertEquals(story.changed_fields(), set(['title']))
+        # the inflation isn't computed again
+        story.current_value_usd = 123.
+        story.save()
+        self.assertEquals(story.changed_fields(), set())
+        self.assertEquals(Story.objects.get(pk=story.pk).current_value_usd, 123.)
+        # compared by currency code
+        story.currency = Currency.objects.exclude(pk=story.currency_id)[0]
+        self.assertEquals(story.changed_fields(), set(['currency_id']))
+        story.save()
+        self.assertAlmostEqual(story.current_value_usd, story.current_value / story.currency.rate)
+        # a copy is a new story, even with its computed values
+        story.pk = None
+        self.assertIsNone(story.loaded_values())
+        story.save()
+        self.assertEquals(Story.objects.filter(title="changed").count(), 2)
+        # a loaded object is saved with the UPDATE only
+        page = Page.objects.get(pk=Page.objects.create(title="page", content="content").pk)
+        with self.assertNumQueries(1):
+            page.save()
+        # without a change, neither the payloads nor the stats nor the version are updated
+        story   = Story.objects.public()[0]
+        version = versions.get(Story)
+        with self.assertNumQueries(1):
+            story.save()
+        self.assertEquals(versions.get(Story), version)
+        story.title = "changed again"
+        story.save()
+        self.assertNotEquals(versions.get(Story), version)
+        self.assertEquals(json.loads(Story.objects.get(pk=story.pk).payload)['title'], "changed again")
+        # deleted since loaded: inserted again
+        StoryStats.objects.rebuild()
+        story = Story.objects.public()[0]
+        Story.objects.filter(pk=story.pk).delete()
+        story.title = "saved after its deletion"
+        story.save()
+        self.assertTrue(story.reinserted)
+        self.assertEquals(Story.objects.get(pk=story.pk).title, "saved after its deletion")
+        stats = StoryStats.objects.as_dict()
+        StoryStats.objects.rebuild()
+        self.assertEquals(StoryStats.objects.as_dict(), stats)
+
+    def test_import_stories(self):
+        lines = [
+            'title,value,currency,country,year,source,type,themes',
+            'Imported,1000000,EUR,C09,2005,http://example.com/a,discrete,"%s"' % ", ".join(Theme.objects.public().values_list('pk', flat=True)[:2]),
+            'Unknown currency,1000,XXX,C09,2005,http://example.com/b,,',
+            'Unknown year,1000,EUR,C09,1800,http://example.com/c,,',
+            '"Imported, too",2.5e6,usd,000,2010,http://example.com/d,over_one_year,',
+            ',abc,EUR,ZZZ,2010,not an url,,unknown-theme',
+        ]
+        count   = Story.objects.count()
+        _import = importer.Importer(status='published', chunk_size=2)
+        _import.run(importer.read(iter(line + '\n' for line in lines), 'csv'))
+        self.assertEquals(_import.imported, 2)
+        self.assertEquals([line for line, errors in _import.rejects], [3, 4, 6])
+        self.assertEquals(len(_import.rejects[-1][1]), 5)
+        self.assertEquals(Story.objects.count(), count + 2)
+        story = Story.objects.get(title="Imported")
+        self.assertEquals(story.themes.count(), 2)
+        amount, year = inflation.get_inflation(1000000, 2005, Story.INFLATION_COUNTRY)
+        self.assertAlmostEqual(story.current_value_usd, amount / story.currency.rate)
+        self.assertEquals(json.loads(story.payload)['themes'], list(story.themes.values_list('pk', flat=True)))
+        self.assertEquals(Story.objects.get(title="Imported, too").currency_id, 'USD')
+        # the same file, as NDJSON
+        _import = importer.Importer(dry_run=True)
+        _import.run(importer.read(iter([json.dumps({'title': 'Imported', 'value': 10, 'currency': 'EUR', 'country': 'C09',
+            'year': 2005, 'source': 'http://example.com/a', 'themes': ['unknown-theme']}), '{"title": ']), 'ndjson'))
+        self.assertEquals([line for line, errors in _import.rejects], [1, 2])
+        self.assertEquals(Story.objects.count(), count + 2)
+
+    def test_import_duplicated_stories(self):
+        # rows with the same title and source get their own story and their own themes
+        themes  = list(Theme.objects.public().values_list('pk', flat=True)[:2])
+        lines   = ['title,value,currency,country,year,source,themes'] + [
+            'Duplicated,%d,EUR,C09,2005,http://example.com/a,%s' % (value, theme) for value, theme in zip((1000, 2000), themes)]
+        _import = importer.Importer(status='published')
+        for i in range(2):
+            _import.run(importer.read(iter(line + '\n' for line in lines), 'csv'))
+        stories = Story.objects.filter(title="Duplicated").order_by('pk')
+        self.assertEquals([story.value for story in stories], [1000, 2000] * 2)
+        self.assertEquals([list(story.themes.values_list('pk', flat=True)) for story in stories], [[theme] for theme in themes] * 2)
+
+    def test_export(self):
+        stories = Story.objects.public()
+        for url, count in (('/api/stories/export.csv', stories.count()),
+                           ('/api/stories/export.csv?type=over_one_year', stories.filter(type='over_one_year').count())):
+            # the choices of the themes filter, then the stories of a chunk, their themes and the end of the chunks
+            with self.assertNumQueries(5 if count else 2):
+                response = self.client.get(url)
+                content  = "".join(response.streaming_content)
+            self.assertEquals(response['Content-Type'], 'text/csv; charset=utf-8')
+            rows = list(csv.DictReader(StringIO.StringIO(content)))
+            self.assertEquals(len(rows), count)
+        for row in rows:
+            story = Story.objects.get(pk=row['id'])
+            self.assertEquals(row['title'].decode('utf-8'), story.title)
+            self.assertEquals(row['currency'], story.currency_id)
+            self.assertEquals(row['themes'].split(',') if row['themes'] else [], list(story.themes.values_list('pk', flat=True)))
+        # the floats keep all their digits
+        story = stories.order_by('pk')[0]
+        Story.objects.filter(pk=story.pk).update(current_value_usd=1234567.891234567)
+        rows  = csv.DictReader(StringIO.StringIO("".join(self.client.get('/api/stories/export.csv').streaming_content)))
+        self.assertEquals(float(next(rows)['current_value_usd']), 1234567.891234567)
+        response = self.client.get('/api/stories/export.ndjson?type=over_one_year')
+        self.assertEquals(response['Content-Type'], 'application/x-ndjson; charset=utf-8')
+        rows = [json.loads(line) for line in "".join(response.streaming_content).splitlines()]
+        self.assertEquals([row['id'] for row in rows], list(stories.filter(type='over_one_year').order_by('pk').values_list('pk', flat=True)))
+
+    def test_synthetic_stories(self):
+        stories, themes = Story.objects.count(), Theme.objects.count()
+        self.assertEquals(synthetic.create_themes(3), 3)
+        self.assertEquals(synthetic.create_themes(4), 1)
+        _import = synthetic.create(50, synthetic.new_source(), status='published', seed=1)
+        self.assertEquals(_import.imported, 50)
+        self.assertEquals(Story.objects.filter(source__startswith=synthetic.SOURCE_PREFIX).count(), 50)
+        self.assertTrue(Story.objects.filter(themes__slug__startswith=synthetic.THEME_PREFIX).exists())
+        self.assertEquals(len(self.client.get('/api/stories/').data), Story.objects.public().count())
+        synthetic.remove()
+        self.assertEquals((Story.objects.count(), Theme.objects.count()), (stories, themes))
+
+    def test_server_timing(self):
+        timing.stats.clear()
+        response = self.client.get('/api/stories/?relevance_for=1e6&limit=5')
+        metrics  = [entry.split(';')[0] for entry in response['Server-Timing'].split(', ')]
+        self.assertEquals(metrics, ['total', 'sql', 'serialize', 'relevance', 'sort'])
+        self.assertIn('sql;dur=', response['Server-Timing'])
+        self.assertIsNone(timing.current())
+        # the queries are read with the debug cursor during the request only
+        self.assertFalse(connection.use_debug_cursor)
+        self.assertNotIn('execute', util.CursorWrapper.__dict__)
+        self.client.get('/api/meta/')
+        self.assertEquals(self.regular_client.get('/api/_stats/').status_code, 403)
+        self.assertIn(self.client.get('/api/_stats/').status_code, (401, 403))
+        response = self.staff_client.get('/api/_stats/')
+        self.assertEquals(response.status_code, 200)
+        stats = response.data['endpoints']
+        self.assertEquals(stats['stories-list']['requests'], 1)
+        self.assertGreater(stats['stories-list']['queries']['max'], 0)
+        self.assertGreater(stats['stories-list']['relevance']['p50'], 0)
+        self.assertEquals(stats['meta-list']['relevance']['max'], 0)
+        self.assertIn('hits', response.data['relevance_cache'])
+        self.assertIn('source', response.data['inflation'])
+
+    def test_profile_request(self):
+        timing.stats.clear()
+        url = '/api/stories/?relevance_for=1e6&_profile=cprofile'
+        for client in (self.client, self.regular_client):
+            response = client.get(url)
+            self.assertTrue(response['Content-Type'].startswith('application/json'))
+            self.assertEquals(len(response.data), Story.objects.public().count())
+        ranking.results_cache.clear()
+        response = self.staff_client.get(url + '&_profile_sort=tottime')
+        self.assertEquals(response.status_code, 200)
+        self.assertEquals(response['Content-Type'], 'text/plain; charset=utf-8')
+        self.assertIn('Ordered by: internal time', response.content)
+        self.assertIn('compute_many', response.content)
+        self.assertIn('SELECT', response.content.split('SQL')[-1])
+        response = self.staff_client.get('/api/stories/?_profile=pstats')
+        self.assertEquals(response['Content-Type'], 'application/octet-stream')
+        path = os.path.join(tempfile.mkdtemp(), 'request.pstats')
+        try:
+            with open(path, 'wb') as stats:
+                stats.write(response.content)
+            self.assertGreater(pstats.Stats(path).total_calls, 0)
+        finally:
+            shutil.rmtree(os.path.dirname(path))
+        # the profiled requests are not in the stats of the endpoints
+        self.assertEquals(self.staff_client.get('/api/_stats/').data['endpoints']['stories-list']['requests'], 2)
+
+    def test_versions_between_processes(self):
+        # another process (i.e: a management command) has its own instance of the shared cache
+        other    = get_cache('default')
+        self.assertIsNot(other, versions.cache)
+        url      = '/api/stories/'
+        etag     = self.client.get(url)['ETag']
+        index    = ranking.story_index.current()
+        filters  = self.client.get('/api/filters/?lang=fr_FR').data
+        self.assertEquals(filters['country'], [])
+        # a write without signals, as the set-based updates
+        country  = webapp.core.fields.COUNTRIES[0][0]
+        Story.objects.filter(pk=Story.objects.public()[0].pk).update(lang='fr_FR', country=country)
+        cache    = versions.cache
+        versions.cache = other
+        try:
+            versions.bump(Story)
+        finally:
+            versions.cache = cache
+        self.assertEquals(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        self.assertIsNot(ranking.story_index.current(), index)
+        self.assertEquals([entry['key'] for entry in self.client.get('/api/filters/?lang=fr_FR').data['country']], [country])
+
+    def test_clear_caches(self):
+        cache = get_cache('default')
+        lang  = settings.LANGUAGES[0][0]
+        cache.set('unrelated', 1)
+        self.client.get('/api/filters/?lang=%s' % lang)
+        self.client.get('/api/stories/?relevance_for=1e6')
+        self.assertIsNotNone(cache.get(views.FiltersViewSet.cache_key(lang)))
+        views.clear_caches()
+        self.assertIsNone(cache.get(views.FiltersViewSet.cache_key(lang)))
+        self.assertEquals(ranking.results_cache.stats()['size'], 0)
+        self.assertEquals(cache.get('unrelated'), 1)
+
+    def test_conditional_get(self):
+        for url in ('/api/stories/', '/api/stories-nested/?lang=fr_FR', '/api/themes/', '/api/currencies/',
+                    '/api/meta/', '/api/filters/', '/api/countries/', '/api/languages/', '/api/pages/'):
+            response = self.client.get(url)
+            etag     = response['ETag']
+            # answered before any query
+            with self.assertNumQueries(0):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEquals(response.status_code, 304, url)
+            self.assertEquals(response.content, '')
+            if response.has_header('Last-Modified'):
+                response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+                self.assertEquals(response.status_code, 304, url)
+        # another request has its own etag
+        url      = '/api/stories/'
+        etag     = self.client.get(url)['ETag']
+        self.assertNotEqual(self.client.get(url + '?lang=fr_FR')['ETag'], etag)
+        # a write changes the etag
+        self.story_fr.title = "A new title"
+        self.story_fr.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEquals(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertIn("A new title", [story['title'] for story in response.data])
+
+    def test_choices_etag_by_language(self):
+        with override_settings(LANGUAGES=(('es', "Spanish"), ('en', "English"))):
+            etags = [self.client.get('/api/countries/', HTTP_ACCEPT_LANGUAGE=lang)['ETag'] for lang in ('es', 'en', 'es')]
+        self.assertNotEqual(etags[0], etags[1])
+        self.assertEquals(etags[0], etags[2])
+
     def test_language_list(self):
         response = self.client.get('/api/languages/')
         self.assertIsNotNone(response.data)
@@ -194,6 +627,67 @@ class APIStoryTestCase(TestCase):
 
 
 
+    def test_api_relevances_order(self):
+        response = self.client.get("/api/stories/?relevance_for=%s" % (self.story_fr.current_value_usd * 2))
+        self.assertEquals(response.status_code, 200)
+        scores = [story['relevance_score'] for story in response.data]
+        self.assertEquals(len(scores), Story.objects.public().count())
+        self.assertEquals(scores, sorted(scores, reverse=True))
+        story_fr = filter(lambda x: x['id'] == self.story_fr.pk, response.data)[0]
+        self.assertEquals(story_fr['relevance_type'], Relevance.RELEVANCE_TYPE_MULTIPLE)
+        self.assertEquals(story_fr['relevance_value'], 2)
+
+    def test_api_relevances_after_update(self):
+        # the index of the stories follows the changes
+        self.story_fr.value = self.story_fr.value * 10
+        self.story_fr.save()
+        response = self.client.get("/api/stories/?relevance_for=%s" % self.story_fr.current_value_usd)
+        story_fr = filter(lambda x: x['id'] == self.story_fr.pk, response.data)[0]
+        self.assertEquals(story_fr['relevance_type'], Relevance.RELEVANCE_TYPE_EQUIVALENT)
+
+    def test_api_relevances_cache(self):
+        url      = "/api/stories/?lang=fr_FR&relevance_for=%s"
+        hits     = ranking.results_cache.hits
+        response = self.client.get(url % "1e6")
+        # same search with another notation
+        self.assertEquals(self.client.get(url % "1000000.0").data, response.data)
+        self.assertEquals(ranking.results_cache.hits, hits + 1)
+        # a write invalidates the cached results
+        self.story_fr.value = 1e6
+        self.story_fr.save()
+        response = self.client.get(url % "1e6")
+        self.assertEquals(ranking.results_cache.hits, hits + 1)
+        story_fr = filter(lambda x: x['id'] == self.story_fr.pk, response.data)[0]
+        self.assertEquals(story_fr['value'], 1e6)
+
+    def test_api_relevances_limit(self):
+        amount   = self.story_fr.current_value_usd * 2
+        full     = self.client.get("/api/stories/?relevance_for=%s" % amount).data
+        response = self.client.get("/api/stories/?relevance_for=%s&limit=3" % amount)
+        self.assertEquals(response.status_code, 200)
+        self.assertEquals(len(response.data), 3)
+        self.assertEquals([story['id'] for story in response.data], [story['id'] for story in full[:3]])
+        response = self.client.get("/api/stories/?relevance_for=%s&min_score=8" % amount)
+        self.assertEquals([story['id'] for story in response.data],
+            [story['id'] for story in full if story['relevance_score'] >= 8])
+        self.assertIn(self.story_fr.pk, [story['id'] for story in response.data])
+        response = self.client.get("/api/stories/?relevance_for=%s&limit=-1" % amount)
+        self.assertEquals(response.status_code, 400)
+
+    def test_api_stream(self):
+        for url in ("/api/stories/", "/api/stories-nested/?lang=fr_FR", "/api/stories/?relevance_for=%s&limit=5" % self.story_fr.current_value_usd):
+            separator = "&" if "?" in url else "?"
+            response  = self.client.get(url + separator + "stream=true")
+            self.assertEquals(response.status_code, 200)
+            self.assertTrue(response.streaming)
+            streamed  = json.loads("".join(response.streaming_content))
+            if "relevance_for" in url:
+                expected = self.client.get(url).data
+            else:
+                expected = sorted(self.client.get(url).data, key=lambda story: story['id'])
+            self.assertEquals([story['id'] for story in streamed], [story['id'] for story in expected])
+            self.assertEquals(sorted(streamed[0].keys()), sorted(expected[0].keys()))
+
     def test_api_relevances(self):
         TOLERENCE = 97
         count     = {}
@@ -252,4 +746,20 @@ class APIStoryTestCase(TestCase):
         count = sorted(count.iteritems(), key=itemgetter(1), reverse=True)
         # pp(count[:5])
 
+class CachingTestCase(SimpleTestCase):
+    """
+    Test the caches of the api without the database
+    """
+
+    def test_lru_cache(self):
+        cache = LRUCache(2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        self.assertEquals(cache.get("a"), 1)
+        # "b" is the least recently used
+        cache.set("c", 3)
+        self.assertIsNone(cache.get("b"))
+        self.assertEquals(cache.get("c"), 3)
+        self.assertEquals(cache.stats(), {"size": 2, "max_size": 2, "hits": 2, "misses": 1, "evictions": 1})
+
 # EOF
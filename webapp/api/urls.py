@@ -8,7 +8,7 @@
 # License : GNU General Public License
 # -----------------------------------------------------------------------------
 # Creation : 06-Aug-2013
-# Last mod : 16-Aug-2013
+# Last mod : 18-Oct-2026
 # -----------------------------------------------------------------------------
 # This file is part of Spending Stories.
 # 
@@ -45,6 +45,8 @@ router.register(r'themes'              , views.ThemeViewSet       , base_name="t
 urlpatterns = patterns('',
     url(r'^api-auth/', include('rest_framework.urls', namespace='rest_framework')),
     url(r'^api-token-auth/', 'rest_framework.authtoken.views.obtain_auth_token'),
+    url(r'^_stats/$', views.StatsViewSet.as_view({'get': 'list'}), name="stats"),
+    url(r'^stories/export\.(?P<format>csv|ndjson)$', views.StoryExportViewSet.as_view({'get': 'list'}), name="stories-export"),
     url(r'^', include(router.urls))
 )
 # EOF
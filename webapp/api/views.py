@@ -8,7 +8,7 @@
 # License : GNU General Public License
 # -----------------------------------------------------------------------------
 # Creation : 06-Aug-2013
-# Last mod : 07-Oct-2013
+# Last mod : 18-Oct-2026
 # -----------------------------------------------------------------------------
 # This file is part of Spending Stories.
 #
@@ -25,19 +25,30 @@
 #     You should have received a copy of the GNU General Public License
 #     along with Spending Stories.  If not, see <http://www.gnu.org/licenses/>.
 
-from webapp.core.models      import Story, Theme, Page
+from webapp.core.models      import Story, Theme, Page, StoryStats
 from webapp.currency.models  import Currency
 from rest_framework          import viewsets
 from rest_framework          import filters
 from rest_framework.response import Response
 from rest_framework          import permissions
+from rest_framework          import status
+from rest_framework.renderers import BrowsableAPIRenderer
 from django.conf             import settings
-from django.db.models        import Max, Min
-from relevance               import Relevance
+from django.core.cache       import cache
+from webapp.core             import versions
+from webapp                  import timing
 from viewsets                import ChoicesViewSet
+from conditional             import ConditionalMixin
+from renderers               import FragmentsJSONRenderer, CSVRenderer, NDJSONRenderer
+from django.http             import StreamingHttpResponse
 
 import webapp.core.fields
 import serializers
+import streaming
+import payloads
+import ranking
+import export
+import inflation
 # -----------------------------------------------------------------------------
 #
 #    STORIES
@@ -62,15 +73,19 @@ class StoryPermission(permissions.BasePermission):
             else:
                 return False
 
-class StoryViewSet(viewsets.ModelViewSet):
+class StoryViewSet(ConditionalMixin, streaming.StreamingMixin, viewsets.ModelViewSet):
     """
     API endpoint that allows story to be viewed or edited.
     """
+    version_models     = (Story, Theme, Currency)
     queryset           = Story.objects.public()
     serializer_class   = serializers.StorySerializer
     filter_fields      = ('sticky', 'country', 'currency','type', 'title', 'themes', 'lang')
     filter_backends = (filters.DjangoFilterBackend,)
     permission_classes = (StoryPermission,)
+    renderer_classes   = (FragmentsJSONRenderer, BrowsableAPIRenderer)
+    # pre-rendered field of the stories used by the listings, see `payloads`
+    payload_field      = 'payload'
 
     def create(self, request, pk=None):
         # reset reserved field if not staff
@@ -81,21 +96,73 @@ class StoryViewSet(viewsets.ModelViewSet):
         return response
 
     def list(self, request, *args, **kwargs):
-        """ Contains the code to add the relevance if needed """
-        response      = super(StoryViewSet, self).list(request, *args, **kwargs)
+        """
+        Contains the code to add the relevance if needed.
+        With `relevance_for`, stories are sorted by relevance and can be limited
+        to the `limit` best ones and to the ones with a score >= `min_score`.
+        With `stream=true`, the JSON list is streamed by chunks of stories.
+        Stories are given by their pre-rendered payloads, they are not serialized here.
+        """
         relevance_for = request.QUERY_PARAMS.get('relevance_for')
-        if relevance_for:
-            for i, story in enumerate(response.data):
-                score, _type, value = Relevance().compute(
-                    amount      = relevance_for,
-                    compared_to = story['current_value_usd'],
-                    story_type  = story['type'])
-                story['relevance_score'] = score
-                story['relevance_type' ] = _type
-                story['relevance_value'] = value
-                response.data[i] = story
-            # order by relevance score
-            response.data = sorted(response.data, cmp=lambda x,y: cmp(y['relevance_score'], x['relevance_score']))
+        stream        = request.QUERY_PARAMS.get('stream') in ('1', 'true')
+        queryset      = self.filter_queryset(self.get_queryset())
+        if not relevance_for:
+            if stream:
+                return self.stream(queryset)
+            return Response(payloads.Fragments(payloads.fragments(queryset, self.payload_field)))
+        try:
+            amount    = ranking.normalize_amount(relevance_for)
+            limit     = int(request.QUERY_PARAMS.get('limit') or 0) or None
+            min_score = float(request.QUERY_PARAMS.get('min_score') or 0)
+            assert limit is None or limit > 0
+        except (ValueError, AssertionError):
+            return Response({'detail': "`relevance_for`, `limit` and `min_score` must be positive numbers"},
+                status=status.HTTP_400_BAD_REQUEST)
+        if stream:
+            # only the ranking is kept in memory
+            return self.stream(queryset, ranking.rank(amount, queryset, limit, min_score))
+        # ranked results are cached by amount, parameters and data versions
+        key  = ranking.results_key(self, request, amount, limit, min_score)
+        data = ranking.results_cache.get(key)
+        if data is None:
+            ranked = ranking.rank(amount, queryset, limit, min_score)
+            # load only the selected stories
+            data   = ranking.fragments(queryset, ranked, self.payload_field)
+            ranking.results_cache.set(key, data)
+        return Response(payloads.Fragments(data))
+
+    def stream(self, queryset, ranked=None):
+        """ return a response which streams the stories by chunks, in the order of `ranked` if given """
+        if ranked is None:
+            chunks = (payloads.fragments(chunk, self.payload_field) for chunk in streaming.chunks(queryset))
+        else:
+            chunks = (ranking.fragments(queryset, chunk, self.payload_field) for chunk in streaming.ranked_chunks(ranked))
+        return streaming.response(chunks)
+
+class StoryExportViewSet(ConditionalMixin, streaming.StreamingMixin, viewsets.GenericViewSet):
+    """
+    Export of the public stories in CSV or NDJSON, with the filters of the stories.
+    """
+    version_models     = (Story, Theme, Currency)
+    queryset           = Story.objects.public()
+    filter_fields      = StoryViewSet.filter_fields
+    filter_backends    = StoryViewSet.filter_backends
+    renderer_classes   = (CSVRenderer, NDJSONRenderer)
+
+    def perform_content_negotiation(self, request, force=False):
+        # the format is given by the extension, whatever the Accept header
+        renderer = [renderer for renderer in self.get_renderers() if renderer.format == self.kwargs.get('format')][0]
+        return renderer, renderer.media_type
+
+    def list(self, request, *args, **kwargs):
+        """
+        Stream the stories by chunks in the format given by the extension:
+        `/api/stories/export.csv` or `/api/stories/export.ndjson`.
+        """
+        format   = request.accepted_renderer.format
+        response = StreamingHttpResponse(export.render(format, self.filter_queryset(self.get_queryset())),
+            content_type="%s; charset=utf-8" % request.accepted_renderer.media_type)
+        response['Content-Disposition'] = 'attachment; filename="stories.%s"' % format
         return response
 
 class StoryNestedViewSet(StoryViewSet):
@@ -103,17 +170,20 @@ class StoryNestedViewSet(StoryViewSet):
     API endpoint that allows story to be viewed in a nested mode.
     """
 
+    queryset         = Story.objects.public().select_related('currency').prefetch_related('themes')
     serializer_class = serializers.StoryNestedSerializer
+    payload_field    = 'payload_nested'
 
 # -----------------------------------------------------------------------------
 #
 #    THEME
 #
 # -----------------------------------------------------------------------------
-class ThemeViewSet(viewsets.ReadOnlyModelViewSet):
+class ThemeViewSet(ConditionalMixin, viewsets.ReadOnlyModelViewSet):
     """
     API endpoint that allows Theme to be viewed or edited.
     """
+    version_models   = (Theme,)
     queryset         = Theme.objects.public()
     serializer_class = serializers.ThemeSerializer
 
@@ -122,10 +192,11 @@ class ThemeViewSet(viewsets.ReadOnlyModelViewSet):
 #    CURRENCY
 #
 # -----------------------------------------------------------------------------
-class CurrencyViewSet(viewsets.ReadOnlyModelViewSet):
+class CurrencyViewSet(ConditionalMixin, viewsets.ReadOnlyModelViewSet):
     """
     API endpoint that allows Currency to be viewed or edited.
     """
+    version_models   = (Currency,)
     queryset         = Currency.objects.all()
     serializer_class = serializers.CurrencySerializer
 
@@ -134,55 +205,92 @@ class CurrencyViewSet(viewsets.ReadOnlyModelViewSet):
 #    META
 #
 # -----------------------------------------------------------------------------
-class MetaViewSet(viewsets.ViewSet):
+class MetaViewSet(ConditionalMixin, viewsets.ViewSet):
+    version_models = (Story,)
 
     def list(self, request):
         """
-        Provide Meta data about Stories
+        Provide Meta data about Stories: count and bounds of `current_value_usd`,
+        overall and by language (`lang`) and type (`type`).
+        They are maintained by the StoryStats, not computed here.
         """
-        stories = Story.objects.public()
-        meta    =  {}
-        meta.update(stories.aggregate(Max('current_value_usd'), Min('current_value_usd')))
-        meta['count'] = stories.count()
-        return Response(meta)
+        return Response(StoryStats.objects.as_dict())
+
+# -----------------------------------------------------------------------------
+#
+#    STATS (of the processes, for the staff)
+#
+# -----------------------------------------------------------------------------
+class StatsViewSet(viewsets.ViewSet):
+    permission_classes = (permissions.IsAdminUser,)
+
+    def list(self, request):
+        """
+        Percentiles of the timings of the last requests by endpoint (see `webapp.timing`),
+        state of the relevance cache and of the CPI cache. They are kept by each process,
+        this is the state of the one which answers.
+        """
+        return Response({
+            'endpoints'       : timing.stats.as_dict(),
+            'relevance_cache' : ranking.results_cache.stats(),
+            'inflation'       : inflation.cache_stats(),
+        })
 
 # -----------------------------------------------------------------------------
 #
 #    FILTERS (which return results)
 #
 # -----------------------------------------------------------------------------
-class FiltersViewSet(viewsets.ViewSet):
+class FiltersViewSet(ConditionalMixin, viewsets.ViewSet):
+    version_models = (Story, Theme, Currency)
 
     def list(self, request):
         """
-        Provide countries, currencies and themes filters wich return results
+        Provide countries, currencies and themes filters wich return results.
+        They are cached by language until the next write of a story, a theme or a currency.
         """
+        lang    = request.QUERY_PARAMS.get('lang', settings.LANGUAGE_CODE)
+        if lang not in dict(settings.LANGUAGES):
+            return Response(self.get_filters(lang))
+        key     = self.cache_key(lang)
+        filters = cache.get(key)
+        if filters is None:
+            filters = self.get_filters(lang)
+            cache.set(key, filters, versions.TIMEOUT)
+        return Response(filters)
+
+    @staticmethod
+    def cache_key(lang):
+        """ the key of the filters of the language in the cache, for the current versions """
+        return "api-filters:%s:%s" % (lang, "-".join(map(str, versions.get(Story, Theme, Currency))))
+
+    def get_filters(self, lang):
+        """ compute the filters with one query per kind of filter """
         filters = {
             "currency" : [],
             "theme"    : [],
             "country"  : [],
             "lang"     : []
         }
-        lang = request.QUERY_PARAMS.get('lang', settings.LANGUAGE_CODE)
+        stories = Story.objects.public().filter(lang=lang)
         # currencies
-        currencies = Currency.objects.values("iso_code", "name")
+        currencies = Currency.objects.filter(iso_code__in=stories.values('currency')).values("iso_code", "name")
         for currency in currencies:
-            if Story.objects.public().filter(lang=lang, currency__iso_code=currency['iso_code']).count() > 0 :
-                filters['currency'].append({
-                        'key':currency['iso_code'],
-                        'value':currency['name']
-                })
+            filters['currency'].append({
+                    'key':currency['iso_code'],
+                    'value':currency['name']
+            })
         # themes
-        themes = Theme.objects.values("slug", "title")
+        themes = Theme.objects.filter(slug__in=stories.values('themes')).values("slug", "title")
         for theme in themes:
-            if Story.objects.public().filter(lang=lang, themes__slug=theme['slug']).count() > 0 :
-                filters['theme'].append({
-                        'key':theme['slug'],
-                        'value':theme['title']
-                })
+            filters['theme'].append({
+                    'key':theme['slug'],
+                    'value':theme['title']
+            })
         # countries
+        countries = set(stories.order_by().values_list('country', flat=True).distinct())
         for country in webapp.core.fields.COUNTRIES:
-            if Story.objects.public().filter(lang=lang, country=country[0]).count() > 0 :
+            if country[0] in countries:
                 filters['country'].append({
                         'key':country[0],
                         'value':country[1]
@@ -193,7 +301,17 @@ class FiltersViewSet(viewsets.ViewSet):
                     'key': language[0],
                     "value": language[1]
             })
-        return Response(filters)
+        return filters
+
+def clear_caches():
+    """
+    Forget the filters cached for the current versions and the caches of the process
+    (i.e: for a benchmark with cold caches), the other entries of the shared cache are kept.
+    """
+    cache.delete_many([FiltersViewSet.cache_key(lang) for lang, name in settings.LANGUAGES])
+    ranking.results_cache.clear()
+    ranking.story_index.clear()
+    payloads.currency_fragments.clear()
 
 # -----------------------------------------------------------------------------
 #
@@ -223,7 +341,8 @@ class LanguageViewSet(ChoicesViewSet):
 #    PAGES
 #
 # -----------------------------------------------------------------------------
-class PagesViewSet(viewsets.ReadOnlyModelViewSet):
+class PagesViewSet(ConditionalMixin, viewsets.ReadOnlyModelViewSet):
+    version_models   = (Page,)
     queryset = Page.objects.all()
     serializer_class = serializers.PageSerializer
     filter_fields      = ('slug',)
@@ -8,7 +8,7 @@
 # License : GNU General Public License
 # -----------------------------------------------------------------------------
 # Creation : 07-Oct-2013
-# Last mod : 07-Oct-2013
+# Last mod : 18-Oct-2026
 # -----------------------------------------------------------------------------
 # This file is part of Spending Stories.
 # 
@@ -25,14 +25,23 @@
 #     You should have received a copy of the GNU General Public License
 #     along with Spending Stories.  If not, see <http://www.gnu.org/licenses/>.
 
+from django.utils            import translation
 from rest_framework          import viewsets
 from rest_framework.response import Response
+from conditional             import ConditionalMixin
 
-class ChoicesViewSet(viewsets.ViewSet):
+class ChoicesViewSet(ConditionalMixin, viewsets.ViewSet):
     class Meta: 
         #  the choices as queryset 
         choices = None
 
+    # to bump when the choices change in the code
+    choices_version = 1
+
+    def get_versions(self):
+        # the choices only change with the code, their names with the language
+        return (self.choices_version, translation.get_language())
+
     def list(self,request):
         return Response(self.create_list(request))
 
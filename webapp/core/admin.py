@@ -8,7 +8,7 @@
 # License : GNU General Public License
 # -----------------------------------------------------------------------------
 # Creation : 06-Aug-2013
-# Last mod : 09-Aug-2013
+# Last mod : 18-Oct-2026
 # -----------------------------------------------------------------------------
 # This file is part of Spending Stories.
 # 
@@ -26,9 +26,13 @@
 #     along with Spending Stories.  If not, see <http://www.gnu.org/licenses/>.
 
 from django.contrib import admin
+from django.db import transaction
 from django.utils.translation import ugettext_lazy as _
 import models
 import forms
+import versions
+import recompute
+from webapp.api import payloads
 
 # -----------------------------------------------------------------------------
 #
@@ -46,20 +50,43 @@ class ThemeAdmin(admin.ModelAdmin):
 #    STORY
 #
 # -----------------------------------------------------------------------------
+def set_status(queryset, status):
+    # the queryset may be filtered by status, keep the selected stories
+    stories = models.Story.objects.filter(pk__in=list(queryset.values_list('pk', flat=True)))
+    changed = list(stories.exclude(status=status).only('status', 'lang', 'type', 'current_value_usd'))
+    with transaction.commit_on_success():
+        stories.update(status=status)
+        payloads.refresh(stories)
+        # update the stats with the stories which are published or unpublished
+        removed = [story.stats_entry() for story in changed]
+        for story in changed:
+            story.status = status
+        models.StoryStats.objects.remove(removed)
+        models.StoryStats.objects.add([story.stats_entry() for story in changed])
+    versions.bump(models.Story)
+
 def make_published(modeladmin, request, queryset):
-    queryset.update(status='published')
+    set_status(queryset, 'published')
 make_published.short_description = _("Mark selected contributions as published")
 
 def make_refused(modeladmin, request, queryset):
-    queryset.update(status='refused')
+    set_status(queryset, 'refused')
 make_refused.short_description = _("Mark selected contributions as refused")
 
 def make_pending(modeladmin, request, queryset):
-    queryset.update(status='pending')
+    set_status(queryset, 'pending')
 make_pending.short_description = _("Mark selected contributions as pending")
 
+def recompute_values(modeladmin, request, queryset):
+    summary = recompute.recompute(models.Story.objects.filter(pk__in=list(queryset.values_list('pk', flat=True))))
+    message = _("%(count)s contributions recomputed, %(changed)s changed") % summary
+    if summary['failed']:
+        message += ", " + _("%s can't be computed") % len(summary['failed'])
+    modeladmin.message_user(request, message)
+recompute_values.short_description = _("Recompute the current values of selected contributions")
+
 class StoryAdmin(admin.ModelAdmin):
-    actions           = [make_published, make_refused, make_pending]
+    actions           = [make_published, make_refused, make_pending, recompute_values]
     list_display      = ('title', 'value', 'current_value_usd', 'currency', 'country','year', 'sticky', 'created_at', 'type', 'lang', 'status')
     readonly_fields   = ('current_value', 'current_value_usd', 'inflation_last_year', 'created_at')
     search_fields     = ('title', 'value', 'current_value_usd', 'country')
@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+# Encoding: utf-8
+# -----------------------------------------------------------------------------
+# Project : OKF - Spending Stories
+# -----------------------------------------------------------------------------
+# Author : Edouard Richard                                  <edou4rd@gmail.com>
+# -----------------------------------------------------------------------------
+# License : GNU General Public License
+# -----------------------------------------------------------------------------
+# Creation : 18-Oct-2026
+# Last mod : 18-Oct-2026
+# -----------------------------------------------------------------------------
+# This file is part of Spending Stories.
+# 
+#     Spending Stories is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+# 
+#     Spending Stories is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+# 
+#     You should have received a copy of the GNU General Public License
+#     along with Spending Stories.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Bulk writes missing from the ORM of Django 1.5
+"""
+
+from django.db import connection, transaction
+
+# SQLite allows 999 parameters by statement
+MAX_PARAMETERS = 999
+
+def bulk_update(model, changes, fields):
+    """
+    Write the new values ({pk: {field: value}}) of the given fields with
+    UPDATE ... SET field = CASE pk WHEN ... END statements, in the current transaction.
+    """
+    qn      = connection.ops.quote_name
+    pk      = qn(model._meta.pk.column)
+    size    = max(MAX_PARAMETERS // (2 * len(fields) + 1), 1)
+    changes = changes.items()
+    for i in range(0, len(changes), size):
+        batch  = changes[i:i + size]
+        sets   = []
+        params = []
+        for field in fields:
+            sets.append("%s = CASE %s %s END" % (qn(model._meta.get_field(field).column), pk, " ".join(["WHEN %s THEN %s"] * len(batch))))
+            for key, values in batch:
+                params += [key, values[field]]
+        params += [key for key, values in batch]
+        connection.cursor().execute("UPDATE %s SET %s WHERE %s IN (%s)" % (
+            qn(model._meta.db_table), ", ".join(sets), pk, ", ".join(["%s"] * len(batch))), params)
+    # committed at once in autocommit mode, else with the transaction of the caller
+    transaction.commit_unless_managed()
+
+def bulk_insert(model, objs):
+    """
+    Insert the objects in the current transaction and set their primary keys, which
+    `bulk_create` doesn't give: PostgreSQL returns them (INSERT ... RETURNING), SQLite
+    gives the next rowids to the rows of a statement and locks the database until the
+    transaction ends, so the last rows are the inserted ones. Other backends save the
+    objects one by one.
+    """
+    if not objs:
+        return objs
+    vendor = connection.vendor
+    if vendor not in ('postgresql', 'sqlite'):
+        for obj in objs:
+            obj.save(force_insert=True)
+        return objs
+    qn     = connection.ops.quote_name
+    pk     = model._meta.pk
+    fields = [field for field in model._meta.local_fields if field != pk]
+    size   = max(MAX_PARAMETERS // len(fields), 1)
+    cursor = connection.cursor()
+    for i in range(0, len(objs), size):
+        batch  = objs[i:i + size]
+        params = []
+        for obj in batch:
+            params += [field.get_db_prep_save(field.pre_save(obj, True), connection=connection) for field in fields]
+        row = "(%s)" % ", ".join(["%s"] * len(fields))
+        sql = "INSERT INTO %s (%s) VALUES %s" % (qn(model._meta.db_table),
+            ", ".join(qn(field.column) for field in fields), ", ".join([row] * len(batch)))
+        if vendor == 'postgresql':
+            cursor.execute("%s RETURNING %s" % (sql, qn(pk.column)), params)
+            pks = [value for value, in cursor.fetchall()]
+        else:
+            cursor.execute(sql, params)
+            last = cursor.lastrowid
+            pks  = range(last - len(batch) + 1, last + 1)
+        for obj, value in zip(batch, pks):
+            setattr(obj, pk.attname, value)
+    transaction.commit_unless_managed()
+    return objs
+
+# EOF
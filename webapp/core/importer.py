@@ -0,0 +1,182 @@
+#!/usr/bin/env python
+# Encoding: utf-8
+# -----------------------------------------------------------------------------
+# Project : OKF - Spending Stories
+# -----------------------------------------------------------------------------
+# Author : Edouard Richard                                  <edou4rd@gmail.com>
+# -----------------------------------------------------------------------------
+# License : GNU General Public License
+# -----------------------------------------------------------------------------
+# Creation : 18-Oct-2026
+# Last mod : 18-Oct-2026
+# -----------------------------------------------------------------------------
+# This file is part of Spending Stories.
+# 
+#     Spending Stories is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+# 
+#     Spending Stories is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+# 
+#     You should have received a copy of the GNU General Public License
+#     along with Spending Stories.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Import of stories from CSV or NDJSON files (one JSON object by line), used by
+`manage.py import_stories`. The file is read as a stream and written by chunks:
+the rows of a chunk are validated, their values are computed at once (see
+`recompute.compute`), then the stories are inserted with `bulk.bulk_insert` and
+their themes with `bulk_create` in a transaction. The invalid rows are rejected, not imported.
+"""
+
+from django.core.exceptions import ValidationError
+from django.db              import transaction
+from webapp.api             import payloads, streaming
+from webapp.currency.models import Currency
+from models                 import Story, Theme, StoryStats
+import recompute
+import bulk
+import versions
+import json
+import csv
+
+# the columns of a file, besides `currency` (iso code) and `themes` (slugs)
+FIELDS   = ('title', 'value', 'description', 'country', 'source', 'type', 'status', 'sticky', 'year', 'lang', 'extras')
+REQUIRED = ('title', 'value', 'country', 'source', 'currency', 'year')
+FORMATS  = ('csv', 'ndjson')
+
+def read_csv(f):
+    """ yield the (line, row) of a CSV file with a header """
+    reader = csv.DictReader(f)
+    for row in reader:
+        yield reader.line_num, dict((key, value.decode('utf-8') if value else value) for key, value in row.items())
+
+def read_ndjson(f):
+    """ yield the (line, row) of a NDJSON file, row is None if the line isn't valid JSON """
+    for line, text in enumerate(f, 1):
+        if text.strip():
+            try:
+                yield line, json.loads(text)
+            except ValueError:
+                yield line, None
+
+def read(f, format):
+    return read_csv(f) if format == 'csv' else read_ndjson(f)
+
+def split_themes(themes):
+    """ themes are given as a list, or as a string separated by commas or spaces """
+    if isinstance(themes, basestring):
+        themes = themes.replace(',', ' ').split()
+    return list(themes or ())
+
+class Importer(object):
+    """
+    Imports the stories of the rows given to `run`.
+    `imported` counts the imported stories, `rejects` lists the (line, errors) of the rejected rows.
+    """
+
+    def __init__(self, status=None, chunk_size=streaming.CHUNK_SIZE, dry_run=False):
+        self.status     = status
+        self.chunk_size = chunk_size
+        self.dry_run    = dry_run
+        self.rates      = dict(Currency.objects.values_list('pk', 'rate'))
+        self.themes     = set(Theme.objects.public().values_list('pk', flat=True))
+        self.imported   = 0
+        self.rejects    = []
+
+    def clean(self, row):
+        """ return the values of the story and its themes, raise a ValidationError with all the errors of the row """
+        if not isinstance(row, dict):
+            raise ValidationError("a row should be a JSON object")
+        errors = []
+        values = {}
+        for name in FIELDS:
+            field = Story._meta.get_field(name)
+            raw   = row.get(name)
+            if raw in (None, ''):
+                if name in REQUIRED:
+                    errors.append("%s: required" % name)
+                else:
+                    values[name] = field.get_default()
+                continue
+            if name == 'extras' and not isinstance(raw, basestring):
+                raw = json.dumps(raw)
+            try:
+                values[name] = field.clean(raw, None)
+            except ValidationError as e:
+                errors.append("%s: %s" % (name, " ".join(e.messages)))
+        if values.get('extras'):
+            try:
+                json.loads(values['extras'])
+            except ValueError:
+                errors.append("extras: invalid JSON")
+        currency = (row.get('currency') or '').upper()
+        if not currency:
+            errors.append("currency: required")
+        elif currency not in self.rates:
+            errors.append("currency: unknown currency %s" % currency)
+        values['currency'] = currency
+        themes = split_themes(row.get('themes'))
+        unknown = [theme for theme in themes if theme not in self.themes]
+        if unknown:
+            errors.append("themes: unknown themes %s" % ", ".join(unknown))
+        if errors:
+            raise ValidationError(errors)
+        if self.status:
+            values['status'] = self.status
+        return values, themes
+
+    def import_chunk(self, rows):
+        """ compute the values of the cleaned rows [(line, values, themes)] and insert the valid ones """
+        stories = []
+        themes  = []
+        for (line, values, _themes), (row, computed) in zip(rows, recompute.compute([values for line, values, _themes in rows], self.rates)):
+            if computed is None:
+                self.rejects.append((line, ["year: no inflation available for %s" % values['year']]))
+                continue
+            values = dict(values, **computed)
+            values['currency_id'] = values.pop('currency')
+            stories.append(Story(**values))
+            themes.append(_themes)
+        if stories and not self.dry_run:
+            self.insert(stories, themes)
+        self.imported += len(stories)
+
+    def insert(self, stories, themes):
+        Through = Story.themes.through
+        with transaction.commit_on_success():
+            bulk.bulk_insert(Story, stories)
+            Through.objects.bulk_create([Through(story_id=story.pk, theme_id=theme)
+                for story, _themes in zip(stories, themes) for theme in _themes])
+            payloads.refresh(Story.objects.filter(pk__in=[story.pk for story in stories]))
+            StoryStats.objects.add([story.stats_entry() for story in stories])
+
+    def run(self, rows, progress=None):
+        """
+        Import the rows [(line, row)] by chunks, `progress(imported, rejected)` is called after each chunk.
+        """
+        chunk = []
+        for line, row in rows:
+            try:
+                values, themes = self.clean(row)
+            except ValidationError as e:
+                self.rejects.append((line, e.messages))
+                continue
+            chunk.append((line, values, themes))
+            if len(chunk) >= self.chunk_size:
+                self.import_chunk(chunk)
+                chunk = []
+                if progress:
+                    progress(self.imported, len(self.rejects))
+        if chunk:
+            self.import_chunk(chunk)
+            if progress:
+                progress(self.imported, len(self.rejects))
+        if self.imported and not self.dry_run:
+            versions.bump(Story)
+        return self.imported
+
+# EOF
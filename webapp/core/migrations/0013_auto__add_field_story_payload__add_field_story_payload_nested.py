@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+import datetime
+from south.db import db
+from south.v2 import SchemaMigration
+from django.db import models
+
+
+class Migration(SchemaMigration):
+
+    def forwards(self, orm):
+        # Adding field 'Story.payload'
+        db.add_column(u'core_story', 'payload',
+                      self.gf('django.db.models.fields.TextField')(default=''),
+                      keep_default=False)
+
+        # Adding field 'Story.payload_nested'
+        db.add_column(u'core_story', 'payload_nested',
+                      self.gf('django.db.models.fields.TextField')(default=''),
+                      keep_default=False)
+
+
+    def backwards(self, orm):
+        # Deleting field 'Story.payload'
+        db.delete_column(u'core_story', 'payload')
+
+        # Deleting field 'Story.payload_nested'
+        db.delete_column(u'core_story', 'payload_nested')
+
+
+    models = {
+        u'core.page': {
+            'Meta': {'object_name': 'Page'},
+            'content': ('django.db.models.fields.TextField', [], {}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'slug': ('django.db.models.fields.SlugField', [], {'max_length': '240'}),
+            'title': ('django.db.models.fields.CharField', [], {'max_length': '240'})
+        },
+        u'core.story': {
+            'Meta': {'object_name': 'Story'},
+            'country': ('webapp.core.fields.CountryField', [], {'max_length': '3'}),
+            'created_at': ('django.db.models.fields.DateTimeField', [], {'auto_now_add': 'True', 'blank': 'True'}),
+            'currency': ('django.db.models.fields.related.ForeignKey', [], {'to': u"orm['currency.Currency']"}),
+            'current_value': ('django.db.models.fields.FloatField', [], {}),
+            'current_value_usd': ('django.db.models.fields.FloatField', [], {}),
+            'description': ('django.db.models.fields.TextField', [], {'null': 'True', 'blank': 'True'}),
+            'extras': ('django.db.models.fields.TextField', [], {'default': "'{}'"}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'inflation_last_year': ('django.db.models.fields.IntegerField', [], {'max_length': '4'}),
+            'lang': ('django.db.models.fields.CharField', [], {'default': "'en_GB'", 'max_length': '5'}),
+            'payload': ('django.db.models.fields.TextField', [], {'default': "''"}),
+            'payload_nested': ('django.db.models.fields.TextField', [], {'default': "''"}),
+            'source': ('django.db.models.fields.URLField', [], {'max_length': '140'}),
+            'status': ('django.db.models.fields.CharField', [], {'default': "'pending'", 'max_length': '9'}),
+            'sticky': ('django.db.models.fields.BooleanField', [], {'default': 'False'}),
+            'themes': ('django.db.models.fields.related.ManyToManyField', [], {'to': u"orm['core.Theme']", 'symmetrical': 'False'}),
+            'title': ('django.db.models.fields.CharField', [], {'max_length': '240'}),
+            'type': ('django.db.models.fields.CharField', [], {'default': "'discrete'", 'max_length': '15'}),
+            'value': ('django.db.models.fields.FloatField', [], {}),
+            'year': ('django.db.models.fields.IntegerField', [], {'max_length': '4'})
+        },
+        u'core.theme': {
+            'Meta': {'ordering': "('slug',)", 'object_name': 'Theme'},
+            'active': ('django.db.models.fields.BooleanField', [], {'default': 'True'}),
+            'description': ('django.db.models.fields.CharField', [], {'max_length': '500', 'null': 'True', 'blank': 'True'}),
+            'image': ('django.db.models.fields.files.FileField', [], {'max_length': '300', 'null': 'True', 'blank': 'True'}),
+            'slug': ('django.db.models.fields.SlugField', [], {'max_length': '50', 'primary_key': 'True'}),
+            'title': ('django.db.models.fields.CharField', [], {'max_length': '80'})
+        },
+        u'currency.currency': {
+            'Meta': {'ordering': "['priority', 'name']", 'object_name': 'Currency'},
+            'iso_code': ('django.db.models.fields.CharField', [], {'max_length': '3', 'primary_key': 'True'}),
+            'name': ('django.db.models.fields.CharField', [], {'max_length': '120'}),
+            'priority': ('django.db.models.fields.IntegerField', [], {'default': '3'}),
+            'rate': ('django.db.models.fields.FloatField', [], {}),
+            'symbol': ('django.db.models.fields.CharField', [], {'max_length': '30', 'blank': 'True'})
+        }
+    }
+
+    complete_apps = ['core']
\ No newline at end of file
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+import datetime
+from south.db import db
+from south.v2 import SchemaMigration
+from django.db import models
+
+
+# indexes of the public stories (`Story.objects.public()`) by access pattern
+PUBLIC_INDEXES = (
+    # listings and exports, by chunks of primary keys
+    ('core_story_public_id'      , ('id',)),
+    # `lang` filter, countries and currencies of /api/filters/
+    ('core_story_public_lang'    , ('lang', 'country', 'currency_id')),
+    # stats by language
+    ('core_story_public_lang_usd', ('lang', 'current_value_usd')),
+    # `type` filter, stats by type
+    ('core_story_public_type_usd', ('type', 'current_value_usd')),
+    # relevance index and overall stats
+    ('core_story_public_usd'     , ('current_value_usd', 'type')),
+    # `country`, `currency` and `sticky` filters
+    ('core_story_public_country' , ('country',)),
+    ('core_story_public_currency', ('currency_id',)),
+    ('core_story_public_sticky'  , ('sticky',)),
+)
+
+class Migration(SchemaMigration):
+
+    def forwards(self, orm):
+        for name, columns in PUBLIC_INDEXES:
+            if db.backend_name == 'postgres':
+                # partial index, postgres gets the predicate as a literal
+                db.execute("CREATE INDEX %s ON %s (%s) WHERE %s = 'published'" % (
+                    db.quote_name(name), db.quote_name('core_story'), ", ".join(map(db.quote_name, columns)), db.quote_name('status')))
+            else:
+                # portable fallback, the status first: MySQL has no partial indexes, and SQLite has
+                # them but doesn't match their predicate with `status = ?`, as the ORM queries it
+                db.execute("CREATE INDEX %s ON %s (%s)" % (
+                    db.quote_name(name), db.quote_name('core_story'), ", ".join(map(db.quote_name, ('status',) + columns))))
+
+    def backwards(self, orm):
+        for name, columns in PUBLIC_INDEXES:
+            if db.backend_name == 'mysql':
+                db.execute("DROP INDEX %s ON %s" % (db.quote_name(name), db.quote_name('core_story')))
+            else:
+                db.execute("DROP INDEX %s" % db.quote_name(name))
+
+    models = {
+        u'core.page': {
+            'Meta': {'object_name': 'Page'},
+            'content': ('django.db.models.fields.TextField', [], {}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'slug': ('django.db.models.fields.SlugField', [], {'max_length': '240'}),
+            'title': ('django.db.models.fields.CharField', [], {'max_length': '240'})
+        },
+        u'core.story': {
+            'Meta': {'object_name': 'Story'},
+            'country': ('webapp.core.fields.CountryField', [], {'max_length': '3'}),
+            'created_at': ('django.db.models.fields.DateTimeField', [], {'auto_now_add': 'True', 'blank': 'True'}),
+            'currency': ('django.db.models.fields.related.ForeignKey', [], {'to': u"orm['currency.Currency']"}),
+            'current_value': ('django.db.models.fields.FloatField', [], {}),
+            'current_value_usd': ('django.db.models.fields.FloatField', [], {}),
+            'description': ('django.db.models.fields.TextField', [], {'null': 'True', 'blank': 'True'}),
+            'extras': ('django.db.models.fields.TextField', [], {'default': "'{}'"}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'inflation_last_year': ('django.db.models.fields.IntegerField', [], {'max_length': '4'}),
+            'lang': ('django.db.models.fields.CharField', [], {'default': "'es_ES'", 'max_length': '5'}),
+            'payload': ('django.db.models.fields.TextField', [], {'default': "''"}),
+            'payload_nested': ('django.db.models.fields.TextField', [], {'default': "''"}),
+            'source': ('django.db.models.fields.URLField', [], {'max_length': '140'}),
+            'status': ('django.db.models.fields.CharField', [], {'default': "'pending'", 'max_length': '9'}),
+            'sticky': ('django.db.models.fields.BooleanField', [], {'default': 'False'}),
+            'themes': ('django.db.models.fields.related.ManyToManyField', [], {'to': u"orm['core.Theme']", 'symmetrical': 'False'}),
+            'title': ('django.db.models.fields.CharField', [], {'max_length': '240'}),
+            'type': ('django.db.models.fields.CharField', [], {'default': "'discrete'", 'max_length': '15'}),
+            'value': ('django.db.models.fields.FloatField', [], {}),
+            'year': ('django.db.models.fields.IntegerField', [], {'max_length': '4'})
+        },
+        u'core.storystats': {
+            'Meta': {'unique_together': "(('group', 'key'),)", 'object_name': 'StoryStats'},
+            'count': ('django.db.models.fields.IntegerField', [], {'default': '0'}),
+            'group': ('django.db.models.fields.CharField', [], {'max_length': '5'}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'key': ('django.db.models.fields.CharField', [], {'max_length': '15', 'blank': 'True'}),
+            'max_value_usd': ('django.db.models.fields.FloatField', [], {'null': 'True'}),
+            'min_value_usd': ('django.db.models.fields.FloatField', [], {'null': 'True'})
+        },
+        u'core.theme': {
+            'Meta': {'ordering': "('slug',)", 'object_name': 'Theme'},
+            'active': ('django.db.models.fields.BooleanField', [], {'default': 'True'}),
+            'description': ('django.db.models.fields.CharField', [], {'max_length': '500', 'null': 'True', 'blank': 'True'}),
+            'image': ('django.db.models.fields.files.FileField', [], {'max_length': '300', 'null': 'True', 'blank': 'True'}),
+            'slug': ('django.db.models.fields.SlugField', [], {'max_length': '50', 'primary_key': 'True'}),
+            'title': ('django.db.models.fields.CharField', [], {'max_length': '80'})
+        },
+        u'currency.currency': {
+            'Meta': {'ordering': "['priority', 'name']", 'object_name': 'Currency'},
+            'iso_code': ('django.db.models.fields.CharField', [], {'max_length': '3', 'primary_key': 'True'}),
+            'name': ('django.db.models.fields.CharField', [], {'max_length': '120'}),
+            'priority': ('django.db.models.fields.IntegerField', [], {'default': '3'}),
+            'rate': ('django.db.models.fields.FloatField', [], {}),
+            'symbol': ('django.db.models.fields.CharField', [], {'max_length': '30', 'blank': 'True'})
+        }
+    }
+
+    complete_apps = ['core']
\ No newline at end of file
@@ -8,7 +8,7 @@
 # License : GNU General Public License
 # -----------------------------------------------------------------------------
 # Creation : 05-Aug-2013
-# Last mod : 19-Aug-2013
+# Last mod : 18-Oct-2026
 # -----------------------------------------------------------------------------
 # This file is part of Spending Stories.
 # 
@@ -30,17 +30,84 @@ from django.utils.translation import ugettext as _
 from django.conf import settings
 from webapp.currency.models import Currency
 from django.template.defaultfilters import slugify
-from django.db import models
+from django.db import models, transaction, DatabaseError
+from django.db.models import Count, Max, Min
+from django.db.models.signals import post_save, post_delete, m2m_changed
 import fields
+import versions
+import contextlib
 import datetime
 import inflation
 
+inflation.configure(source=getattr(settings, 'CPI_SOURCE', None), snapshot_path=getattr(settings, 'CPI_SNAPSHOT', None))
+
 YEAR_CHOICES = []
 for r in range(1999, (datetime.datetime.now().year + 1)):
     YEAR_CHOICES.append((r,r))
 
 STORY_TYPES = (('discrete', _('discrete')), ('over_one_year', _('over one year')))
 
+# -----------------------------------------------------------------------------
+#
+#    LOADED VALUES
+#
+# -----------------------------------------------------------------------------
+class LoadedValuesMixin(object):
+    """
+    Remembers the values of the fields at the instantiation (i.e as loaded from the
+    database) and after each save, to know which fields changed without a query.
+    A loaded object is saved with an UPDATE only, without checking first that it exists,
+    and inserted again (`reinserted`) if it has been deleted since it was loaded.
+    The fields changed by the last save are in `saved_changes`, so that the receivers
+    of `post_save` can skip an unchanged object (see `changed_on_save`).
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(LoadedValuesMixin, self).__init__(*args, **kwargs)
+        self.remember_values()
+
+    def remember_values(self):
+        # the deferred fields aren't in __dict__ until they are read
+        self._loaded_values = dict((f.attname, self.__dict__[f.attname]) for f in self._meta.fields if f.attname in self.__dict__)
+
+    def loaded_values(self):
+        """ return the values of the fields as they are in the database, None for a new object """
+        if self._state.adding or self._loaded_values.get(self._meta.pk.attname) != self.pk:
+            return None
+        return self._loaded_values
+
+    def changed_fields(self):
+        """ return the names (attnames) of the fields changed since loaded, all of them for a new object """
+        loaded = self.loaded_values()
+        fields = [f.attname for f in self._meta.fields if f.attname in self.__dict__]
+        if loaded is None:
+            return set(fields)
+        return set(name for name in fields if name not in loaded or loaded[name] != self.__dict__[name])
+
+    def save(self, *args, **kwargs):
+        forced = not args and self.loaded_values() is not None and not kwargs.get('force_insert') and not kwargs.get('force_update')
+        self.reinserted    = False
+        self.saved_changes = self.changed_fields()
+        try:
+            super(LoadedValuesMixin, self).save(*args, **(dict(kwargs, force_update=True) if forced else kwargs))
+        except DatabaseError:
+            if not forced:
+                raise
+            # no row updated: deleted since loaded, inserted again (another error is raised again by the INSERT)
+            self.reinserted    = True
+            self.saved_changes = set(f.attname for f in self._meta.fields)
+            super(LoadedValuesMixin, self).save(*args, **dict(kwargs, force_insert=True))
+        self.remember_values()
+
+def changed_on_save(instance):
+    """ whether the saved object changed, False for a loaded object saved without change """
+    return getattr(instance, 'saved_changes', None) != set()
+
+def bump_saved(sender, instance, **kwargs):
+    """ `post_save` receiver which bumps the version of the sender if the object changed """
+    if changed_on_save(instance):
+        versions.bump(sender)
+
 # -----------------------------------------------------------------------------
 #
 #    THEMES
@@ -54,7 +121,7 @@ class ThemeManager(models.Manager):
         return self.get_query_set().filter(active=True)
 
 
-class Theme(models.Model):
+class Theme(LoadedValuesMixin, models.Model):
     title       = models.CharField(max_length=80)
     slug        = models.SlugField(primary_key=True)
     description = models.CharField(max_length=500, blank=True, null=True)
@@ -79,7 +146,7 @@ class Theme(models.Model):
         if not self.slug:
             self.slug = slugify(self.title)
         # Remove the disabled theme from stories
-        if self.active is False:
+        if self.active is False and 'active' in self.changed_fields():
             for story in self.story_set.all():
                 story.themes.remove(self)
         super(Theme, self).save(*args, **kwargs)
@@ -94,9 +161,10 @@ class StoryManager(models.Manager):
     Manager for Stories
     """
     def public(self):
-        return self.get_query_set().exclude(status__in=('refused', 'pending'))
+        # a positive predicate, served by the indexes of the public stories (see migration 0015)
+        return self.get_query_set().filter(status=self.model.PUBLIC_STATUS)
 
-class Story(models.Model):
+class Story(LoadedValuesMixin, models.Model):
     '''
     The model representing a spending
     '''
@@ -118,17 +186,38 @@ class Story(models.Model):
     current_value_usd   = models.FloatField(_('Current value in USD'), editable=False)
     inflation_last_year = models.IntegerField(max_length=4, editable=False)
     lang                = models.CharField(_('Story language'), max_length=5, choices=settings.LANGUAGES, default=settings.LANGUAGE_CODE)
+    # pre-rendered JSON of the story for the api (flat and nested), see `webapp.api.payloads`
+    payload             = models.TextField(default="", editable=False)
+    payload_nested      = models.TextField(default="", editable=False)
     # managers
     objects             = StoryManager()
 
+    PAYLOAD_FIELDS      = ('payload', 'payload_nested')
+    # the status of the public stories, see `StoryManager.public`
+    PUBLIC_STATUS       = 'published'
+    # the CPI used to compute the current values
+    INFLATION_COUNTRY   = "ESP"
+
     def __unicode__(self):
         return self.title
 
     class Meta:
         verbose_name_plural = "stories"
 
+    def stats_entry(self, values=None):
+        """
+        return what the story counts for in the StoryStats: (lang, type, current_value_usd), None if not public
+        (the same definition as `StoryManager.public`).
+        `values` gives the fields ({attname: value}, i.e the loaded values), the current ones by default.
+        """
+        values = values or {}
+        get    = lambda name: values[name] if name in values else getattr(self, name)
+        if get('status') != self.PUBLIC_STATUS:
+            return None
+        return (get('lang'), get('type'), get('current_value_usd'))
+
     def set_current_value(self):
-        self.country = "ESP"
+        self.country = self.INFLATION_COUNTRY
         inflation_amount, inflation_year = inflation.get_inflation(amount=self.value, year=self.year, country=self.country)
         self.current_value       = inflation_amount
         self.inflation_last_year = inflation_year
@@ -138,26 +227,159 @@ class Story(models.Model):
         '''
         save in database
         '''
-        try:
-            previous_instance = Story.objects.get(pk=self.pk)
-        except:
-            previous_instance = None
+        previous = self.loaded_values()
         # Serialize the value in USD with the closest inflation 
         # if `year`, `value` or `currency` have changed, 
         # we recompute `current_value`, `current_value_usd` and `inflation_last_year`
         if not self.current_value_usd \
-        or previous_instance.value    != self.value \
-        or previous_instance.currency != self.currency \
-        or previous_instance.year     != self.year:
+        or self.changed_fields() & set(('value', 'currency_id', 'year')):
             self.set_current_value()
         super(Story, self).save(*args, **kwargs)
+        # the entry of a deleted story has been removed with it
+        previous_entry = self.stats_entry(previous) if previous and not self.reinserted else None
+        if previous_entry != self.stats_entry():
+            StoryStats.objects.remove([previous_entry])
+            StoryStats.objects.add([self.stats_entry()])
+
+def remove_story_stats(sender, instance, **kwargs):
+    StoryStats.objects.remove([instance.stats_entry()])
+
+def bump_story_version(sender, **kwargs):
+    versions.bump(Story)
+
+post_save  .connect(bump_saved          , sender=Theme)
+post_delete.connect(versions.bump_sender, sender=Theme)
+post_save  .connect(bump_saved          , sender=Story)
+post_delete.connect(versions.bump_sender, sender=Story)
+m2m_changed.connect(bump_story_version  , sender=Story.themes.through)
+post_delete.connect(remove_story_stats  , sender=Story)
+
+# -----------------------------------------------------------------------------
+#
+#    STORY STATS
+#
+# -----------------------------------------------------------------------------
+@contextlib.contextmanager
+def in_caller_transaction():
+    yield
+
+def outer_transaction():
+    """ a transaction for the block, unless it runs in the transaction of a caller (i.e: a save) """
+    if transaction.is_managed():
+        return in_caller_transaction()
+    return transaction.commit_on_success()
+
+class StoryStatsManager(models.Manager):
+    """
+    Maintains the statistics of the public stories incrementally.
+    A story counts for the group `all` and for the groups of its language and its type.
+    Stats are entries (lang, type, current_value_usd), see `Story.stats_entry`.
+    Nothing is maintained until the stats are built by `rebuild` (done at the first read).
+    """
+
+    def scopes(self, entry):
+        lang, _type, value_usd = entry
+        return (('all', ''), ('lang', lang), ('type', _type))
+
+    def group_by_scope(self, entries):
+        """ return {scope: [value_usd, ...]} for the given entries """
+        scopes = {}
+        for entry in entries:
+            if entry is not None:
+                for scope in self.scopes(entry):
+                    scopes.setdefault(scope, []).append(entry[2])
+        return scopes
+
+    def is_built(self):
+        return self.get_query_set().filter(group='all').exists()
+
+    def add(self, entries):
+        """ add the stories given by their stats entries """
+        scopes = self.group_by_scope(entries)
+        if not scopes or not self.is_built():
+            return
+        with outer_transaction():
+            for (group, key), values in scopes.items():
+                stats, created = self.get_query_set().select_for_update().get_or_create(group=group, key=key)
+                stats.count += len(values)
+                stats.min_value_usd = min([v for v in (stats.min_value_usd,) if v is not None] + values)
+                stats.max_value_usd = max([v for v in (stats.max_value_usd,) if v is not None] + values)
+                stats.save()
+
+    def remove(self, entries):
+        """ remove the stories given by their stats entries, once they are removed from the public stories """
+        scopes = self.group_by_scope(entries)
+        if not scopes or not self.is_built():
+            return
+        with outer_transaction():
+            for (group, key), values in scopes.items():
+                for stats in self.get_query_set().select_for_update().filter(group=group, key=key):
+                    stats.count = max(stats.count - len(values), 0)
+                    # the bounds are computed again only if one of them is removed
+                    if stats.min_value_usd in values or stats.max_value_usd in values or not stats.count:
+                        stats.compute_bounds()
+                    stats.save()
+
+    def rebuild(self):
+        """ compute all the stats from the public stories """
+        stories = Story.objects.public().order_by()
+        with outer_transaction():
+            self.get_query_set().delete()
+            rows = [('all', '', stories.aggregate(count=Count('pk'), min=Min('current_value_usd'), max=Max('current_value_usd')))]
+            for group in ('lang', 'type'):
+                for row in stories.values(group).annotate(count=Count('pk'), min=Min('current_value_usd'), max=Max('current_value_usd')):
+                    rows.append((group, row[group], row))
+            self.bulk_create([StoryStats(group=group, key=key, count=row['count'], min_value_usd=row['min'], max_value_usd=row['max'])
+                for group, key, row in rows])
+
+    def as_dict(self):
+        """ return the stats as served by the api, built if needed """
+        stats = list(self.get_query_set())
+        if not any(s.group == 'all' for s in stats):
+            self.rebuild()
+            stats = list(self.get_query_set())
+        meta = {'lang': {}, 'type': {}}
+        for s in stats:
+            data = {'count': s.count, 'current_value_usd__min': s.min_value_usd, 'current_value_usd__max': s.max_value_usd}
+            if s.group == 'all':
+                meta.update(data)
+            elif s.count:
+                meta[s.group][s.key] = data
+        return meta
+
+class StoryStats(models.Model):
+    """
+    Statistics of the public stories, overall (group `all`), by language and by type
+    """
+    group         = models.CharField(max_length=5)
+    key           = models.CharField(max_length=15, blank=True)
+    count         = models.IntegerField(default=0)
+    min_value_usd = models.FloatField(null=True)
+    max_value_usd = models.FloatField(null=True)
+    # managers
+    objects       = StoryStatsManager()
+
+    class Meta:
+        unique_together     = ('group', 'key')
+        verbose_name_plural = "story stats"
+
+    def stories(self):
+        stories = Story.objects.public()
+        if self.group != 'all':
+            stories = stories.filter(**{self.group: self.key})
+        return stories
+
+    def compute_bounds(self):
+        bounds = self.stories().aggregate(Min('current_value_usd'), Max('current_value_usd'))
+        self.min_value_usd = bounds['current_value_usd__min']
+        self.max_value_usd = bounds['current_value_usd__max']
 
 # -----------------------------------------------------------------------------
 #
 #    PAGE
 #
 # -----------------------------------------------------------------------------
-class Page(models.Model):
+class Page(LoadedValuesMixin, models.Model):
     title   = models.CharField(_('Page title'), max_length=240)
     slug    = models.SlugField(_('Page slug'), max_length=240)
     content = models.TextField(_('Page content'))
@@ -168,4 +390,7 @@ class Page(models.Model):
             self.slug = slugify(self.title)
         super(Page, self).save(*args, **kwargs)
 
+post_save  .connect(bump_saved          , sender=Page)
+post_delete.connect(versions.bump_sender, sender=Page)
+
 # EOF
@@ -0,0 +1,179 @@
+#!/usr/bin/env python
+# Encoding: utf-8
+# -----------------------------------------------------------------------------
+# Project : OKF - Spending Stories
+# -----------------------------------------------------------------------------
+# Author : Edouard Richard                                  <edou4rd@gmail.com>
+# -----------------------------------------------------------------------------
+# License : GNU General Public License
+# -----------------------------------------------------------------------------
+# Creation : 18-Oct-2026
+# Last mod : 18-Oct-2026
+# -----------------------------------------------------------------------------
+# This file is part of Spending Stories.
+# 
+#     Spending Stories is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+# 
+#     Spending Stories is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+# 
+#     You should have received a copy of the GNU General Public License
+#     along with Spending Stories.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Recompute the values of the stories (`current_value`, `current_value_usd` and
+`inflation_last_year`) by chunks of primary keys: the inflation of a chunk is
+computed at once, and the changed stories are written with a single UPDATE (see `bulk`).
+Used by `manage.py recompute_stories` and by the admin.
+A change of the currency rates only needs a new conversion, see `convert`.
+"""
+
+from django.db              import connection, transaction
+from webapp.api             import payloads, streaming
+from webapp.currency.models import Currency
+from models                 import Story, StoryStats
+import multiprocessing
+import bulk
+import inflation
+import versions
+import numpy
+import time
+
+# the computed fields, written when one of them changes
+FIELDS  = ('current_value', 'current_value_usd', 'inflation_last_year', 'country')
+COLUMNS = ('pk', 'value', 'year', 'currency', 'status', 'lang', 'type') + FIELDS
+
+def compute(rows, rates):
+    """
+    Yield the rows (dicts of `COLUMNS`) with their new values ({field: value}),
+    None for the stories which can't be inflated or converted with the `rates` ({currency: rate}).
+    """
+    amounts, years = inflation.inflate_many([row['value'] for row in rows], [row['year'] for row in rows], Story.INFLATION_COUNTRY)
+    for row, amount, year in zip(rows, amounts, years):
+        if numpy.isnan(amount) or row['currency'] not in rates:
+            yield row, None
+        else:
+            yield row, {
+                'current_value'       : float(amount),
+                'current_value_usd'   : float(amount) / rates[row['currency']],
+                'inflation_last_year' : int(year),
+                'country'             : Story.INFLATION_COUNTRY,
+            }
+
+def recompute_chunk(queryset, dry_run=False):
+    """
+    Recompute the stories of the queryset, write the changed ones unless `dry_run`, with
+    their payloads and their stats in the same transaction, and bump the version of the
+    stories once committed: a chunk which fails later doesn't leave stale stats or caches.
+    Return a dict with the number of stories, of changed stories and the pks of the
+    stories which can't be computed.
+    """
+    rows    = list(queryset.values(*COLUMNS))
+    rates   = dict(Currency.objects.values_list('pk', 'rate'))
+    changes = {}
+    removed = []
+    added   = []
+    result  = {'count': len(rows), 'changed': 0, 'failed': []}
+    for row, values in compute(rows, rates):
+        if values is None:
+            result['failed'].append(row['pk'])
+        elif any(row[field] != values[field] for field in FIELDS):
+            changes[row['pk']] = values
+            story = Story(status=row['status'], lang=row['lang'], type=row['type'], current_value_usd=row['current_value_usd'])
+            removed.append(story.stats_entry())
+            story.current_value_usd = values['current_value_usd']
+            added.append(story.stats_entry())
+    result['changed'] = len(changes)
+    if changes and not dry_run:
+        with transaction.commit_on_success():
+            bulk.bulk_update(Story, changes, FIELDS)
+            payloads.refresh(Story.objects.filter(pk__in=changes.keys()))
+            StoryStats.objects.remove(removed)
+            StoryStats.objects.add(added)
+        versions.bump(Story)
+    return result
+
+def recompute_range(args):
+    """ recompute the stories of a chunk in a worker process, the queryset is given by its query """
+    query, first, last, dry_run = args
+    queryset = Story.objects.all()
+    queryset.query = query
+    return recompute_chunk(queryset.filter(pk__gte=first, pk__lte=last), dry_run)
+
+def recompute(queryset, dry_run=False, processes=0, chunk_size=streaming.CHUNK_SIZE, progress=None):
+    """
+    Recompute the stories of the queryset by chunks of `chunk_size` stories,
+    in a pool of `processes` processes if given.
+    `progress(done, total, elapsed)` is called after each chunk.
+    Return a dict with the numbers of stories, changed stories, the pks of the failed ones
+    and the duration.
+    """
+    start   = time.time()
+    total   = queryset.count()
+    ranges  = streaming.pk_ranges(queryset, chunk_size)
+    summary = {'count': 0, 'changed': 0, 'failed': []}
+    if processes:
+        # load the CPI before the fork, the workers open their own connection
+        inflation.get_cpi()
+        connection.close()
+        ranges  = list(ranges)
+        pool    = multiprocessing.Pool(processes)
+        results = pool.imap_unordered(recompute_range, [(queryset.query, first, last, dry_run) for first, last in ranges])
+    else:
+        results = (recompute_chunk(queryset.filter(pk__gte=first, pk__lte=last), dry_run) for first, last in ranges)
+    try:
+        for result in results:
+            for key in summary:
+                summary[key] += result[key]
+            if progress:
+                progress(summary['count'], total, time.time() - start)
+    finally:
+        if processes:
+            pool.close()
+            pool.join()
+    summary['duration'] = time.time() - start
+    return summary
+
+def convert(rates):
+    """
+    Apply the new rates ({currency: rate}) in a single transaction and compute again
+    `current_value_usd` of the stories in these currencies, with one UPDATE joined to
+    the rates (the inflation doesn't change). The payloads don't contain the values in
+    USD (see `payloads.LIVE_FIELDS`), the stats are updated with the old and new values.
+    Return a dict with the numbers of currencies and stories updated and the duration.
+    """
+    start   = time.time()
+    summary = {'currencies': len(rates), 'stories': 0}
+    if rates:
+        qn      = connection.ops.quote_name
+        # the stats entries of the public stories, see `Story.stats_entry`
+        entries = Story.objects.public().filter(currency__in=rates.keys()).order_by().values_list('lang', 'type', 'current_value_usd')
+        with transaction.commit_on_success():
+            removed = list(entries)
+            for iso_code, rate in rates.items():
+                Currency.objects.filter(pk=iso_code).update(rate=rate)
+            cursor = connection.cursor()
+            cursor.execute("UPDATE %(story)s SET %(value_usd)s = %(value)s / (SELECT %(rate)s FROM %(currency)s WHERE %(currency)s.%(iso_code)s = %(story)s.%(fk)s) WHERE %(fk)s IN (%(params)s)" % {
+                'story'     : qn(Story._meta.db_table),
+                'value_usd' : qn(Story._meta.get_field('current_value_usd').column),
+                'value'     : qn(Story._meta.get_field('current_value').column),
+                'fk'        : qn(Story._meta.get_field('currency').column),
+                'currency'  : qn(Currency._meta.db_table),
+                'rate'      : qn(Currency._meta.get_field('rate').column),
+                'iso_code'  : qn(Currency._meta.pk.column),
+                'params'    : ", ".join(["%s"] * len(rates)),
+            }, rates.keys())
+            summary['stories'] = cursor.rowcount
+            transaction.set_dirty()
+            StoryStats.objects.remove(removed)
+            StoryStats.objects.add(list(entries))
+        versions.bump(Currency, Story)
+    summary['duration'] = time.time() - start
+    return summary
+
+# EOF
@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+# Encoding: utf-8
+# -----------------------------------------------------------------------------
+# Project : OKF - Spending Stories
+# -----------------------------------------------------------------------------
+# Author : Edouard Richard                                  <edou4rd@gmail.com>
+# -----------------------------------------------------------------------------
+# License : GNU General Public License
+# -----------------------------------------------------------------------------
+# Creation : 18-Oct-2026
+# Last mod : 18-Oct-2026
+# -----------------------------------------------------------------------------
+# This file is part of Spending Stories.
+# 
+#     Spending Stories is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+# 
+#     Spending Stories is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+# 
+#     You should have received a copy of the GNU General Public License
+#     along with Spending Stories.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Synthetic stories for the benchmarks. The values follow a log-normal distribution
+(from thousands to billions, like real spendings), the other fields are picked
+at random among the currencies, countries, years, types, languages and themes.
+They are imported with `importer` and share a `source`, to be removed at once.
+The synthetic themes have a slug starting with `THEME_PREFIX`.
+"""
+
+from django.conf            import settings
+from django.db              import connection, transaction
+from webapp.currency.models import Currency
+from models                 import Story, Theme, StoryStats, YEAR_CHOICES, STORY_TYPES
+from fields                 import COUNTRIES
+import importer
+import versions
+import random
+import uuid
+
+SOURCE_PREFIX = 'http://benchmark.invalid/'
+THEME_PREFIX  = 'synthetic-'
+
+def new_source():
+    """ a source which identifies the stories of a run """
+    return SOURCE_PREFIX + uuid.uuid4().hex
+
+# share of the stories by status when it isn't given
+STATUSES = (('published', 0.8), ('pending', 0.15), ('refused', 0.05))
+
+def random_status(generator):
+    threshold = generator.random()
+    for status, share in STATUSES:
+        threshold -= share
+        if threshold < 0:
+            return status
+    return STATUSES[0][0]
+
+def rows(count, source, status=None, seed=None):
+    """ yield `count` rows of stories, as read by `importer`, with random statuses if `status` isn't given """
+    generator  = random.Random(seed)
+    currencies = list(Currency.objects.values_list('pk', flat=True))
+    themes     = list(Theme.objects.public().values_list('pk', flat=True))
+    years      = [year for year, label in YEAR_CHOICES]
+    for i in range(count):
+        yield {
+            'title'    : 'synthetic story %s' % i,
+            'value'    : round(generator.lognormvariate(15, 3), 2),
+            'currency' : generator.choice(currencies),
+            'country'  : generator.choice(COUNTRIES)[0],
+            'year'     : generator.choice(years),
+            'type'     : generator.choice(STORY_TYPES)[0],
+            'lang'     : generator.choice(settings.LANGUAGES)[0],
+            'sticky'   : generator.random() < 0.01,
+            'source'   : source,
+            'status'   : status or random_status(generator),
+            'themes'   : generator.sample(themes, min(len(themes), generator.randint(0, 3))),
+        }
+
+def create_themes(count):
+    """ create the synthetic themes which don't exist yet, return their number """
+    slugs  = ['%s%s' % (THEME_PREFIX, i) for i in range(count)]
+    exists = set(Theme.objects.filter(slug__in=slugs).values_list('pk', flat=True))
+    Theme.objects.bulk_create([Theme(slug=slug, title='Synthetic theme %s' % slug[len(THEME_PREFIX):])
+        for slug in slugs if slug not in exists])
+    versions.bump(Theme)
+    return len(slugs) - len(exists)
+
+def create(count, source, status=None, seed=None):
+    """ import `count` synthetic stories, return the `importer.Importer` """
+    _import = importer.Importer()
+    _import.run(enumerate(rows(count, source, status, seed), 1))
+    return _import
+
+def remove(source=None):
+    """ remove the stories of the given source without loading them, all the synthetic stories and themes by default """
+    stories = Story.objects.filter(source=source) if source else Story.objects.filter(source__startswith=SOURCE_PREFIX)
+    Story.themes.through.objects.filter(story__in=stories).delete()
+    with transaction.commit_on_success():
+        connection.cursor().execute('DELETE FROM %s WHERE %s %s %%s' % (
+            connection.ops.quote_name(Story._meta.db_table), connection.ops.quote_name(Story._meta.get_field('source').column),
+            '=' if source else 'LIKE'), [source or SOURCE_PREFIX + '%'])
+        transaction.set_dirty()
+    if not source:
+        Theme.objects.filter(slug__startswith=THEME_PREFIX).delete()
+    StoryStats.objects.rebuild()
+    versions.bump(Story)
+
+# EOF
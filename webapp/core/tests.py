@@ -0,0 +1,201 @@
+#!/usr/bin/env python
+# Encoding: utf-8
+# -----------------------------------------------------------------------------
+# Project : OKF - Spending Stories
+# -----------------------------------------------------------------------------
+# Author : Edouard Richard                                  <edou4rd@gmail.com>
+# -----------------------------------------------------------------------------
+# License : GNU General Public License
+# -----------------------------------------------------------------------------
+# Creation : 18-Oct-2026
+# Last mod : 18-Oct-2026
+# -----------------------------------------------------------------------------
+# This file is part of Spending Stories.
+# 
+#     Spending Stories is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+# 
+#     Spending Stories is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+# 
+#     You should have received a copy of the GNU General Public License
+#     along with Spending Stories.  If not, see <http://www.gnu.org/licenses/>.
+
+from django.conf                     import settings
+from django.test                     import SimpleTestCase, TransactionTestCase
+from django.db                       import transaction
+from webapp.core.models              import Story, StoryStats
+from webapp.core                     import versions
+from economics                       import CPI, snapshot
+import inflation
+import numpy
+import datetime
+import tempfile
+import shutil
+import os
+
+class TransactionStoryTestCase(TransactionTestCase):
+    """
+    Test the transactions of the writes, which `TestCase` disables
+    """
+    fixtures = ['api_dataset.json',]
+
+    def test_versions_bumped_after_commit(self):
+        story = Story.objects.public()[0]
+        with transaction.commit_on_success():
+            story.title = "Committed"
+            story.save()
+            version = versions.get(Story)
+            # not before the commit
+            versions.bump_committed()
+            self.assertEquals(versions.get(Story), version)
+        # at the end of a request, once committed
+        self.client.get('/api/meta/')
+        self.assertNotEquals(versions.get(Story), version)
+
+    def test_save_is_atomic(self):
+        story = Story.objects.public()[0]
+        try:
+            with transaction.commit_on_success():
+                story.title = "Rolled back"
+                story.save()
+                # the payload is written in the same transaction
+                self.assertIn("Rolled back", Story.objects.get(pk=story.pk).payload)
+                raise ValueError()
+        except ValueError:
+            pass
+        story = Story.objects.get(pk=story.pk)
+        self.assertNotEquals(story.title, "Rolled back")
+        self.assertNotIn("Rolled back", story.payload)
+
+    def test_stats_are_atomic(self):
+        StoryStats.objects.rebuild()
+        stats = StoryStats.objects.as_dict()
+        story = Story.objects.public()[0]
+        try:
+            with transaction.commit_on_success():
+                story.status = "refused"
+                story.save()
+                raise ValueError()
+        except ValueError:
+            pass
+        self.assertEquals(Story.objects.get(pk=story.pk).status, "published")
+        self.assertEquals(StoryStats.objects.as_dict(), stats)
+
+class CPITestCase(SimpleTestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_offline_csv(self):
+        cpi = CPI(datapackage=settings.CPI_SOURCE)
+        self.assertIn(datetime.date(2010, 1, 1), cpi.data['ESP'])
+        self.assertEquals(cpi.get(datetime.date(2010, 1, 1), 'esp').value, 100.)
+
+    def test_closest(self):
+        cpi   = CPI(datapackage=settings.CPI_SOURCE)
+        dates = cpi.data['ESP'].keys()
+        for date in (datetime.date(1980, 5, 1), datetime.date(2004, 7, 2), datetime.date(2004, 7, 3),
+                     datetime.date(2010, 1, 1), datetime.date.today()):
+            # same as a linear scan
+            closest = min(dates, key=lambda x: (abs(date - x), x))
+            self.assertEquals(cpi.closest(date, 'ESP', limit=datetime.timedelta(366 * 50)),
+                (closest, cpi.data['ESP'][closest]))
+        self.assertRaises(KeyError, cpi.closest, datetime.date(1900, 1, 1), 'ESP')
+        self.assertEquals(cpi.closest(datetime.date(2010, 2, 1), 'spain').date, datetime.date(2010, 1, 1))
+        # the values of the given country, not the ones of Spain
+        self.assertEquals(cpi.closest(datetime.date(2005, 2, 1), 'FRA').value, cpi.data['FRA'][datetime.date(2005, 1, 1)])
+        self.assertNotEquals(cpi.closest(datetime.date(2005, 2, 1), 'FRA').value, cpi.closest(datetime.date(2005, 2, 1), 'ESP').value)
+        self.assertEquals(cpi.previous(datetime.date(2010, 12, 31), 'ESP').date, datetime.date(2010, 1, 1))
+        self.assertRaises(KeyError, cpi.previous, datetime.date(1980, 1, 1), 'ESP')
+
+    def test_get_inflation(self):
+        cpi       = CPI(datapackage=settings.CPI_SOURCE)
+        last_year = max(cpi.data['ESP'].keys())
+        amount, year = inflation.get_inflation(100, 2000, 'ESP')
+        self.assertEquals(year, last_year.year)
+        self.assertAlmostEqual(amount, 100 * cpi.data['ESP'][last_year] / cpi.data['ESP'][datetime.date(2000, 1, 1)])
+        # the previous years are used up to INFLATION_REFERENCE_RETRY years
+        self.assertEquals(inflation.get_inflation(100, last_year.year + 2, 'ESP'), (100., last_year.year))
+        self.assertRaises(Exception, inflation.get_inflation, 100, last_year.year + inflation.INFLATION_REFERENCE_RETRY, 'ESP')
+        self.assertRaises(Exception, inflation.get_inflation, 100, 1950, 'ESP')
+
+    def test_inflate_many(self):
+        last_year = max(CPI(datapackage=settings.CPI_SOURCE).data['ESP'].keys()).year
+        years     = [1950, 1990, 2000, 2010, last_year, last_year + 1, last_year + inflation.INFLATION_REFERENCE_RETRY]
+        amounts, reference_years = inflation.inflate_many([100.] * len(years), years, 'ESP')
+        for year, amount, reference_year in zip(years, amounts, reference_years):
+            try:
+                self.assertEquals((amount, reference_year), inflation.get_inflation(100., year, 'ESP'))
+            except Exception:
+                self.assertTrue(numpy.isnan(amount))
+                self.assertEquals(reference_year, 0)
+        self.assertEquals(numpy.isnan(amounts).tolist(), [True, False, False, False, False, False, True])
+
+    def test_dump_and_load(self):
+        path    = os.path.join(self.directory, 'snapshots', 'cpi.json')
+        rows    = list(snapshot.read(settings.CPI_SOURCE))
+        version = snapshot.dump(path, rows, etag='"abc"')
+        self.assertEquals(snapshot.load(path)['version'], version)
+        self.assertEquals(snapshot.load(path)['etag'], '"abc"')
+        # same rows, same version
+        self.assertEquals(snapshot.dump(path, reversed(rows)), version)
+        self.assertEquals(CPI(datapackage=path).data, CPI(datapackage=settings.CPI_SOURCE).data)
+        self.assertEquals(os.listdir(os.path.dirname(path)), ['cpi.json'])
+
+    def test_stale_while_revalidate(self):
+        source = os.path.join(self.directory, 'cpi.csv')
+        shutil.copy(settings.CPI_SOURCE, source)
+        inflation.configure(source=source)
+        try:
+            cpi = inflation.get_cpi()
+            self.assertIs(inflation.get_cpi(), cpi)
+            # changed on disk: the stale CPI is returned while a single refresh runs
+            os.utime(source, (0, 0))
+            with inflation.REFRESH_LOCK:
+                # a refresh is already running
+                self.assertIs(inflation.get_cpi(), cpi)
+                self.assertIsNone(inflation.start_refresh())
+            self.assertIs(inflation.get_cpi(), cpi)
+            inflation.REFRESH_THREAD.join()
+            self.assertIsNot(inflation.get_cpi(), cpi)
+            self.assertEquals(inflation.get_cpi().data, cpi.data)
+            self.assertEquals(inflation.cache_stats()['failures'], 0)
+            self.assertFalse(inflation.cache_stats()['refreshing'])
+        finally:
+            inflation.configure(source=settings.CPI_SOURCE, snapshot_path=settings.CPI_SNAPSHOT)
+
+    def test_refresh_retry_delay(self):
+        path = os.path.join(self.directory, 'cpi.json')
+        snapshot.dump(path, snapshot.read(settings.CPI_SOURCE))
+        os.utime(path, (0, 0))
+        inflation.configure(snapshot_path=path)
+        skipped = inflation.cache_stats()['skipped']
+        try:
+            # another process is fetching the stale snapshot: the refresh is skipped, then delayed
+            with inflation.file_lock(path + '.lock') as acquired:
+                self.assertTrue(acquired)
+                cpi = inflation.get_cpi()
+                self.assertIs(inflation.get_cpi(), cpi)
+                inflation.REFRESH_THREAD.join()
+                self.assertIs(inflation.get_cpi(), cpi)
+                self.assertEquals(inflation.cache_stats()['skipped'], skipped + 1)
+                self.assertEquals(inflation.cache_stats()['last_outcome'], 'skipped')
+                self.assertIsNone(inflation.start_refresh())
+        finally:
+            inflation.configure(source=settings.CPI_SOURCE, snapshot_path=settings.CPI_SNAPSHOT)
+
+    def test_invalid_snapshot(self):
+        path = os.path.join(self.directory, 'cpi.json')
+        with open(path, 'w') as f:
+            f.write('{"format": 0}')
+        self.assertRaises(snapshot.SnapshotError, snapshot.load, path)
+
+# EOF
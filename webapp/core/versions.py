@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+# Encoding: utf-8
+# -----------------------------------------------------------------------------
+# Project : OKF - Spending Stories
+# -----------------------------------------------------------------------------
+# Author : Edouard Richard                                  <edou4rd@gmail.com>
+# -----------------------------------------------------------------------------
+# License : GNU General Public License
+# -----------------------------------------------------------------------------
+# Creation : 18-Oct-2026
+# Last mod : 18-Oct-2026
+# -----------------------------------------------------------------------------
+# This file is part of Spending Stories.
+# 
+#     Spending Stories is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+# 
+#     Spending Stories is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+# 
+#     You should have received a copy of the GNU General Public License
+#     along with Spending Stories.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Data versions of the models, shared between the processes through the cache.
+
+A version is bumped on every write of its model (see the receivers connected
+in `webapp.core.models` and the admin actions). The in-process caches of the
+api compare the versions to know whether they are stale, so the workers and the
+management commands need a shared cache backend to see the writes of each other:
+memcached or the table of the database, see `CACHES` in the settings. With the
+table, reading the versions costs a query, a 304 of the api included.
+A version is a random value: the concurrent bumps can't be lost, even with the
+table of the database where `incr` isn't atomic. A model written in a transaction
+is bumped again once it's committed (see `bump_committed`), so that the data read
+by a concurrent request before the commit can't stay cached under the new version.
+The time of the last bump is kept too, it gives the `Last-Modified` of the api.
+"""
+
+from django.core.cache import cache
+from django.db         import transaction
+import threading
+import uuid
+import time
+
+# versions have to outlive the data they describe
+TIMEOUT = 60 * 60 * 24 * 365
+
+def key(model):
+    return "data-version:%s.%s" % (model._meta.app_label, model._meta.object_name.lower())
+
+def modified_key(model):
+    return "data-modified:%s.%s" % (model._meta.app_label, model._meta.object_name.lower())
+
+# the models bumped in the current transaction of the thread
+pending = threading.local()
+
+def new_version():
+    # never reused, even after an expiration
+    return uuid.uuid4().hex
+
+def get(*models):
+    """ return the current versions of the given models, as a tuple """
+    keys     = [key(model) for model in models]
+    versions = cache.get_many(keys)
+    for _key in keys:
+        if _key not in versions:
+            cache.add(_key, new_version(), TIMEOUT)
+            versions[_key] = cache.get(_key) or new_version()
+    return tuple(versions[_key] for _key in keys)
+
+def modified(*models):
+    """ return the time of the last write of the given models, as a timestamp """
+    keys  = [modified_key(model) for model in models]
+    times = cache.get_many(keys)
+    for _key in keys:
+        if _key not in times:
+            # unknown since the cache was cleared, this is the safe answer
+            cache.add(_key, time.time(), TIMEOUT)
+            times[_key] = cache.get(_key) or time.time()
+    return max(times.values())
+
+def set_versions(models):
+    for model in models:
+        cache.set(key(model), new_version(), TIMEOUT)
+        cache.set(modified_key(model), time.time(), TIMEOUT)
+
+def bump(*models):
+    """ give new versions to the given models, and again after the commit if they are written in a transaction """
+    set_versions(models)
+    if transaction.is_managed():
+        pending.models = getattr(pending, 'models', set()) | set(models)
+
+def bump_committed():
+    """
+    Bump again the models bumped in a transaction, once it's committed (i.e: by the
+    admin views). Called at the end of the requests, see `webapp.middlewares.BumpVersions`.
+    """
+    if transaction.is_managed():
+        return
+    models, pending.models = getattr(pending, 'models', set()), set()
+    set_versions(models)
+
+def bump_sender(sender, **kwargs):
+    """ signal receiver which bumps the version of the sender """
+    bump(sender)
+
+# EOF
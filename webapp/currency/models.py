@@ -8,7 +8,7 @@
 # License : GNU General Public License
 # -----------------------------------------------------------------------------
 # Creation : 05-Aug-2013
-# Last mod : 05-Aug-2013
+# Last mod : 18-Oct-2026
 # -----------------------------------------------------------------------------
 # This file is part of Spending Stories.
 # 
@@ -26,6 +26,8 @@
 #     along with Spending Stories.  If not, see <http://www.gnu.org/licenses/>.
 
 from django.db import models
+from django.db.models.signals import post_save, post_delete
+from webapp.core import versions
 
 class Currency(models.Model):
     iso_code = models.CharField(primary_key=True, max_length=3)
@@ -39,4 +41,7 @@ class Currency(models.Model):
 
     class Meta:
         ordering = ['priority', 'name']
+
+post_save  .connect(versions.bump_sender, sender=Currency)
+post_delete.connect(versions.bump_sender, sender=Currency)
 # EOF
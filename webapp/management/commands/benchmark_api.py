@@ -0,0 +1,179 @@
+#!/usr/bin/env python
+# Encoding: utf-8
+# -----------------------------------------------------------------------------
+# Project : OKF - Spending Stories
+# -----------------------------------------------------------------------------
+# Author : Edouard Richard                                  <edou4rd@gmail.com>
+# -----------------------------------------------------------------------------
+# License : GNU General Public License
+# -----------------------------------------------------------------------------
+# Creation : 18-Oct-2026
+# Last mod : 18-Oct-2026
+# -----------------------------------------------------------------------------
+# This file is part of Spending Stories.
+# 
+#     Spending Stories is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+# 
+#     Spending Stories is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+# 
+#     You should have received a copy of the GNU General Public License
+#     along with Spending Stories.  If not, see <http://www.gnu.org/licenses/>.
+
+from django.core.management.base import BaseCommand
+from django.test.client import Client
+from django.db import connection
+from django.conf import settings
+from webapp.core.models import Story
+from webapp.core import synthetic
+from webapp.api import views
+from webapp.timing import percentile, PERCENTILES, measure_requests, read
+from optparse import make_option
+import subprocess
+import datetime
+import json
+import os
+
+# the endpoints of the benchmark, formatted with the language of the site
+URLS = (
+	('stories'                  , '/api/stories/'),
+	('stories relevance'        , '/api/stories/?relevance_for=1e6'),
+	('stories-nested'           , '/api/stories-nested/'),
+	('stories-nested relevance' , '/api/stories-nested/?relevance_for=1e6'),
+	('filters'                  , '/api/filters/?lang=%(lang)s'),
+	('meta'                     , '/api/meta/'),
+)
+
+
+def summary(durations):
+	""" percentiles, max and mean of the durations, in ms """
+	durations = sorted(duration * 1000 for duration in durations)
+	result    = dict(('p%s' % rank, round(percentile(durations, rank), 2)) for rank in PERCENTILES)
+	result.update(
+		max  = round(durations[-1], 2),
+		mean = round(sum(durations) / len(durations), 2),
+	)
+	return result
+
+def rss():
+	""" resident memory of the process in KB (Linux only) """
+	with open('/proc/self/statm') as statm:
+		return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024
+
+def peak_memory(url):
+	"""
+	Growth of the resident memory (KB) while serving `url` in a forked process,
+	so the allocations of the previous requests don't hide the peak.
+	None when the platform doesn't have fork() and /proc.
+	"""
+	if not hasattr(os, 'wait4') or not os.path.exists('/proc/self/statm'):
+		return None
+	# the child must not share the connection of the parent
+	connection.close()
+	reader, writer = os.pipe()
+	pid = os.fork()
+	if not pid:
+		os.close(reader)
+		try:
+			start = rss()
+			read(Client().get(url))
+			os.write(writer, json.dumps(start))
+		finally:
+			os._exit(0)
+	os.close(writer)
+	with os.fdopen(reader) as output:
+		start = output.read()
+	pid, status, usage = os.wait4(pid, 0)
+	if status or not start:
+		return None
+	# ru_maxrss is in KB on Linux
+	return max(0, usage.ru_maxrss - json.loads(start))
+
+def commit():
+	""" the current commit of the repository, if any """
+	try:
+		return subprocess.check_output(['git', 'rev-parse', 'HEAD'], stderr=open(os.devnull, 'w')).strip()
+	except (OSError, subprocess.CalledProcessError):
+		return None
+
+class Command(BaseCommand):
+	"""
+	Measure the endpoints of `URLS`: latency percentiles of --runs requests with cold
+	caches (caches of the process and cached filters forgotten before each request) and warm caches,
+	number of queries and peak memory. The results are written as JSON in --output to be
+	compared between commits, with `generate_stories` to benchmark a large dataset.
+	"""
+	help = 'Measure the latency, the queries and the memory of the api'
+	option_list = BaseCommand.option_list + (
+		make_option('--runs',
+			type    = 'int',
+			dest    = 'runs',
+			default = 20,
+			help    = 'Number of requests by endpoint and cache mode'),
+		make_option('--count',
+			type    = 'int',
+			dest    = 'count',
+			default = 0,
+			help    = 'Number of synthetic stories created for the benchmark (and removed afterwards)'),
+		make_option('--output',
+			dest    = 'output',
+			default = None,
+			help    = 'JSON file of the results'),
+		make_option('--label',
+			dest    = 'label',
+			default = None,
+			help    = 'Label of the results (i.e: the name of the branch)'),
+		)
+
+	def measure(self, client, url, runs, cold):
+		""" the durations of the requests and the number of queries of the last one """
+		# the versions are shared with the other processes of the site, only the caches are cleared
+		recordings = measure_requests(client, url, runs, views.clear_caches if cold else None)
+		return [recorded.duration for recorded in recordings], len(recordings[-1].queries)
+
+	def handle(self, *args, **options):
+		source = synthetic.new_source()
+		if options['count']:
+			_import = synthetic.create(options['count'], source, seed=0)
+			self.stdout.write('%s synthetic stories created' % _import.imported)
+		try:
+			client  = Client()
+			results = []
+			for name, url in URLS:
+				url = url % {'lang': settings.LANGUAGE_CODE}
+				# a first request to load the modules
+				read(client.get(url))
+				for mode in ('cold', 'warm'):
+					durations, queries = self.measure(client, url, options['runs'], mode == 'cold')
+					result = dict(name=name, url=url, cache=mode, queries=queries, **summary(durations))
+					results.append(result)
+					self.stdout.write('%-26s %s  p50 %7.2fms  p95 %7.2fms  p99 %7.2fms  %3s queries' % (
+						name, mode, result['p50'], result['p95'], result['p99'], queries))
+				views.clear_caches()
+				memory = peak_memory(url)
+				for result in results[-2:]:
+					result['peak_memory_kb'] = memory
+				self.stdout.write('%-26s peak memory %s KB' % (name, memory))
+			report = {
+				'label'   : options['label'],
+				'commit'  : commit(),
+				'date'    : datetime.datetime.now().isoformat(),
+				'database': connection.vendor,
+				'stories' : Story.objects.public().count(),
+				'runs'    : options['runs'],
+				'results' : results,
+			}
+		finally:
+			if options['count']:
+				synthetic.remove(source)
+		if options['output']:
+			with open(options['output'], 'w') as output:
+				json.dump(report, output, indent=2, sort_keys=True)
+			self.stdout.write('results written in %s' % options['output'])
+
+# EOF
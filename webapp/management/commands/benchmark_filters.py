@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+# Encoding: utf-8
+# -----------------------------------------------------------------------------
+# Project : OKF - Spending Stories
+# -----------------------------------------------------------------------------
+# Author : Edouard Richard                                  <edou4rd@gmail.com>
+# -----------------------------------------------------------------------------
+# License : GNU General Public License
+# -----------------------------------------------------------------------------
+# Creation : 18-Oct-2026
+# Last mod : 18-Oct-2026
+# -----------------------------------------------------------------------------
+# This file is part of Spending Stories.
+# 
+#     Spending Stories is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+# 
+#     Spending Stories is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+# 
+#     You should have received a copy of the GNU General Public License
+#     along with Spending Stories.  If not, see <http://www.gnu.org/licenses/>.
+
+from django.core.management.base import BaseCommand, CommandError
+from webapp.api import views
+from webapp.timing import measure_requests
+from django.test.client import Client
+from django.conf import settings
+from optparse import make_option
+
+class Command(BaseCommand):
+	"""
+	Measure the latency and the number of queries of /api/filters/ for every language,
+	with a cold cache and with a warm cache.
+	Fail if a cold request needs more than --max_queries queries.
+	"""
+	help = 'Benchmark the filters endpoint of the api'
+	option_list = BaseCommand.option_list + (
+		make_option('--runs',
+			type    = 'int',
+			dest    = 'runs',
+			default = 20,
+			help    = 'Number of requests per measure'),
+		make_option('--max_queries',
+			type    = 'int',
+			dest    = 'max_queries',
+			default = 3,
+			help    = 'Maximum number of queries of a request with a cold cache'),
+		)
+
+	def measure(self, client, url, runs, clear_cache):
+		recordings = measure_requests(client, url, runs, views.clear_caches if clear_cache else None)
+		durations  = sorted(recorded.duration for recorded in recordings)
+		queries    = max(len(recorded.queries) for recorded in recordings)
+		return durations[len(durations) / 2], durations[-1], queries
+
+	def handle(self, *args, **options):
+		client   = Client()
+		failures = []
+		for lang, name in settings.LANGUAGES:
+			url = '/api/filters/?lang=%s' % lang
+			for label, clear_cache in (('cold', True), ('warm', False)):
+				median, worst, queries = self.measure(client, url, options['runs'], clear_cache)
+				self.stdout.write('%-6s %s  median %7.2fms  max %7.2fms  %d queries' % (
+					lang, label, median * 1000, worst * 1000, queries))
+				if clear_cache and queries > options['max_queries']:
+					failures.append('%s: %d queries' % (lang, queries))
+		if failures:
+			raise CommandError('too many queries (max %d) for %s' % (options['max_queries'], ', '.join(failures)))
+
+# EOF
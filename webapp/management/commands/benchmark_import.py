@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+# Encoding: utf-8
+# -----------------------------------------------------------------------------
+# Project : OKF - Spending Stories
+# -----------------------------------------------------------------------------
+# Author : Edouard Richard                                  <edou4rd@gmail.com>
+# -----------------------------------------------------------------------------
+# License : GNU General Public License
+# -----------------------------------------------------------------------------
+# Creation : 18-Oct-2026
+# Last mod : 18-Oct-2026
+# -----------------------------------------------------------------------------
+# This file is part of Spending Stories.
+# 
+#     Spending Stories is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+# 
+#     Spending Stories is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+# 
+#     You should have received a copy of the GNU General Public License
+#     along with Spending Stories.  If not, see <http://www.gnu.org/licenses/>.
+
+from django.core.management.base import BaseCommand, CommandError
+from webapp.core import importer, synthetic
+from webapp.timing import recording
+from optparse import make_option
+import tempfile
+import json
+
+class Command(BaseCommand):
+	"""
+	Import synthetic stories with `import_stories` and remove them, to measure its throughput.
+	Fail below --min_rate stories per second: the import of a spreadsheet of
+	a few thousand stories should take a few seconds at most.
+	"""
+	help = 'Benchmark the import of stories'
+	option_list = BaseCommand.option_list + (
+		make_option('--count',
+			type    = 'int',
+			dest    = 'count',
+			default = 5000,
+			help    = 'Number of imported stories'),
+		make_option('--min_rate',
+			type    = 'int',
+			dest    = 'min_rate',
+			default = 500,
+			help    = 'Minimum throughput (stories/s)'),
+		)
+
+	def handle(self, *args, **options):
+		source = synthetic.new_source()
+		with tempfile.NamedTemporaryFile(suffix='.ndjson') as f:
+			for row in synthetic.rows(options['count'], source, status='published'):
+				f.write(json.dumps(row) + '\n')
+			f.flush()
+			f.seek(0)
+			_import = importer.Importer()
+			try:
+				with recording() as recorded:
+					_import.run(importer.read(f, 'ndjson'))
+			finally:
+				synthetic.remove(source)
+		rate = _import.imported / recorded.duration
+		self.stdout.write('%s stories imported, %s rejected in %.2fs (%s queries): %.0f stories/s' % (
+			_import.imported, len(_import.rejects), recorded.duration, len(recorded.queries), rate))
+		if rate < options['min_rate']:
+			raise CommandError('import slower than %s stories/s' % options['min_rate'])
+
+# EOF
@@ -0,0 +1,194 @@
+#!/usr/bin/env python
+# Encoding: utf-8
+# -----------------------------------------------------------------------------
+# Project : OKF - Spending Stories
+# -----------------------------------------------------------------------------
+# Author : Edouard Richard                                  <edou4rd@gmail.com>
+# -----------------------------------------------------------------------------
+# License : GNU General Public License
+# -----------------------------------------------------------------------------
+# Creation : 18-Oct-2026
+# Last mod : 18-Oct-2026
+# -----------------------------------------------------------------------------
+# This file is part of Spending Stories.
+# 
+#     Spending Stories is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+# 
+#     Spending Stories is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+# 
+#     You should have received a copy of the GNU General Public License
+#     along with Spending Stories.  If not, see <http://www.gnu.org/licenses/>.
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.client import Client
+from django.db.backends import util
+from django.db import connection
+from django.conf import settings
+from webapp.core.models import Story, Theme, StoryStats
+from webapp.core import synthetic
+from webapp.api import views
+from webapp import timing
+from optparse import make_option
+import contextlib
+import re
+
+# requests of the api, formatted with a story, a language, a type, a country, a currency and a theme
+URLS = (
+	'/api/stories/',
+	'/api/stories/?lang=%(lang)s',
+	'/api/stories/?type=%(type)s',
+	'/api/stories/?country=%(country)s',
+	'/api/stories/?currency=%(currency)s',
+	'/api/stories/?sticky=True',
+	'/api/stories/?themes=%(theme)s',
+	'/api/stories/?stream=true',
+	'/api/stories/?relevance_for=1e6',
+	'/api/stories/?relevance_for=1e6&lang=%(lang)s&limit=10',
+	'/api/stories/%(story)s/',
+	'/api/stories-nested/?lang=%(lang)s',
+	'/api/stories-nested/%(story)s/',
+	'/api/stories/export.csv?lang=%(lang)s',
+	'/api/stories/export.ndjson?type=%(type)s',
+	'/api/meta/',
+	'/api/filters/?lang=%(lang)s',
+	'/api/themes/',
+	'/api/currencies/',
+	'/api/countries/',
+	'/api/languages/',
+	'/api/pages/',
+)
+
+@contextlib.contextmanager
+def recording():
+	"""
+	record the (sql, params) of the queries executed by the debug cursor of `timing.recording`,
+	the parameters being needed by EXPLAIN (the sql of `connection.queries` is interpolated)
+	"""
+	queries = []
+	execute = util.CursorDebugWrapper.execute
+	def record(self, sql, params=()):
+		queries.append((sql, params))
+		return execute(self, sql, params)
+	util.CursorDebugWrapper.execute = record
+	try:
+		with timing.recording():
+			yield queries
+	finally:
+		util.CursorDebugWrapper.execute = execute
+
+def explain(sql, params):
+	""" return the query plan as lines """
+	cursor = connection.cursor()
+	if connection.vendor == 'sqlite':
+		cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+		return [row[-1] for row in cursor.fetchall()]
+	cursor.execute('EXPLAIN ' + sql, params)
+	if connection.vendor == 'mysql':
+		# id, select_type, table, type, ...
+		return ['%s %s' % (row[2], row[3]) for row in cursor.fetchall()]
+	return [row[0] for row in cursor.fetchall()]
+
+def full_scans(sql, plan, tables):
+	""" return the lines of the plan which read a whole table among `tables` """
+	# the subqueries of Django alias the tables (i.e: "core_story" U0)
+	names = set(tables) | set(alias.lower() for table, alias in re.findall(r'"(\w+)" (\w+)', sql) if table in tables)
+	scans = []
+	for line in plan:
+		if connection.vendor == 'sqlite':
+			match = re.match(r'\s*SCAN (?:TABLE )?(\w+)(?: AS (\w+))?\s*$', line)
+		elif connection.vendor == 'mysql':
+			match = re.match(r'(\w+) (ALL)$', line)
+		else:
+			match = re.search(r'Seq Scan on (\w+)(?: (\w+))?', line)
+		if match and set(name.lower() for name in match.groups() if name) & names:
+			scans.append(line.strip())
+	return scans
+
+class Command(BaseCommand):
+	"""
+	Run EXPLAIN for every query of the api requests in `URLS`, on the stories of the
+	database and --count synthetic stories (removed afterwards).
+	Fail if a query reads a whole table of --tables instead of using an index.
+	"""
+	help = 'Check that the queries of the api use the indexes'
+	option_list = BaseCommand.option_list + (
+		make_option('--count',
+			type    = 'int',
+			dest    = 'count',
+			default = 20000,
+			help    = 'Number of synthetic stories (0 to use the database as it is)'),
+		make_option('--tables',
+			dest    = 'tables',
+			default = 'core_story,core_story_themes',
+			help    = 'Tables which must not be scanned (separated by commas)'),
+		make_option('--verbose_plans',
+			action  = 'store_true',
+			dest    = 'verbose_plans',
+			default = False,
+			help    = 'Print the plans of all the queries'),
+		)
+
+	def analyze(self):
+		""" update the statistics of the planner """
+		if connection.vendor in ('sqlite', 'postgresql'):
+			connection.cursor().execute('ANALYZE')
+
+	def queries(self, urls):
+		""" yield the (url, sql, params) of the SELECT of the requests, once by query """
+		client = Client()
+		seen   = set()
+		for url in urls:
+			views.clear_caches()
+			with recording() as queries:
+				if url == '/api/meta/':
+					StoryStats.objects.rebuild()
+				response = client.get(url)
+				# the streamed responses query the database while they are read
+				timing.read(response)
+			assert response.status_code == 200, (url, response.status_code)
+			for sql, params in queries:
+				if sql.lstrip().upper().startswith('SELECT') and sql not in seen:
+					seen.add(sql)
+					yield url, sql, params
+
+	def handle(self, *args, **options):
+		tables = options['tables'].split(',')
+		source = synthetic.new_source()
+		if options['count']:
+			_import = synthetic.create(options['count'], source, seed=0)
+			self.stdout.write('%s synthetic stories created' % _import.imported)
+		try:
+			self.analyze()
+			story = Story.objects.public()[0]
+			urls  = [url % {
+				'story'    : story.pk,
+				'lang'     : story.lang,
+				'type'     : story.type,
+				'country'  : story.country,
+				'currency' : story.currency_id,
+				'theme'    : Theme.objects.public()[0].pk,
+			} for url in URLS]
+			failures = []
+			count    = 0
+			for url, sql, params in self.queries(urls):
+				count += 1
+				plan   = explain(sql, params)
+				scans  = full_scans(sql, plan, tables)
+				if scans or options['verbose_plans']:
+					self.stdout.write('%s\n  %s\n  %s' % (url, sql, '\n  '.join(plan)))
+				if scans:
+					failures.append('%s: %s' % (url, '; '.join(scans)))
+		finally:
+			if options['count']:
+				synthetic.remove(source)
+		self.stdout.write('%s queries explained, %s full scans' % (count, len(failures)))
+		if failures:
+			raise CommandError('full scans:\n%s' % '\n'.join(failures))
+
+# EOF
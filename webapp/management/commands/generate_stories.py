@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+# Encoding: utf-8
+# -----------------------------------------------------------------------------
+# Project : OKF - Spending Stories
+# -----------------------------------------------------------------------------
+# Author : Edouard Richard                                  <edou4rd@gmail.com>
+# -----------------------------------------------------------------------------
+# License : GNU General Public License
+# -----------------------------------------------------------------------------
+# Creation : 18-Oct-2026
+# Last mod : 18-Oct-2026
+# -----------------------------------------------------------------------------
+# This file is part of Spending Stories.
+# 
+#     Spending Stories is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+# 
+#     Spending Stories is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+# 
+#     You should have received a copy of the GNU General Public License
+#     along with Spending Stories.  If not, see <http://www.gnu.org/licenses/>.
+
+from django.core.management.base import BaseCommand
+from webapp.core import synthetic
+from optparse import make_option
+import time
+
+class Command(BaseCommand):
+	"""
+	Create synthetic stories and themes (see `webapp.core.synthetic`) to measure the api
+	on a large dataset (i.e: with `benchmark_api`), and remove them with --remove
+	"""
+	help = 'Create synthetic stories'
+	option_list = BaseCommand.option_list + (
+		make_option('--count',
+			type    = 'int',
+			dest    = 'count',
+			default = 10000,
+			help    = 'Number of stories'),
+		make_option('--themes',
+			type    = 'int',
+			dest    = 'themes',
+			default = 0,
+			help    = 'Number of synthetic themes, created before the stories'),
+		make_option('--status',
+			dest    = 'status',
+			default = None,
+			help    = 'Status of all the stories (random by default: %s)' % ', '.join('%s %d%%' % (status, share * 100) for status, share in synthetic.STATUSES)),
+		make_option('--seed',
+			type    = 'int',
+			dest    = 'seed',
+			default = None,
+			help    = 'Seed of the random generator, for reproducible datasets'),
+		make_option('--remove',
+			action  = 'store_true',
+			dest    = 'remove',
+			default = False,
+			help    = 'Remove all the synthetic stories and themes'),
+		)
+
+	def handle(self, *args, **options):
+		start = time.time()
+		if options['remove']:
+			synthetic.remove()
+			self.stdout.write('synthetic stories and themes removed in %.2fs' % (time.time() - start))
+			return
+		if options['themes']:
+			self.stdout.write('%s themes created' % synthetic.create_themes(options['themes']))
+		source  = synthetic.new_source()
+		_import = synthetic.create(options['count'], source, options['status'], options['seed'])
+		duration = time.time() - start
+		self.stdout.write('%s stories created (source %s) in %.2fs (%.0f stories/s), %s without inflation' % (
+			_import.imported, source, duration, _import.imported / duration if duration else 0, len(_import.rejects)))
+
+# EOF
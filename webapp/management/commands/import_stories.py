@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+# Encoding: utf-8
+# -----------------------------------------------------------------------------
+# Project : OKF - Spending Stories
+# -----------------------------------------------------------------------------
+# Author : Edouard Richard                                  <edou4rd@gmail.com>
+# -----------------------------------------------------------------------------
+# License : GNU General Public License
+# -----------------------------------------------------------------------------
+# Creation : 18-Oct-2026
+# Last mod : 18-Oct-2026
+# -----------------------------------------------------------------------------
+# This file is part of Spending Stories.
+# 
+#     Spending Stories is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+# 
+#     Spending Stories is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+# 
+#     You should have received a copy of the GNU General Public License
+#     along with Spending Stories.  If not, see <http://www.gnu.org/licenses/>.
+
+from django.core.management.base import BaseCommand, CommandError
+from webapp.core import importer
+from optparse import make_option
+import json
+import time
+import os
+
+class Command(BaseCommand):
+	"""
+	Import stories from a CSV file (with a header) or a NDJSON file (one object by line).
+	Columns: title, value, currency, country, year, source and optionally description,
+	type, status, sticky, lang, extras and themes (slugs separated by commas).
+	The invalid rows are reported and skipped.
+	"""
+	args = '<file>'
+	help = 'Import stories from a CSV or NDJSON file'
+	option_list = BaseCommand.option_list + (
+		make_option('--format',
+			dest    = 'format',
+			default = None,
+			help    = 'csv or ndjson (guessed from the extension by default)'),
+		make_option('--status',
+			dest    = 'status',
+			default = None,
+			help    = 'Status of all the imported stories (the `status` column, or pending, by default)'),
+		make_option('--chunk_size',
+			dest    = 'chunk_size',
+			type    = 'int',
+			default = importer.streaming.CHUNK_SIZE,
+			help    = 'Number of stories inserted at once'),
+		make_option('--rejects',
+			dest    = 'rejects',
+			default = None,
+			help    = 'Write the rejected lines and their errors in this file (NDJSON)'),
+		make_option('--dry-run',
+			action  = 'store_true',
+			dest    = 'dry_run',
+			default = False,
+			help    = 'Validate the file without importing it'),
+		)
+
+	def handle(self, *args, **options):
+		if len(args) != 1:
+			raise CommandError('usage: import_stories %s' % self.args)
+		path   = args[0]
+		format = options['format'] or os.path.splitext(path)[1].lstrip('.').lower()
+		if format not in importer.FORMATS:
+			raise CommandError('unknown format %s, use --format with one of %s' % (format, ', '.join(importer.FORMATS)))
+		start   = time.time()
+		_import = importer.Importer(status=options['status'], chunk_size=options['chunk_size'], dry_run=options['dry_run'])
+		def progress(imported, rejected):
+			self.stdout.write('%s stories imported, %s rejected (%.0f stories/s)' % (imported, rejected, imported / (time.time() - start)))
+		with open(path, 'rb') as f:
+			_import.run(importer.read(f, format), progress=progress)
+		duration = time.time() - start
+		for line, errors in _import.rejects:
+			self.stderr.write('line %s: %s' % (line, '; '.join(errors)))
+		if options['rejects']:
+			with open(options['rejects'], 'w') as f:
+				for line, errors in _import.rejects:
+					f.write(json.dumps({'line': line, 'errors': errors}) + '\n')
+		self.stdout.write('%s stories imported%s, %s rejected in %.2fs (%.0f stories/s)' % (
+			_import.imported, ' (dry run, nothing saved)' if options['dry_run'] else '', len(_import.rejects),
+			duration, _import.imported / duration if duration else 0))
+
+# EOF
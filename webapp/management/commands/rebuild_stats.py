@@ -0,0 +1,47 @@
+#!/usr/bin/env python
+# Encoding: utf-8
+# -----------------------------------------------------------------------------
+# Project : OKF - Spending Stories
+# -----------------------------------------------------------------------------
+# Author : Edouard Richard                                  <edou4rd@gmail.com>
+# -----------------------------------------------------------------------------
+# License : GNU General Public License
+# -----------------------------------------------------------------------------
+# Creation : 18-Oct-2026
+# Last mod : 18-Oct-2026
+# -----------------------------------------------------------------------------
+# This file is part of Spending Stories.
+# 
+#     Spending Stories is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+# 
+#     Spending Stories is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+# 
+#     You should have received a copy of the GNU General Public License
+#     along with Spending Stories.  If not, see <http://www.gnu.org/licenses/>.
+
+from django.core.management.base import BaseCommand
+from webapp.core.models import Story, StoryStats
+from webapp.core import versions
+import time
+
+class Command(BaseCommand):
+	"""
+	Compute again the statistics of the public stories served by /api/meta/,
+	which are otherwise maintained incrementally
+	"""
+	help = 'Rebuild the statistics of the stories'
+
+	def handle(self, *args, **options):
+		start = time.time()
+		StoryStats.objects.rebuild()
+		# the responses of the api may change
+		versions.bump(Story)
+		self.stdout.write('stats of %s stories rebuilt in %.2fs' % (StoryStats.objects.as_dict()['count'], time.time() - start))
+
+# EOF
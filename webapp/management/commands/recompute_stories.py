@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# Encoding: utf-8
+# -----------------------------------------------------------------------------
+# Project : OKF - Spending Stories
+# -----------------------------------------------------------------------------
+# Author : Edouard Richard                                  <edou4rd@gmail.com>
+# -----------------------------------------------------------------------------
+# License : GNU General Public License
+# -----------------------------------------------------------------------------
+# Creation : 18-Oct-2026
+# Last mod : 18-Oct-2026
+# -----------------------------------------------------------------------------
+# This file is part of Spending Stories.
+# 
+#     Spending Stories is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+# 
+#     Spending Stories is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+# 
+#     You should have received a copy of the GNU General Public License
+#     along with Spending Stories.  If not, see <http://www.gnu.org/licenses/>.
+
+from django.core.management.base import BaseCommand, CommandError
+from webapp.core.models import Story
+from webapp.core import recompute
+from django.utils import timezone
+from optparse import make_option
+import datetime
+
+class Command(BaseCommand):
+	"""
+	Recompute the current values of the stories (i.e: after an update of the CPI)
+	by chunks of primary keys, optionally in several processes
+	"""
+	help = 'Recompute the current values of the stories'
+	option_list = BaseCommand.option_list + (
+		make_option('--dry-run',
+			action  = 'store_true',
+			dest    = 'dry_run',
+			default = False,
+			help    = 'Compute the values without saving them'),
+		make_option('--since',
+			dest    = 'since',
+			default = None,
+			help    = 'Only the stories created since this date (YYYY-MM-DD)'),
+		make_option('--processes',
+			dest    = 'processes',
+			type    = 'int',
+			default = 0,
+			help    = 'Number of worker processes (none by default)'),
+		make_option('--chunk_size',
+			dest    = 'chunk_size',
+			type    = 'int',
+			default = recompute.streaming.CHUNK_SIZE,
+			help    = 'Number of stories by chunk'),
+		)
+
+	def progress(self, done, total, elapsed):
+		self.stdout.write('%s/%s stories (%.0f stories/s)' % (done, total, done / elapsed if elapsed else 0))
+
+	def handle(self, *args, **options):
+		stories = Story.objects.all()
+		if options['since']:
+			try:
+				since = datetime.datetime.strptime(options['since'], '%Y-%m-%d')
+			except ValueError:
+				raise CommandError('--since should be a date (YYYY-MM-DD)')
+			stories = stories.filter(created_at__gte=timezone.make_aware(since, timezone.get_default_timezone()))
+		summary = recompute.recompute(stories,
+			dry_run    = options['dry_run'],
+			processes  = options['processes'],
+			chunk_size = options['chunk_size'],
+			progress   = self.progress)
+		self.stdout.write('%s stories recomputed, %s changed%s in %.2fs (%.0f stories/s)' % (
+			summary['count'], summary['changed'], ' (dry run, nothing saved)' if options['dry_run'] else '',
+			summary['duration'], summary['count'] / summary['duration'] if summary['duration'] else 0))
+		if summary['failed']:
+			self.stdout.write('%s stories can\'t be computed: %s' % (len(summary['failed']), ', '.join(map(str, sorted(summary['failed'])))))
+
+# EOF
@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+# Encoding: utf-8
+# -----------------------------------------------------------------------------
+# Project : OKF - Spending Stories
+# -----------------------------------------------------------------------------
+# Author : Edouard Richard                                  <edou4rd@gmail.com>
+# -----------------------------------------------------------------------------
+# License : GNU General Public License
+# -----------------------------------------------------------------------------
+# Creation : 18-Oct-2026
+# Last mod : 18-Oct-2026
+# -----------------------------------------------------------------------------
+# This file is part of Spending Stories.
+# 
+#     Spending Stories is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+# 
+#     Spending Stories is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+# 
+#     You should have received a copy of the GNU General Public License
+#     along with Spending Stories.  If not, see <http://www.gnu.org/licenses/>.
+
+from django.core.management.base import BaseCommand
+from webapp.core.models import Story
+from webapp.core import versions
+from webapp.api import payloads, streaming
+from django.db import transaction
+import time
+
+class Command(BaseCommand):
+	"""
+	Regenerate the pre-rendered JSON of the stories used by the api listings
+	(`Story.payload` and `Story.payload_nested`)
+	"""
+	help = 'Regenerate the payloads of the stories'
+
+	def handle(self, *args, **options):
+		start = time.time()
+		count = 0
+		# one transaction by chunk, the stories are saved by the previous chunks if one fails
+		for first, last in streaming.pk_ranges(Story.objects.all()):
+			with transaction.commit_on_success():
+				count += payloads.refresh(Story.objects.filter(pk__gte=first, pk__lte=last))
+		# the responses of the api may change
+		versions.bump(Story)
+		self.stdout.write('%s stories refreshed in %.2fs' % (count, time.time() - start))
+
+# EOF
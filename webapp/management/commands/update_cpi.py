@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+# Encoding: utf-8
+# -----------------------------------------------------------------------------
+# Project : OKF - Spending Stories
+# -----------------------------------------------------------------------------
+# Author : Edouard Richard                                  <edou4rd@gmail.com>
+# -----------------------------------------------------------------------------
+# License : GNU General Public License
+# -----------------------------------------------------------------------------
+# Creation : 18-Oct-2026
+# Last mod : 18-Oct-2026
+# -----------------------------------------------------------------------------
+# This file is part of Spending Stories.
+# 
+#     Spending Stories is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+# 
+#     Spending Stories is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+# 
+#     You should have received a copy of the GNU General Public License
+#     along with Spending Stories.  If not, see <http://www.gnu.org/licenses/>.
+
+from django.core.management.base import BaseCommand, CommandError
+from django.conf import settings
+from economics import snapshot
+from optparse import make_option
+import time
+
+class Command(BaseCommand):
+	"""
+	Refresh the on-disk snapshot of the CPI data (settings.CPI_SNAPSHOT) with a conditional
+	request: nothing is downloaded if the data didn't change. Meant to be run out-of-band
+	(i.e: by cron), the workers only read the snapshot.
+	"""
+	help = 'Refresh the snapshot of the CPI data'
+	option_list = BaseCommand.option_list + (
+		make_option('--source',
+			dest    = 'source',
+			default = snapshot.SOURCE,
+			help    = 'Url of the csv of the CPI data (default: %s)' % (snapshot.SOURCE)),
+		)
+
+	def handle(self, *args, **options):
+		start = time.time()
+		try:
+			updated = snapshot.refresh(settings.CPI_SNAPSHOT, options['source'])
+		except snapshot.SnapshotError as e:
+			raise CommandError(e)
+		state = snapshot.load(settings.CPI_SNAPSHOT)
+		self.stdout.write('%s %s (version %s, %d rows) in %.2fs' % (
+			settings.CPI_SNAPSHOT, 'updated' if updated else 'up to date',
+			state['version'][:12], len(state['rows']), time.time() - start))
+
+# EOF
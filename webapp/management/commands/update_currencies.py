@@ -8,7 +8,7 @@
 # License : GNU General Public License
 # -----------------------------------------------------------------------------
 # Creation : 17-Dec-2013
-# Last mod : 17-Dec-2013
+# Last mod : 18-Oct-2026
 # -----------------------------------------------------------------------------
 # This file is part of Spending Stories.
 # 
@@ -27,7 +27,7 @@
 
 from django.core.management.base import BaseCommand
 from webapp.currency.models import Currency
-from webapp.core.models import Story
+from webapp.core import recompute
 import requests
 import os
 import sys
@@ -53,11 +53,6 @@ class Command(BaseCommand):
 			help    = 'Update the fixture file (%s)' % (FIXTURES_PATH)),
 		)
 
-	def recompute_stories(self):
-		for story in Story.objects.all():
-			story.set_current_value()
-			story.save()
-
 	def handle(self, *args, **options):
 		try:
 			api_key = args[0]
@@ -72,16 +67,15 @@ class Command(BaseCommand):
 			self.stdout.write(rates['description'])
 			sys.exit(1)
 		rates= rates['rates']
-		counter = 0
-		for currency in Currency.objects.all():
-			new_rate = rates[currency.iso_code]
-			if new_rate != currency.rate:
-				currency.rate = new_rate
-				currency.save()
-				counter += 1
-		self.stdout.write('%s currencies updated' % (counter))
-		self.recompute_stories()
-		self.stdout.write('stories updated')
+		changed = {}
+		for iso_code, rate in Currency.objects.values_list('iso_code', 'rate'):
+			new_rate = rates[iso_code]
+			if new_rate != rate:
+				changed[iso_code] = new_rate
+		# the rates and the values in USD of the stories are updated in one transaction
+		summary = recompute.convert(changed)
+		self.stdout.write('%s currencies updated' % (summary['currencies']))
+		self.stdout.write('%s stories updated in %.3fs' % (summary['stories'], summary['duration']))
 		# save in fixtures
 		if options.get("update_fixtures", False):
 			with open(FIXTURES_PATH, 'w') as f:
@@ -8,7 +8,7 @@
 # License : GNU General Public License
 # -----------------------------------------------------------------------------
 # Creation : 21-Aug-2013
-# Last mod : 21-Aug-2013
+# Last mod : 18-Oct-2026
 # -----------------------------------------------------------------------------
 # This file is part of Spending Stories.
 # 
@@ -26,6 +26,21 @@
 #     along with Spending Stories.  If not, see <http://www.gnu.org/licenses/>.
 
 
+from django.conf                 import settings
+from django.core.exceptions      import MiddlewareNotUsed
+from django.http                 import HttpResponse
+from django.utils.encoding       import force_bytes
+from rest_framework.request      import Request
+from rest_framework.settings     import api_settings
+from rest_framework.exceptions   import APIException
+from webapp.core                 import versions
+import StringIO
+import cProfile
+import marshal
+import pstats
+import timing
+import time
+
 class AngularCSRFRename(object):
     """ 
     * The CSRF HTTP header name can't be changed in Django (must be X-CSRFToken)
@@ -47,4 +62,119 @@ class AngularCSRFRename(object):
             del request.META[self.ANGULAR_HEADER_NAME]
         return None
 
+class BumpVersions(object):
+    """
+    Bump again the data versions of the models written in the transaction of a view
+    (i.e: the admin), once it's committed, see `webapp.core.versions.bump_committed`.
+    """
+
+    def process_response(self, request, response):
+        versions.bump_committed()
+        return response
+
+class ServerTiming(object):
+    """
+    Measure the requests: total duration, number and duration of the SQL queries,
+    rendering of the response (`serialize`) and the steps measured with `timing.measure`
+    (`relevance`, `sort`). They are sent in a `Server-Timing` header and kept for
+    `/api/_stats/` by `timing.stats`.
+    Must be the first middleware to measure the others. The streamed responses
+    are only measured until the view returns them, without the queries run while
+    they are read. Disabled with `SERVER_TIMING = False`.
+    """
+
+    def __init__(self):
+        if not getattr(settings, 'SERVER_TIMING', True):
+            raise MiddlewareNotUsed
+
+    def process_request(self, request):
+        timing.start()
+        return None
+
+    def process_template_response(self, request, response):
+        # the response is rendered after the last of these hooks, which is this one
+        timings = timing.current()
+        if timings is not None:
+            timings.rendering = time.time()
+        return response
+
+    def process_response(self, request, response):
+        timings = timing.stop()
+        if timings is not None:
+            if not timings.ignored:
+                resolver_match = getattr(request, 'resolver_match', None)
+                timing.stats.add(resolver_match.url_name if resolver_match else '(unresolved)', timings)
+            response['Server-Timing'] = timings.header()
+        return response
+
+class ProfileRequest(object):
+    """
+    Run the request of a staff user under cProfile when it has `_profile=cprofile`,
+    and answer the profile sorted by `_profile_sort` (cumulative by default) with the
+    SQL queries and their durations, as text. `_profile=pstats` downloads the stats
+    instead, to be read with `pstats`.
+    The users are authenticated as the api does it (session, token or basic auth),
+    the parameters are ignored for the others. Disabled with `REQUEST_PROFILING = False`.
+    """
+
+    PARAMETER      = '_profile'
+    SORT_PARAMETER = '_profile_sort'
+    FORMATS        = ('cprofile', 'pstats')
+    LIMIT          = 60
+
+    def __init__(self):
+        if not getattr(settings, 'REQUEST_PROFILING', True):
+            raise MiddlewareNotUsed
+
+    def is_staff(self, request):
+        """ the session is checked by Django, the tokens are checked by the api """
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated():
+            return user.is_staff
+        try:
+            user = Request(request, authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES]).user
+        except APIException:
+            return False
+        return user.is_authenticated() and user.is_staff
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        profile_format = request.GET.get(self.PARAMETER)
+        if profile_format not in self.FORMATS or not self.is_staff(request):
+            return None
+        sort     = request.GET.get(self.SORT_PARAMETER, 'cumulative')
+        if sort not in pstats.Stats.sort_arg_dict_default:
+            sort = 'cumulative'
+        timings  = timing.current()
+        if timings is not None:
+            timings.ignored = True
+        profiler = cProfile.Profile()
+        with timing.recording() as recorded:
+            response = profiler.runcall(self.run_view, view_func, request, view_args, view_kwargs)
+        profiler.create_stats()
+        if profile_format == 'pstats':
+            response = HttpResponse(marshal.dumps(profiler.stats), content_type='application/octet-stream')
+            response['Content-Disposition'] = 'attachment; filename="request.pstats"'
+            return response
+        output = StringIO.StringIO()
+        output.write('%s %s\n' % (request.method, request.get_full_path()))
+        output.write('%s in %.2fms, %s queries in %.2fms\n\n' % (response.status_code, recorded.duration * 1000,
+            len(recorded.queries), recorded.sql_duration() * 1000))
+        stats = pstats.Stats(profiler, stream=output)
+        stats.sort_stats(sort).print_stats(self.LIMIT)
+        output.write('SQL\n\n')
+        for query in recorded.queries:
+            output.write('%8.2fms  %s\n' % (float(query['time']) * 1000, force_bytes(query['sql'])))
+        return HttpResponse(output.getvalue(), content_type='text/plain; charset=utf-8')
+
+    def run_view(self, view_func, request, view_args, view_kwargs):
+        """ call the view and render its response, read until the end if it is streamed """
+        response = view_func(request, *view_args, **view_kwargs)
+        if hasattr(response, 'render') and callable(response.render):
+            response = response.render()
+        if response.streaming:
+            # the streamed responses run their queries while they are read
+            for chunk in response.streaming_content:
+                pass
+        return response
+
 # EOF
@@ -8,7 +8,7 @@
 # License : GNU General Public License
 # -----------------------------------------------------------------------------
 # Creation : 05-Aug-2013
-# Last mod : 02-Oct-2013
+# Last mod : 18-Oct-2026
 # -----------------------------------------------------------------------------
 # This file is part of Spending Stories.
 #
@@ -135,6 +135,9 @@ TEMPLATE_LOADERS = (
 )
 
 MIDDLEWARE_CLASSES = (
+    # first, to measure the others
+    'webapp.middlewares.ServerTiming',
+    'webapp.middlewares.BumpVersions',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'webapp.middlewares.AngularCSRFRename',
@@ -142,6 +145,8 @@ MIDDLEWARE_CLASSES = (
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.locale.LocaleMiddleware',
+    # last, to profile the views only
+    'webapp.middlewares.ProfileRequest',
     # Uncomment the next line for simple clickjacking protection:
     # 'django.middleware.clickjacking.XFrameOptionsMiddleware',
 )
@@ -255,6 +260,43 @@ REDACTOR_OPTIONS = {
 # key for openexchangerates.org api, used by the update_currencies command
 OER_API_KEY = os.environ.get('OER_API_KEY')
 
+# The data versions (see webapp.core.versions) must be shared by all the processes, the
+# workers and the management commands: memcached with MEMCACHE_SERVERS (host:port separated
+# by commas), or else a table of the database (created by `migrate`, or `createcachetable cache_table`),
+# which costs a query to read the versions of each request, even to answer a 304
+if os.environ.get('MEMCACHE_SERVERS'):
+    CACHES = {
+        'default': {
+            'BACKEND'  : 'django.core.cache.backends.memcached.MemcachedCache',
+            'LOCATION' : os.environ['MEMCACHE_SERVERS'].split(','),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND'  : 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION' : 'cache_table',
+            # the culling of the entries would reset the versions
+            'OPTIONS'  : {'MAX_ENTRIES': 100000},
+        }
+    }
+
+# number of relevance searches kept in memory by each process, see webapp.api.ranking
+API_RELEVANCE_CACHE_SIZE = 128
+
+# Server-Timing headers of the responses, and number of requests by endpoint kept
+# in memory by each process for the percentiles of /api/_stats/, see webapp.timing
+SERVER_TIMING        = True
+SERVER_TIMING_WINDOW = 1000
+
+# `?_profile=cprofile` profiles the requests of the staff users, see webapp.middlewares.ProfileRequest
+REQUEST_PROFILING = True
+
+# on-disk snapshot of the CPI data, refreshed by the update_cpi command
+CPI_SNAPSHOT = os.environ.get('CPI_SNAPSHOT', os.path.join(ROOT_PATH, 'data', 'cpi.json'))
+# local file (snapshot or csv of the CPI data package) used instead of the snapshot, to work offline
+CPI_SOURCE   = os.environ.get('CPI_SOURCE')
+
 # Load heroku settings if HEROKU=true in a environment variable
 if os.environ.get('HEROKU', None):
     try:
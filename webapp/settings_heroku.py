@@ -36,6 +36,7 @@ Heroku environment variables needed:
 	PATH:                    bin:node_modules/.bin:/app/bin:/usr/local/bin:/usr/bin:/bin
 	PYTHONPATH:              webapp/:libs/
 	DATABASE_URL             postgres://<POSTGRES_URL>
+	MEMCACHE_SERVERS:        <HOST:PORT> (optional, the database is the cache otherwise)
 
 """
 HEROKU = True
@@ -6,3 +6,13 @@ LANGUAGES = (
     ('en_GB', _("English")),
     ('fr_FR', _("French"))
 )
+
+# tests never fetch the CPI data
+CPI_SOURCE = os.path.join(ROOT_PATH, 'webapp', 'core', 'fixtures', 'cpi_sample.csv')
+
+# the tests run in one process, and count their queries without the ones of the cache
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
@@ -0,0 +1,222 @@
+#!/usr/bin/env python
+# Encoding: utf-8
+# -----------------------------------------------------------------------------
+# Project : OKF - Spending Stories
+# -----------------------------------------------------------------------------
+# Author : Edouard Richard                                  <edou4rd@gmail.com>
+# -----------------------------------------------------------------------------
+# License : GNU General Public License
+# -----------------------------------------------------------------------------
+# Creation : 18-Oct-2026
+# Last mod : 18-Oct-2026
+# -----------------------------------------------------------------------------
+# This file is part of Spending Stories.
+# 
+#     Spending Stories is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+# 
+#     Spending Stories is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+# 
+#     You should have received a copy of the GNU General Public License
+#     along with Spending Stories.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Timings of the requests, see `webapp.middlewares.ServerTiming`.
+
+The middleware starts a `Timings` for every request, in a thread local. The
+queries are read in `connection.queries`, recorded by the debug cursor of Django
+during the request (see `Recording`), and the code measures its steps with
+`measure`, which costs nothing outside of a request:
+
+    with timing.measure('relevance'):
+        scores = Relevance.compute_many(...)
+
+The timings of the last requests of every endpoint are kept by `stats`.
+`recording` measures a block and its queries the same way, and `measure_requests`
+the requests of the benchmarks.
+"""
+
+from django.conf         import settings
+from django.db           import connection
+import contextlib
+import collections
+import threading
+import time
+
+# the measures of a request, in the order of the Server-Timing header
+METRICS     = ('total', 'sql', 'serialize', 'relevance', 'sort')
+PERCENTILES = (50, 90, 95, 99)
+
+local = threading.local()
+
+def percentile(values, rank):
+    """ nearest-rank percentile of sorted values """
+    return values[max(0, int(round(rank / 100.0 * len(values))) - 1)]
+
+class Recording(object):
+    """
+    Duration and queries of a block of code, from its creation to `stop`. The queries
+    ({'sql', 'time'}, as in `connection.queries`) are recorded by the debug cursor of
+    Django, even if DEBUG is False. Django empties `connection.queries` when a request
+    starts, so a recording which contains the start of a request only has its queries.
+    """
+
+    def __init__(self):
+        self.debug_cursor = connection.use_debug_cursor
+        connection.use_debug_cursor = True
+        self.recorded = connection.queries
+        self.first    = len(self.recorded)
+        self.start    = time.time()
+        self.duration = None
+        self.queries  = []
+
+    def stop(self):
+        self.duration = time.time() - self.start
+        if connection.queries is self.recorded:
+            self.queries = connection.queries[self.first:]
+        else:
+            self.queries = list(connection.queries)
+        connection.use_debug_cursor = self.debug_cursor
+        return self
+
+    def sql_duration(self):
+        return sum(float(query['time']) for query in self.queries)
+
+@contextlib.contextmanager
+def recording():
+    """ measure the block and record its queries, yield the `Recording` which is complete after the block """
+    recorded = Recording()
+    try:
+        yield recorded
+    finally:
+        recorded.stop()
+
+def read(response):
+    """ the content of the response, read until the end for the streamed responses """
+    return "".join(response.streaming_content) if response.streaming else response.content
+
+def measure_requests(client, url, runs, before=None):
+    """
+    `Recording` of `runs` requests of `url` with the test client, responses read until
+    the end, `before` being called before every request (i.e: to clear the caches)
+    """
+    recordings = []
+    for i in range(runs):
+        if before is not None:
+            before()
+        with recording() as recorded:
+            response = client.get(url)
+            read(response)
+        assert response.status_code == 200, (url, response.status_code)
+        recordings.append(recorded)
+    return recordings
+
+class Timings(object):
+    """ durations (in seconds) and counts of the measures of a request """
+
+    def __init__(self):
+        self.start     = time.time()
+        self.durations = dict.fromkeys(METRICS, 0.0)
+        self.counts    = dict.fromkeys(METRICS, 0)
+        # start of the rendering of the response, measured as `serialize`
+        self.rendering = None
+        # the queries of the request
+        self.recording = Recording()
+        # not kept by `stats` (i.e: slowed down by a profiler)
+        self.ignored   = False
+
+    def add(self, name, duration):
+        self.durations[name] += duration
+        self.counts[name]    += 1
+
+    def stop(self):
+        now = time.time()
+        if self.rendering is not None:
+            self.add('serialize', now - self.rendering)
+        self.recording.stop()
+        self.durations['sql']   = self.recording.sql_duration()
+        self.counts['sql']      = len(self.recording.queries)
+        self.durations['total'] = now - self.start
+        self.counts['total']    = 1
+
+    def header(self):
+        """ value of the Server-Timing header, in milliseconds """
+        entries = []
+        for name in METRICS:
+            if self.counts[name] or name == 'sql':
+                entry = '%s;dur=%.2f' % (name, self.durations[name] * 1000)
+                if name == 'sql':
+                    entry += ';desc="%s queries"' % self.counts[name]
+                entries.append(entry)
+        return ', '.join(entries)
+
+def start():
+    local.timings = Timings()
+    return local.timings
+
+def stop():
+    timings = current()
+    local.timings = None
+    if timings is not None:
+        timings.stop()
+    return timings
+
+def current():
+    """ the timings of the request of this thread, if any """
+    return getattr(local, 'timings', None)
+
+@contextlib.contextmanager
+def measure(name):
+    """ add the duration of the block to the `name` measure of the current request """
+    timings = current()
+    if timings is None:
+        yield
+        return
+    started = time.time()
+    try:
+        yield
+    finally:
+        timings.add(name, time.time() - started)
+
+class RollingStats(object):
+    """ the timings of the last `size` requests of every endpoint """
+
+    def __init__(self, size):
+        self.size      = size
+        self.lock      = threading.Lock()
+        self.endpoints = {}
+
+    def add(self, endpoint, timings):
+        row = tuple(timings.durations[name] for name in METRICS) + (timings.counts['sql'],)
+        with self.lock:
+            if endpoint not in self.endpoints:
+                self.endpoints[endpoint] = collections.deque(maxlen=self.size)
+            self.endpoints[endpoint].append(row)
+
+    def clear(self):
+        with self.lock:
+            self.endpoints.clear()
+
+    def as_dict(self):
+        """ percentiles and max of the measures (in milliseconds) and of the queries, by endpoint """
+        with self.lock:
+            endpoints = dict((endpoint, list(rows)) for endpoint, rows in self.endpoints.items())
+        result = {}
+        for endpoint, rows in endpoints.items():
+            result[endpoint] = {'requests': len(rows)}
+            for i, name in enumerate(METRICS + ('queries',)):
+                values  = sorted(row[i] for row in rows)
+                scale   = 1 if name == 'queries' else 1000
+                summary = dict(('p%s' % rank, round(percentile(values, rank) * scale, 2)) for rank in PERCENTILES)
+                summary['max'] = round(values[-1] * scale, 2)
+                result[endpoint][name] = summary
+        return result
+
+stats = RollingStats(getattr(settings, 'SERVER_TIMING_WINDOW', 1000))
+
+# EOF